@@ -0,0 +1,61 @@
+"""
+Gunicorn settings, picked up automatically when running `gunicorn rcos_io.wsgi` from the
+repository root. Tune a deployment with environment variables rather than editing this file.
+
+The app is loaded and warmed up once before workers are forked, so they share the imported
+code, URL resolver, and compiled templates, and each worker opens its Redis connections and
+database pool before it's given any requests.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 4))
+)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+"""Threads keep a worker responsive while its requests wait on Discord or GitHub. Use
+"uvicorn.workers.UvicornWorker" (with `rcos_io.asgi`) to serve async views without a thread,
+which only works while every middleware is async-capable (see portal/tests/test_middleware.py)."""
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 20
+keepalive = 5
+
+# Recycle workers now and then to contain memory growth, staggered so they don't all
+# restart (and go cold) at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    from portal.warmup import warm_up
+
+    timings = warm_up(connect=False)
+    server.log.info(
+        "Warmed up app: "
+        + ", ".join(
+            f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()
+        )
+    )
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    from portal.warmup import warm_up_connections
+
+    # Connections opened while loading the app in the master process can't be shared
+    connections.close_all()
+    try:
+        warm_up_connections()
+    except Exception as e:
+        server.log.warning(f"Worker {worker.pid} failed to open connections: {e}")
@@ -1,6 +1,5 @@
 import csv
 import logging
-from datetime import timedelta
 from time import sleep
 from typing import Any
 
@@ -10,8 +9,8 @@ from django.contrib.auth.admin import UserAdmin
 from django.db.models.query import QuerySet
 from django.http import HttpResponse
 from django.http.request import HttpRequest
-from django.utils import timezone
 
+from portal import tasks
 from portal.models import (
     Enrollment,
     Meeting,
@@ -32,11 +31,13 @@ from portal.models import (
     StatusUpdateSubmission,
     User,
 )
+from portal.routers import use_replica
 
 
 @admin.register(ShortLink)
 class ShortLinkAdmin(admin.ModelAdmin):
-    list_display = ("code", "url", "created_at")
+    list_display = ("code", "url", "click_count", "created_at")
+    readonly_fields = ("click_count",)
     search_fields = ("code", "url")
     list_filter = ("created_at",)
 
@@ -67,17 +68,20 @@ def export_enrollments_to_csv(modeladmin, request, queryset):
         ["semester", "rcsid", "email", "given name", "family name", "project"]
     )
 
-    for enrollment in queryset.filter(user__role=User.RPI):
-        writer.writerow(
-            [
-                enrollment.semester,
-                enrollment.user.rcs_id,
-                enrollment.user.rcs_id + "@rpi.edu",
-                enrollment.user.first_name,
-                enrollment.user.last_name,
-                enrollment.project,
-            ]
-        )
+    with use_replica():
+        for enrollment in queryset.filter(user__role=User.RPI).select_related(
+            "semester", "user", "project"
+        ):
+            writer.writerow(
+                [
+                    enrollment.semester,
+                    enrollment.user.rcs_id,
+                    enrollment.user.rcs_id + "@rpi.edu",
+                    enrollment.user.first_name,
+                    enrollment.user.last_name,
+                    enrollment.project,
+                ]
+            )
 
     return response
 
@@ -112,20 +116,30 @@ def make_published(modeladmin, request, queryset):
     queryset.update(is_published=True)
 
 
+@admin.action(description="Sync events on Discord")
+def sync_discord_events(modeladmin, request, queryset):
+    tasks.sync_discord_events.delay(list(queryset.values_list("pk", flat=True)))
+    messages.info(
+        request,
+        "Syncing the Discord events of the selected meetings in the background. Meetings that have already started are skipped.",
+    )
+
+
 @admin.action(description="Delete bogus bot sign-ups (never logged in, 7+ days old)")
 def delete_bogus_signups(modeladmin, request, queryset):
-    bogus = queryset.filter(
-        is_approved=False,
-        is_staff=False,
-        is_superuser=False,
-        last_login__isnull=True,
-        date_joined__lt=timezone.now() - timedelta(days=7),
+    bogus_ids = list(
+        User.get_unverified()
+        .filter(pk__in=queryset.values("pk"))
+        .values_list("pk", flat=True)
     )
-    deleted_count, _ = bogus.delete()
-    if deleted_count == 0:
+    if not bogus_ids:
         messages.info(request, "No bogus sign-ups matched in selection.")
     else:
-        messages.success(request, f"Deleted {deleted_count} bogus sign-up(s).")
+        # Can be tens of thousands of users, too many to delete during a request
+        tasks.delete_unverified_users.delay(bogus_ids)
+        messages.success(
+            request, f"Deleting {len(bogus_ids)} bogus sign-up(s) in the background."
+        )
 
 
 # Inlines
@@ -554,7 +568,7 @@ class MeetingAdmin(admin.ModelAdmin):
     search_fields = ("name", "type")
     list_filter = ("starts_at", "type", "is_published")
     inlines = (MeetingAttendanceCodeInline, MeetingAttendanceInline)
-    actions = (make_published,)
+    actions = (make_published, sync_discord_events)
     list_select_related = True
 
     fieldsets = (
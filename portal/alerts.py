@@ -0,0 +1,187 @@
+"""Daily readiness digest of upcoming meetings and projects that still need something done.
+
+Each rule is a condition on one model, and rules on the same model are checked together: one
+query finds every object breaking any of them, annotated with which ones. The results are posted
+as one message per channel instead of one per problem.
+
+To add a check, add a `Rule` to the `RuleSet` of its model, or a new `RuleSet` for another model.
+Run daily by the `meetings_alert` task.
+"""
+
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import BooleanField, Exists, ExpressionWrapper, Model, OuterRef, Q
+from django.db.models.query import QuerySet
+from django.utils import formats, timezone
+from requests import RequestException
+from sentry_sdk import capture_exception
+
+from portal.models import Meeting, MeetingAttendanceCode, ProjectProposal
+from portal.services import discord
+
+logger = logging.getLogger(__name__)
+
+MEETING_LOOKAHEAD = timedelta(days=2)
+"""How far ahead to check meetings, so there's still time to fix them."""
+
+MAX_ITEMS_PER_RULE = 10
+MAX_MESSAGE_LENGTH = 2000
+"""Discord's limit on a message's content."""
+
+
+@dataclass(frozen=True, eq=False)
+class Rule:
+    title: str
+    condition: Q
+    """Matches the objects breaking the rule."""
+    channel_id: str | None = None
+    """Where to post it, the `DISCORD_ALERTS_CHANNEL_ID` channel by default."""
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Rules on the same objects, checked in one query."""
+
+    get_queryset: Callable[[datetime], QuerySet]
+    """The objects to check at a given time, with anything the conditions refer to annotated."""
+    describe: Callable[[Model], str]
+    rules: tuple[Rule, ...]
+
+
+def describe_meeting(meeting: Meeting) -> str:
+    return f"{meeting} <{settings.PUBLIC_BASE_URL}{meeting.get_absolute_url()}>"
+
+
+def describe_proposal(proposal: ProjectProposal) -> str:
+    return f"{proposal.project} ({proposal.semester_id}) <{settings.PUBLIC_BASE_URL}{proposal.project.get_absolute_url()}?semester={proposal.semester_id}>"
+
+
+RULE_SETS = (
+    RuleSet(
+        get_queryset=lambda now: Meeting.objects.filter(
+            is_published=True, starts_at__gt=now, starts_at__lte=now + MEETING_LOOKAHEAD
+        )
+        .annotate(
+            has_attendance_codes=Exists(
+                MeetingAttendanceCode.objects.filter(meeting=OuterRef("pk"))
+            )
+        )
+        .order_by("starts_at"),
+        describe=describe_meeting,
+        rules=(
+            Rule(
+                "Missing presentation slides",
+                Q(presentation_url="")
+                & ~Q(type__in=(Meeting.MENTOR, Meeting.OFFICE_HOURS)),
+            ),
+            Rule(
+                "No attendance codes",
+                Q(is_attendance_taken=True, has_attendance_codes=False),
+            ),
+            Rule(
+                # Others can be held on Discord
+                "No room",
+                Q(
+                    room__isnull=True,
+                    type__in=(Meeting.SMALL_GROUP, Meeting.LARGE_GROUP),
+                ),
+            ),
+        ),
+    ),
+    RuleSet(
+        get_queryset=lambda now: ProjectProposal.objects.filter(
+            # Semesters that are over are done grading one way or another
+            semester__project_proposal_deadline__lt=now,
+            semester__end_date__gte=timezone.localdate(now),
+        )
+        .select_related("project")
+        .order_by("semester", "project__name"),
+        describe=describe_proposal,
+        rules=(Rule("Ungraded proposals past deadline", Q(grade__isnull=True)),),
+    ),
+)
+
+
+def evaluate(rule_set: RuleSet, now: datetime) -> dict[Rule, list[str]]:
+    """Finds the objects breaking each of the rule set's rules in a single query."""
+    broken = {
+        f"breaks_{i}": ExpressionWrapper(rule.condition, output_field=BooleanField())
+        for i, rule in enumerate(rule_set.rules)
+    }
+    objects = (
+        rule_set.get_queryset(now)
+        .annotate(**broken)
+        .filter(reduce(or_, (rule.condition for rule in rule_set.rules)))
+    )
+
+    results: dict[Rule, list[str]] = {rule: [] for rule in rule_set.rules}
+    for obj in objects:
+        description = rule_set.describe(obj)
+        for i, rule in enumerate(rule_set.rules):
+            if getattr(obj, f"breaks_{i}"):
+                results[rule].append(description)
+    return {
+        rule: descriptions for rule, descriptions in results.items() if descriptions
+    }
+
+
+def build_digest(results: dict[Rule, list[str]], now: datetime) -> str:
+    lines = [
+        f"**Readiness digest for {formats.date_format(timezone.localtime(now), 'D M j')}**"
+    ]
+    for rule, descriptions in results.items():
+        lines += ["", f"**{rule.title}** ({len(descriptions)})"]
+        lines += [f"- {d}" for d in descriptions[:MAX_ITEMS_PER_RULE]]
+        if len(descriptions) > MAX_ITEMS_PER_RULE:
+            lines.append(f"- …and {len(descriptions) - MAX_ITEMS_PER_RULE} more")
+
+    digest = "\n".join(lines)
+    if len(digest) > MAX_MESSAGE_LENGTH:
+        digest = digest[: MAX_MESSAGE_LENGTH - 1] + "…"
+    return digest
+
+
+def get_digests(now: datetime | None = None) -> dict[str, str]:
+    """Checks every rule and returns a digest of the broken ones for each channel, keyed by
+    channel ID. Channels with nothing to report are left out."""
+    now = now or timezone.now()
+    results_by_channel: dict[str, dict[Rule, list[str]]] = defaultdict(dict)
+    for rule_set in RULE_SETS:
+        for rule, descriptions in evaluate(rule_set, now).items():
+            channel_id = rule.channel_id or settings.DISCORD_ALERTS_CHANNEL_ID
+            results_by_channel[channel_id][rule] = descriptions
+
+    return {
+        channel_id: build_digest(results, now)
+        for channel_id, results in results_by_channel.items()
+    }
+
+
+def send_digests(now: datetime | None = None) -> dict:
+    """Posts each channel's digest.
+
+    Returns
+    -------
+        how many digests were sent and failed
+    """
+    results = {"sent": 0, "failed": 0}
+    for channel_id, digest in get_digests(now).items():
+        if not channel_id:
+            logger.warning("Not sending readiness digest, no alerts channel is set")
+            continue
+
+        try:
+            discord.send_message(channel_id, {"content": digest})
+            results["sent"] += 1
+        except RequestException as e:
+            capture_exception(e)
+            logger.exception(f"Failed to send readiness digest to {channel_id}")
+            results["failed"] += 1
+    return results
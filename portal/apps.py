@@ -5,3 +5,8 @@ class PortalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "portal"
     verbose_name = "RCOS IO Portal"
+
+    def ready(self):
+        from rcos_io.sentry import init_sentry
+
+        init_sentry()
@@ -0,0 +1,146 @@
+"""Rendering of meetings as iCalendar (RFC 5545) feeds."""
+
+from datetime import UTC
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signing import BadSignature, Signer
+from django.utils import timezone
+
+from .models import Meeting, User
+
+CALENDAR_TOKEN_SALT = "portal.calendar"
+CALENDAR_FEED_TIMEOUT = 60 * 60 * 6
+CALENDAR_FEED_HISTORY = timezone.timedelta(days=365)
+"""How far back past meetings are included in feeds."""
+
+USER_VISIBILITY_TIMEOUT = 60 * 10
+
+
+def get_calendar_token(user: User) -> str:
+    """Returns the secret token identifying a user's personal calendar feed."""
+    return Signer(salt=CALENDAR_TOKEN_SALT).sign(str(user.pk))
+
+
+def get_user_from_calendar_token(token: str) -> User | None:
+    try:
+        pk = Signer(salt=CALENDAR_TOKEN_SALT).unsign(token)
+    except BadSignature:
+        return None
+    return User.objects.filter(pk=pk, is_active=True).first()
+
+
+def get_user_visibility(user) -> str:
+    """Returns the user's meeting visibility class, cached briefly to avoid an enrollment lookup per request."""
+    if not user.is_authenticated:
+        return Meeting.PUBLIC_VISIBILITY
+
+    return cache.get_or_set(
+        f"meetings_visibility:{user.pk}",
+        lambda: Meeting.get_visibility(user),
+        USER_VISIBILITY_TIMEOUT,
+    )
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Folds a content line so that no physical line exceeds 75 octets."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+
+    chunks = []
+    chunk = ""
+    limit = 75
+    for char in line:
+        if len((chunk + char).encode()) > limit:
+            chunks.append(chunk)
+            chunk = ""
+            # Continuation lines begin with a space which counts towards the limit
+            limit = 74
+        chunk += char
+    chunks.append(chunk)
+    return "\r\n ".join(chunks)
+
+
+def format_datetime(value) -> str:
+    return value.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+def meeting_to_vevent(
+    meeting: Meeting, uid_domain: str, show_host_names: bool
+) -> list[str]:
+    url = settings.PUBLIC_BASE_URL.rstrip("/") + meeting.get_absolute_url()
+    description = meeting.description_markdown or ""
+    if meeting.host and (show_host_names or meeting.host.is_name_public):
+        description = f"Hosted by {meeting.host}\n\n{description}"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:meeting-{meeting.pk}@{uid_domain}",
+        f"DTSTAMP:{format_datetime(meeting.updated_at)}",
+        f"LAST-MODIFIED:{format_datetime(meeting.updated_at)}",
+        f"DTSTART:{format_datetime(meeting.starts_at)}",
+        f"DTEND:{format_datetime(meeting.ends_at)}",
+        f"SUMMARY:{escape_text(meeting.display_name)}",
+        f"CATEGORIES:{escape_text(meeting.get_type_display())}",
+        f"URL:{url}",
+        f"DESCRIPTION:{escape_text(description.strip())}",
+    ]
+    if meeting.room:
+        lines.append(f"LOCATION:{escape_text(str(meeting.room))}")
+    if not meeting.is_published:
+        lines.append("STATUS:TENTATIVE")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def render_meetings_calendar(visibility: str) -> str:
+    uid_domain = urlparse(settings.PUBLIC_BASE_URL).hostname or "rcos.io"
+    meetings = (
+        Meeting.get_visibility_queryset(visibility)
+        .filter(starts_at__gte=timezone.now() - CALENDAR_FEED_HISTORY)
+        .select_related("room", "host")
+        .order_by("starts_at")
+    )
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//RCOS//RCOS IO Meetings//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:RCOS Meetings",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+        "X-PUBLISHED-TTL:PT1H",
+    ]
+    for meeting in meetings:
+        lines.extend(
+            meeting_to_vevent(
+                meeting,
+                uid_domain,
+                show_host_names=visibility != Meeting.PUBLIC_VISIBILITY,
+            )
+        )
+    lines.append("END:VCALENDAR")
+
+    return "".join(fold_line(line) + "\r\n" for line in lines)
+
+
+def get_meetings_calendar(visibility: str) -> str:
+    """Returns the iCalendar feed for a visibility class, rendering it only when the cached copy was invalidated."""
+    return cache.get_or_set(
+        Meeting.ics_cache_key(visibility),
+        lambda: render_meetings_calendar(visibility),
+        CALENDAR_FEED_TIMEOUT,
+    )
@@ -5,7 +5,8 @@ from datetime import datetime
 
 from django.utils import timezone
 
-from portal.models import Enrollment, MentorApplication, Project, Semester, User
+from portal.models import MentorApplication, Project, Semester, User
+from portal.roles import get_roles
 
 
 class FailedCheck(Exception):
@@ -216,11 +217,8 @@ class CheckUserNotAlreadyEnrolled(Check):
         if user.owned_projects.filter(is_approved=False).count() > 0:
             return self.fail("You have an unapproved project pending.")
 
-        try:
-            if Enrollment.objects.get(user=user, semester=semester).project:
-                return self.fail()
-        except Enrollment.DoesNotExist:
-            pass
+        if get_roles(user, semester).project_id:
+            return self.fail()
 
 
 class CheckUserCanCreateProject(Check):
@@ -242,17 +240,14 @@ class CheckUserIsProjectLeadOrOwner(Check):
     ):
         super().run(user, semester, project)
 
-        try:
-            enrollment = Enrollment.objects.get(user=user, semester=semester)
-        except Enrollment.DoesNotExist:
+        user_roles = get_roles(user, semester)
+        if not user_roles.is_enrolled:
             return self.fail(f"You are not enrolled for {semester}.")
 
         if not project:
             return self.fail(f"You are not enrolled on a project for {semester}.")
 
-        if not project.owner == user and not (
-            enrollment.project == project and enrollment.is_project_lead
-        ):
+        if not project.owner_id == user.pk and not user_roles.leads(project):
             return self.fail(
                 f"You are not the owner or a current project lead of {project} for {semester}."
             )
@@ -267,15 +262,14 @@ class CheckUserIsMentorOrAbove(Check):
     ):
         super().run(user, semester, project)
 
-        try:
-            enrollment = Enrollment.objects.get(user=user, semester=semester)
-        except Enrollment.DoesNotExist:
+        user_roles = get_roles(user, semester)
+        if not user_roles.is_enrolled:
             return self.fail(f"You are not enrolled for {semester}.")
 
-        if (
-            not enrollment.is_mentor
-            and not enrollment.is_coordinator
-            and not enrollment.is_faculty_advisor
+        if not (
+            user_roles.is_mentor
+            or user_roles.is_coordinator
+            or user_roles.is_faculty_advisor
         ):
             return self.fail(
                 f"You are not a Mentor, Coordinator, or Faculty Advisor for {semester}."
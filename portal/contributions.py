@@ -0,0 +1,369 @@
+"""
+Ingests commits, pull requests, and reviews from the GitHub repositories of active projects into
+`WeeklyContribution` rows, so pages showing contributions read a few pre-aggregated rows instead
+of calling GitHub.
+
+Run hourly by the `ingest_github_contributions` task, or with `manage.py ingest_contributions`.
+Each repository keeps a cursor of when it was last ingested:
+
+1. A conditional request for the repository's event feed checks whether anything happened since.
+   Unchanged repositories are skipped without using up any of the rate limit.
+2. Changed repositories are queried in batches, several per GraphQL query, for activity since the
+   start of the week their cursor is in.
+3. Their rows for those weeks are replaced, so ingesting the same activity twice doesn't count it
+   twice.
+
+Pass a `RecordedGitHub` to replay recorded GitHub responses instead of calling GitHub, e.g. in
+tests or to work on this without a token.
+"""
+
+import hashlib
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from requests import RequestException
+
+from portal.models import ProjectRepository, Semester, WeeklyContribution
+from portal.services import github
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10
+"""Repositories per GraphQL query."""
+
+COMMITS_PER_PAGE = 100
+PULL_REQUESTS_PER_PAGE = 50
+REVIEWS_PER_PULL_REQUEST = 50
+"""Reviews past this many on a single pull request aren't counted."""
+
+BACKFILL_WEEKS = 16
+"""How far back to ingest a repository's first time when there is no active semester."""
+
+REPOSITORY_ACTIVITY_FRAGMENT = """
+    r{i}: repository(owner: $owner{i}, name: $name{i}) {{
+        {connections}
+    }}
+"""
+
+COMMITS_CONNECTION = """
+        defaultBranchRef {{
+            target {{
+                ... on Commit {{
+                    history(since: $since{i}, first: {commits_per_page}, after: $commitsAfter{i}) {{
+                        nodes {{
+                            committedDate
+                            author {{
+                                user {{
+                                    login
+                                }}
+                            }}
+                        }}
+                        pageInfo {{
+                            hasNextPage
+                            endCursor
+                        }}
+                    }}
+                }}
+            }}
+        }}
+"""
+
+PULL_REQUESTS_CONNECTION = """
+        pullRequests(first: {pull_requests_per_page}, after: $pullsAfter{i}, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+            nodes {{
+                createdAt
+                updatedAt
+                author {{
+                    login
+                }}
+                reviews(first: {reviews_per_pull_request}) {{
+                    nodes {{
+                        submittedAt
+                        author {{
+                            login
+                        }}
+                    }}
+                }}
+            }}
+            pageInfo {{
+                hasNextPage
+                endCursor
+            }}
+        }}
+"""
+
+
+class GitHub:
+    """Where ingestion gets its data from, the GitHub API unless replaying recordings."""
+
+    def get_events_etag(self, repo_url: str, etag: str) -> str | None:
+        return github.get_repository_events_etag(repo_url, etag)
+
+    def execute(self, query: str, variables: dict) -> dict:
+        return github.execute(query, variables)
+
+
+class RecordedGitHub(GitHub):
+    """Replays GitHub responses recorded to a JSON file, or with `record=True`, calls GitHub and
+    records its responses to the file.
+
+    Responses are keyed by the request that got them, so a replay makes exactly the same requests
+    as its recording as long as the repositories and their cursors are the same.
+    """
+
+    def __init__(self, path: str | Path, record: bool = False):
+        self.path = Path(path)
+        self.record = record
+        self.responses = (
+            {}
+            if record or not self.path.exists()
+            else json.loads(self.path.read_text())
+        )
+
+    def respond(self, request: list, get_response):
+        key = hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+        if self.record:
+            self.responses[key] = get_response()
+            self.path.write_text(json.dumps(self.responses, indent=2))
+        elif key not in self.responses:
+            raise LookupError(f"No recorded response to {request[0]} in {self.path}")
+        return self.responses[key]
+
+    def get_events_etag(self, repo_url: str, etag: str) -> str | None:
+        return self.respond(
+            ["events", repo_url, etag],
+            partial(super().get_events_etag, repo_url, etag),
+        )
+
+    def execute(self, query: str, variables: dict) -> dict:
+        return self.respond(
+            ["graphql", query, variables], partial(super().execute, query, variables)
+        )
+
+
+def get_active_repositories():
+    """Repositories of projects with a team this semester."""
+    semester = Semester.get_active()
+    if semester is None:
+        return ProjectRepository.objects.none()
+    return ProjectRepository.objects.filter(
+        project__enrollments__semester=semester
+    ).distinct()
+
+
+def get_since(repository: ProjectRepository, today: date) -> datetime:
+    """The start of the first week to (re)ingest for the repository."""
+    if repository.contributions_synced_at:
+        first_day = timezone.localdate(repository.contributions_synced_at)
+    else:
+        semester = Semester.get_active()
+        first_day = (
+            semester.start_date if semester else today - timedelta(weeks=BACKFILL_WEEKS)
+        )
+    return timezone.make_aware(
+        datetime.combine(WeeklyContribution.week_of(first_day), time.min)
+    )
+
+
+def build_activity_query(pending: list[dict]) -> tuple[str, dict]:
+    """Builds one GraphQL query for the next page of activity in each pending repository."""
+    declarations = []
+    fragments = []
+    variables = {}
+    for i, state in enumerate(pending):
+        owner, name = github.parse_repository_url(state["repository"].url)
+        declarations += [f"$owner{i}: String!", f"$name{i}: String!"]
+        variables |= {f"owner{i}": owner, f"name{i}": name}
+
+        # GitHub rejects queries declaring variables they don't use
+        connections = []
+        if not state["commits_done"]:
+            connections.append(COMMITS_CONNECTION)
+            declarations += [f"$since{i}: GitTimestamp!", f"$commitsAfter{i}: String"]
+            variables |= {
+                f"since{i}": state["since"].isoformat(),
+                f"commitsAfter{i}": state["commits_after"],
+            }
+        if not state["pulls_done"]:
+            connections.append(PULL_REQUESTS_CONNECTION)
+            declarations.append(f"$pullsAfter{i}: String")
+            variables[f"pullsAfter{i}"] = state["pulls_after"]
+        fragments.append(
+            REPOSITORY_ACTIVITY_FRAGMENT.format(
+                i=i,
+                connections="".join(connections).format(
+                    i=i,
+                    commits_per_page=COMMITS_PER_PAGE,
+                    pull_requests_per_page=PULL_REQUESTS_PER_PAGE,
+                    reviews_per_pull_request=REVIEWS_PER_PULL_REQUEST,
+                ),
+            )
+        )
+
+    query = (
+        f"query RepositoryActivity({', '.join(declarations)}) {{"
+        + "".join(fragments)
+        + "    rateLimit {\n        cost\n        remaining\n    }\n}"
+    )
+    return query, variables
+
+
+def count_page(state: dict, repository_data: dict | None):
+    """Counts one page of a repository's activity into its state and advances its cursors."""
+    since = state["since"]
+    counts: defaultdict[tuple[str, date], Counter] = state["counts"]
+
+    def count(author: dict | None, timestamp: str, kind: str):
+        login = (author or {}).get("login")
+        at = parse_datetime(timestamp)
+        if login and at >= since:
+            week = WeeklyContribution.week_of(timezone.localdate(at))
+            counts[(login, week)][kind] += 1
+
+    if repository_data is None:
+        raise github.GitHubQueryError(f"{state['repository']} not found")
+
+    if not state["commits_done"]:
+        # Empty repositories have no default branch
+        history = ((repository_data["defaultBranchRef"] or {}).get("target") or {}).get(
+            "history"
+        )
+        # Counted by committed rather than authored date since that's what `since` filters by,
+        # otherwise old commits merged late would land in weeks that aren't being replaced
+        for commit in history["nodes"] if history else []:
+            count(
+                (commit["author"] or {}).get("user"), commit["committedDate"], "commits"
+            )
+        state["commits_after"] = history and history["pageInfo"]["endCursor"]
+        state["commits_done"] = not (history and history["pageInfo"]["hasNextPage"])
+
+    if not state["pulls_done"]:
+        pulls = repository_data["pullRequests"]
+        for pull in pulls["nodes"]:
+            count(pull["author"], pull["createdAt"], "pull_requests")
+            for review in pull["reviews"]["nodes"]:
+                if review["submittedAt"]:
+                    count(review["author"], review["submittedAt"], "reviews")
+        # Pull requests are sorted by last update, so the rest haven't been touched since
+        state["pulls_after"] = pulls["pageInfo"]["endCursor"]
+        state["pulls_done"] = not pulls["pageInfo"]["hasNextPage"] or (
+            bool(pulls["nodes"])
+            and parse_datetime(pulls["nodes"][-1]["updatedAt"]) < since
+        )
+
+
+def fetch_activity(source: GitHub, states: list[dict]):
+    """Pages through the activity of the repositories, querying them all at once."""
+    pending = states
+    while pending:
+        query, variables = build_activity_query(pending)
+        data = source.execute(query, variables)
+        logger.debug(f"GitHub activity query cost {data['rateLimit']}")
+
+        for i, state in enumerate(pending):
+            count_page(state, data[f"r{i}"])
+        pending = [s for s in pending if not (s["commits_done"] and s["pulls_done"])]
+
+
+@transaction.atomic
+def save_contributions(state: dict, synced_at: datetime):
+    repository: ProjectRepository = state["repository"]
+    since_week = state["since"].date()
+
+    repository.weekly_contributions.filter(week__gte=since_week).delete()
+    WeeklyContribution.objects.bulk_create(
+        WeeklyContribution(
+            repository=repository,
+            github_username=username,
+            week=week,
+            commits=counts["commits"],
+            pull_requests=counts["pull_requests"],
+            reviews=counts["reviews"],
+        )
+        for (username, week), counts in state["counts"].items()
+    )
+
+    repository.contributions_synced_at = synced_at
+    repository.contributions_etag = state["etag"]
+    repository.save(update_fields=["contributions_synced_at", "contributions_etag"])
+
+
+def start_ingesting(repository: ProjectRepository, etag: str, since: datetime) -> dict:
+    """The state of ingesting a repository, before any of its activity has been fetched."""
+    return {
+        "repository": repository,
+        "etag": etag,
+        "since": since,
+        "commits_after": None,
+        "commits_done": False,
+        "pulls_after": None,
+        "pulls_done": False,
+        "counts": defaultdict(Counter),
+    }
+
+
+def ingest_contributions(repositories=None, source: GitHub | None = None) -> dict:
+    """Ingests the activity since their cursors of `repositories` (the active ones by default).
+
+    Returns
+    -------
+        how many repositories were updated, unchanged, and failed
+    """
+    source = source or GitHub()
+    repositories = get_active_repositories() if repositories is None else repositories
+    synced_at = timezone.now()
+    today = timezone.localdate(synced_at)
+    results = {"updated": 0, "unchanged": 0, "failed": 0}
+
+    changed = []
+    for repository in repositories:
+        if not github.GITHUB_REPO_REGEX.match(repository.url):
+            logger.warning(f"Skipping {repository}, it isn't a GitHub repository")
+            results["failed"] += 1
+            continue
+
+        try:
+            etag = source.get_events_etag(repository.url, repository.contributions_etag)
+        except RequestException:
+            logger.exception(f"Failed to check {repository} for activity")
+            results["failed"] += 1
+            continue
+
+        if etag is None:
+            results["unchanged"] += 1
+        else:
+            changed.append(
+                start_ingesting(repository, etag, get_since(repository, today))
+            )
+
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = changed[start : start + BATCH_SIZE]
+        try:
+            fetch_activity(source, batch)
+        except (RequestException, github.GitHubQueryError):
+            # Retry one at a time so a renamed or deleted repository doesn't hold back the rest
+            logger.warning("Batched activity query failed, retrying individually")
+            retried = [
+                start_ingesting(s["repository"], s["etag"], s["since"]) for s in batch
+            ]
+            batch = []
+            for state in retried:
+                try:
+                    fetch_activity(source, [state])
+                    batch.append(state)
+                except (RequestException, github.GitHubQueryError):
+                    logger.exception(f"Failed to ingest {state['repository']}")
+                    results["failed"] += 1
+
+        for state in batch:
+            save_contributions(state, synced_at)
+            results["updated"] += 1
+
+    return results
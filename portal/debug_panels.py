@@ -0,0 +1,33 @@
+"""Debug toolbar panels, only enabled in development."""
+
+from debug_toolbar.panels import Panel
+
+from portal.nplusone import collect_queries
+
+
+class NPlusOnePanel(Panel):
+    """Lists queries repeated more than `NPLUSONE_THRESHOLD` times and what triggered them."""
+
+    title = "N+1 Queries"
+    template = "portal/debug_toolbar/nplusone.html"
+
+    @property
+    def nav_subtitle(self):
+        problems = self.get_stats().get("problems", [])
+        return f"{len(problems)} repeated" if problems else ""
+
+    def process_request(self, request):
+        # Only shown here, NPlusOneMiddleware logs or raises them depending on NPLUSONE_MODE
+        with collect_queries() as detector:
+            response = super().process_request(request)
+
+        self.record_stats(
+            {
+                "threshold": detector.threshold,
+                "problems": [
+                    {"count": q.count, "sql": q.sql, "locations": q.locations}
+                    for q in detector.get_problems()
+                ],
+            }
+        )
+        return response
@@ -0,0 +1,115 @@
+"""
+Deletes large numbers of rows, like thousands of bot sign-ups, a bounded chunk at a time.
+
+`QuerySet.delete()` collects every related object into memory, sends delete signals for them one
+at a time, and deletes everything in one transaction that holds its locks until the very end.
+`delete_in_chunks()` deletes a queryset's rows in ascending primary key ranges instead, each in a
+short transaction of its own, and reports the last primary key of each chunk so an interrupted
+deletion can pick up where it left off.
+
+Related rows whose delete signals only clear caches are deleted with one query per chunk instead
+of being collected for their signals, with the caches cleared once per chunk (see
+`RAW_CASCADES`). Other related rows cascade as usual, which Django already does with one query
+when they have no signals.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from time import monotonic, sleep
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model, QuerySet
+
+from portal.models import Enrollment, SmallGroup, User
+from portal.roles import forget_roles
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def delete_enrollments_of(user_ids: list[int]) -> dict[str, int]:
+    """Deletes the users' enrollments in one query, clearing the caches their delete signals
+    would have cleared one enrollment at a time."""
+    enrollments = Enrollment.objects.filter(user_id__in=user_ids)
+    user_ids_by_semester = defaultdict(set)
+    for user_id, semester_id in enrollments.values_list("user_id", "semester_id"):
+        user_ids_by_semester[semester_id].add(user_id)
+    if not user_ids_by_semester:
+        return {}
+
+    # What Django itself uses to delete related rows without signals
+    deleted = enrollments._raw_delete(enrollments.db)
+
+    def forget_caches():
+        for semester_id, semester_user_ids in user_ids_by_semester.items():
+            forget_roles(semester_user_ids, semester_id)
+        cache.delete_many(
+            [SmallGroup.members_cache_key(pk) for pk in user_ids_by_semester]
+        )
+
+    transaction.on_commit(forget_caches)
+    return {Enrollment._meta.label: deleted}
+
+
+RAW_CASCADES: dict[type[Model], list[Callable[[list], dict[str, int]]]] = {
+    User: [delete_enrollments_of],
+}
+"""Deletes the related rows of a chunk of a model's primary keys before the chunk itself,
+returning how many they deleted by model label."""
+
+
+@dataclass
+class Chunk:
+    last_pk: int
+    """Pass as `after_pk` to resume after this chunk."""
+    deleted: int
+    """Rows of the queryset's model deleted."""
+    cascaded: dict[str, int]
+    """Related rows deleted, by model label."""
+
+
+def delete_in_chunks(
+    queryset: QuerySet,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    after_pk=None,
+    max_rows_per_second: float | None = None,
+) -> Iterator[Chunk]:
+    """Deletes the queryset's rows with primary keys after `after_pk`, `chunk_size` at a time in
+    ascending order, yielding each chunk once it's committed.
+
+    Rows are re-checked against the queryset as each chunk is deleted, so rows that stopped
+    matching in the meantime are kept. With `max_rows_per_second`, waits between chunks so as not
+    to take up the database.
+    """
+    model = queryset.model
+    raw_cascades = RAW_CASCADES.get(model, [])
+    queryset = queryset.order_by("pk")
+
+    while True:
+        started_at = monotonic()
+        remaining = queryset if after_pk is None else queryset.filter(pk__gt=after_pk)
+        pks = list(remaining.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return
+
+        with transaction.atomic():
+            chunk_pks = list(
+                remaining.filter(pk__lte=pks[-1])
+                .select_for_update()
+                .values_list("pk", flat=True)
+            )
+            cascaded = defaultdict(int)
+            for delete_related in raw_cascades:
+                for label, count in delete_related(chunk_pks).items():
+                    cascaded[label] += count
+            _, deleted_by_model = model.objects.filter(pk__in=chunk_pks).delete()
+
+        deleted = deleted_by_model.pop(model._meta.label, 0)
+        for label, count in deleted_by_model.items():
+            cascaded[label] += count
+        after_pk = pks[-1]
+        yield Chunk(last_pk=after_pk, deleted=deleted, cascaded=dict(cascaded))
+
+        if max_rows_per_second:
+            sleep(max(len(pks) / max_rows_per_second - (monotonic() - started_at), 0))
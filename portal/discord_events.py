@@ -0,0 +1,165 @@
+"""Syncing of meetings to Discord scheduled events in bulk.
+
+Rather than calling Discord whenever a meeting is saved, which doesn't happen for meetings created
+or edited in bulk, the server's events are listed once and compared against every upcoming
+meeting, and only the differences are applied: events are created for published meetings without
+one, fields that changed are updated, and events of unpublished or deleted meetings are deleted.
+
+Run hourly by the `sync_discord_events` task, or for selected meetings from the meetings admin.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from requests import HTTPError, RequestException
+from sentry_sdk import capture_exception
+
+from portal.models import Meeting
+from portal.services import discord
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+RESULTS = {CREATE: "created", UPDATE: "updated", DELETE: "deleted"}
+
+SCHEDULED_EVENT_STATUS = 1
+"""Events that haven't started yet, the only ones Discord lets us reschedule."""
+
+EVENT_TIME_FIELDS = ("scheduled_start_time", "scheduled_end_time")
+
+
+@dataclass
+class EventDelta:
+    """The change needed to bring one Discord event in line with its meeting."""
+
+    action: str
+    meeting: Meeting | None
+    """The meeting, or `None` for an event whose meeting was deleted."""
+    event_id: str = ""
+    params: discord.ServerScheduledEventParams = field(default_factory=dict)
+    """The fields to create or update the event with."""
+
+    def __str__(self) -> str:
+        subject = self.meeting or f"event {self.event_id} of a deleted meeting"
+        if self.action == UPDATE:
+            return f"{subject}: update " + ", ".join(sorted(self.params))
+        return f"{subject}: {self.action}"
+
+
+def is_portal_event(event: discord.ServerScheduledEvent) -> bool:
+    """Whether the portal created the event, going by the meeting link in its description."""
+    return f"{settings.PUBLIC_BASE_URL}/meetings/" in (event.get("description") or "")
+
+
+def diff_event(
+    event: discord.ServerScheduledEvent, expected: discord.ServerScheduledEventParams
+) -> discord.ServerScheduledEventParams:
+    """Returns the expected fields that differ from the event's."""
+    changes: discord.ServerScheduledEventParams = {}
+    for key, value in expected.items():
+        current = event.get(key)
+        if key in EVENT_TIME_FIELDS:
+            # Discord formats times its own way and drops microseconds, so compare them as times
+            same = current is not None and parse_datetime(current).replace(
+                microsecond=0
+            ) == parse_datetime(value).replace(microsecond=0)
+        elif key == "entity_metadata":
+            same = (current or {}).get("location") == value["location"]
+        else:
+            same = (current or "") == value
+        if not same:
+            changes[key] = value
+    return changes
+
+
+def diff_meeting_events(meetings: QuerySet[Meeting] | None = None) -> list[EventDelta]:
+    """Lists the server's events once and returns the changes needed for `meetings` (every
+    upcoming meeting by default).
+
+    When syncing every upcoming meeting, events the portal created for meetings that have since
+    been deleted are deleted too. Meetings that have already started are left alone.
+    """
+    now = timezone.now()
+    events = {event["id"]: event for event in discord.list_server_events()}
+    is_full_sync = meetings is None
+    if meetings is None:
+        meetings = Meeting.objects.all()
+
+    deltas = []
+    for meeting in meetings.filter(starts_at__gt=now).select_related("room"):
+        event = events.get(meeting.discord_event_id)
+        if not meeting.is_published:
+            if meeting.discord_event_id:
+                deltas.append(EventDelta(DELETE, meeting, meeting.discord_event_id))
+        elif event is None:
+            # Never created, or deleted by hand on Discord
+            deltas.append(
+                EventDelta(CREATE, meeting, params=meeting.get_discord_event())
+            )
+        elif changes := diff_event(event, meeting.get_discord_event()):
+            deltas.append(EventDelta(UPDATE, meeting, event["id"], changes))
+
+    if is_full_sync:
+        linked_event_ids = set(
+            Meeting.objects.filter(discord_event_id__in=events.keys()).values_list(
+                "discord_event_id", flat=True
+            )
+        )
+        deltas += [
+            EventDelta(DELETE, None, event_id)
+            for event_id, event in events.items()
+            if event_id not in linked_event_ids
+            and event["status"] == SCHEDULED_EVENT_STATUS
+            and is_portal_event(event)
+        ]
+
+    return deltas
+
+
+def apply_event_delta(delta: EventDelta) -> bool:
+    """Applies an event's change, returning whether it succeeded. Meetings' event IDs are saved
+    with `update()` so syncing doesn't trigger meeting signals."""
+    try:
+        if delta.action == CREATE:
+            event = discord.create_server_event(delta.params)
+            Meeting.objects.filter(pk=delta.meeting.pk).update(
+                discord_event_id=event["id"]
+            )
+        elif delta.action == UPDATE:
+            discord.update_server_event(delta.event_id, delta.params)
+        elif delta.action == DELETE:
+            try:
+                discord.delete_server_event(delta.event_id)
+            except HTTPError as e:
+                # Already gone, just forget it
+                if e.response is None or e.response.status_code != 404:
+                    raise
+            if delta.meeting:
+                Meeting.objects.filter(pk=delta.meeting.pk).update(discord_event_id="")
+    except (HTTPError, RequestException) as e:
+        capture_exception(e)
+        logger.exception(f"Failed to sync Discord event {delta}", exc_info=e)
+        return False
+    return True
+
+
+def sync_meeting_events(meetings: QuerySet[Meeting] | None = None) -> dict:
+    """Syncs the Discord events of `meetings` (every upcoming meeting by default).
+
+    Returns
+    -------
+        how many events were created, updated, deleted, and failed
+    """
+    results = {"created": 0, "updated": 0, "deleted": 0, "failed": 0}
+    for delta in diff_meeting_events(meetings):
+        if apply_event_delta(delta):
+            results[RESULTS[delta.action]] += 1
+        else:
+            results["failed"] += 1
+    return results
@@ -0,0 +1,159 @@
+"""Reconciliation of Discord server members' nicknames and roles with the database.
+
+Rather than calling Discord whenever a user, enrollment, or project is saved, the whole server is
+periodically compared against what the database says each linked member should have, and only the
+differences are applied.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from requests import HTTPError, RequestException
+from sentry_sdk import capture_exception
+
+from portal.models import Enrollment, Organization, Project, Semester, User
+from portal.services import discord
+
+logger = logging.getLogger(__name__)
+
+MAX_NICKNAME_LENGTH = 32
+
+
+@dataclass
+class MemberDelta:
+    """The changes needed to bring one server member in line with the database."""
+
+    user: User
+    discord_user_id: str
+    nickname: str | None = None
+    """The nickname to set, or `None` if it is already correct."""
+    add_roles: set[str] = field(default_factory=set)
+    remove_roles: set[str] = field(default_factory=set)
+
+    def __bool__(self):
+        return bool(self.nickname is not None or self.add_roles or self.remove_roles)
+
+    def __str__(self) -> str:
+        changes = []
+        if self.nickname is not None:
+            changes.append(f"nickname -> {self.nickname!r}")
+        if self.add_roles:
+            changes.append("add roles " + ", ".join(sorted(self.add_roles)))
+        if self.remove_roles:
+            changes.append("remove roles " + ", ".join(sorted(self.remove_roles)))
+        return f"{self.user} ({self.discord_user_id}): " + "; ".join(changes)
+
+
+def get_managed_role_ids(semester: Semester | None) -> set[str]:
+    """Returns the roles the portal is responsible for. Any other roles members have are left alone.
+
+    Project and project lead roles are only managed during a semester, since between semesters
+    nobody is expected to have them and they would be taken from everyone.
+    """
+    role_ids = {
+        settings.DISCORD_VERIFIED_ROLE_ID,
+        *Organization.objects.exclude(discord_role_id="").values_list(
+            "discord_role_id", flat=True
+        ),
+    }
+    if semester:
+        role_ids.add(settings.DISCORD_PROJECT_LEAD_ROLE_ID)
+        role_ids.update(
+            Project.objects.exclude(discord_role_id="").values_list(
+                "discord_role_id", flat=True
+            )
+        )
+    role_ids.discard("")
+    return role_ids
+
+
+def get_expected_roles(semester: Semester | None) -> dict[str, tuple[User, set[str]]]:
+    """Returns each linked user's expected managed roles keyed by their Discord user ID."""
+    expected: dict[str, tuple[User, set[str]]] = {}
+    # Unlinking sets the ID to NULL, but some are still blank
+    linked_users = User.objects.filter(discord_user_id__isnull=False).exclude(
+        discord_user_id=""
+    )
+    for user in linked_users.select_related("organization"):
+        roles = set()
+        if user.is_approved:
+            roles.add(settings.DISCORD_VERIFIED_ROLE_ID)
+        if user.organization and user.organization.discord_role_id:
+            roles.add(user.organization.discord_role_id)
+        expected[user.discord_user_id] = (user, roles)
+
+    if semester:
+        project_roles: dict[str, set[str]] = defaultdict(set)
+        for discord_user_id, project_role_id, is_project_lead in (
+            Enrollment.objects.filter(
+                semester=semester,
+                project__isnull=False,
+                user__discord_user_id__isnull=False,
+            )
+            .exclude(user__discord_user_id="")
+            .values_list(
+                "user__discord_user_id", "project__discord_role_id", "is_project_lead"
+            )
+        ):
+            if project_role_id:
+                project_roles[discord_user_id].add(project_role_id)
+            if is_project_lead:
+                project_roles[discord_user_id].add(
+                    settings.DISCORD_PROJECT_LEAD_ROLE_ID
+                )
+
+        for discord_user_id, roles in project_roles.items():
+            expected[discord_user_id][1].update(roles)
+
+    return expected
+
+
+def diff_server_members() -> list[MemberDelta]:
+    """Pages through every server member and returns the changes needed for members linked to a user.
+
+    Members not linked to any user are skipped, since roles may have been given to them by hand.
+    """
+    semester = Semester.get_active()
+    managed_role_ids = get_managed_role_ids(semester)
+    expected = get_expected_roles(semester)
+
+    deltas = []
+    for member in discord.list_server_members():
+        discord_user_id = member["user"]["id"]
+        if discord_user_id not in expected:
+            continue
+
+        user, expected_roles = expected[discord_user_id]
+        current_roles = set(member["roles"]) & managed_role_ids
+        nickname = user.display_name[:MAX_NICKNAME_LENGTH]
+
+        delta = MemberDelta(
+            user=user,
+            discord_user_id=discord_user_id,
+            nickname=nickname if member.get("nick") != nickname else None,
+            add_roles=expected_roles - current_roles,
+            remove_roles=current_roles - expected_roles,
+        )
+        if delta:
+            deltas.append(delta)
+
+    return deltas
+
+
+def apply_member_delta(delta: MemberDelta) -> bool:
+    """Applies a member's changes, returning whether all of them succeeded."""
+    try:
+        if delta.nickname is not None:
+            discord.set_member_nickname(delta.discord_user_id, delta.nickname)
+        for role_id in delta.add_roles:
+            discord.add_role_to_member(delta.discord_user_id, role_id)
+        for role_id in delta.remove_roles:
+            discord.remove_role_from_member(delta.discord_user_id, role_id)
+    except (HTTPError, RequestException) as e:
+        # e.g. the server owner's nickname can't be changed
+        capture_exception(e)
+        logger.exception(f"Failed to reconcile Discord member {delta}", exc_info=e)
+        return False
+    return True
@@ -0,0 +1,130 @@
+"""
+Per-request counts and timings of SQL queries, cache calls, and calls to external APIs.
+
+`ServerTimingMiddleware` starts collecting timings for each request. Anything else reports
+through `timed()` (or `record()`), which do nothing outside of a request, e.g. in Celery tasks.
+"""
+
+import heapq
+from collections import defaultdict
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from django.core.cache.backends.redis import RedisCache
+
+TOP_QUERIES_KEPT = 10
+
+
+@dataclass
+class Timing:
+    count: int = 0
+    seconds: float = 0.0
+
+
+class RequestTimings:
+    def __init__(self):
+        self.timings: dict[str, Timing] = defaultdict(Timing)
+        self.slowest_queries: list[tuple[float, str]] = []
+        """A min-heap of the slowest (seconds, SQL) executed."""
+        self._active: set[str] = set()
+
+    def record(self, name: str, seconds: float):
+        timing = self.timings[name]
+        timing.count += 1
+        timing.seconds += seconds
+
+    def record_query(self, sql: str, seconds: float):
+        self.record("db", seconds)
+        if len(self.slowest_queries) < TOP_QUERIES_KEPT:
+            heapq.heappush(self.slowest_queries, (seconds, sql))
+        else:
+            heapq.heappushpop(self.slowest_queries, (seconds, sql))
+
+    def get_slowest_queries(self, limit: int) -> list[tuple[float, str]]:
+        return heapq.nlargest(limit, self.slowest_queries)
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def record(name: str, seconds: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.record(name, seconds)
+
+
+@contextmanager
+def timed(name: str):
+    """Times the block under `name` for the current request.
+
+    Nested blocks with the same name (e.g. a cache method calling another) are only counted once.
+    """
+    timings = current_timings.get()
+    if timings is None or name in timings._active:
+        yield
+        return
+
+    timings._active.add(name)
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        timings.record(name, perf_counter() - started_at)
+
+
+def response_hook(name: str) -> Callable:
+    """Returns a `requests` response hook recording how long each response took under `name`."""
+
+    def hook(response, *args, **kwargs):
+        record(name, response.elapsed.total_seconds())
+
+    return hook
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper timing each query for the current request."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started_at = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(sql, perf_counter() - started_at)
+
+
+def _timed_cache_method(name: str):
+    def method(self, *args, **kwargs):
+        with timed("cache"):
+            return getattr(super(InstrumentedRedisCache, self), name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class InstrumentedRedisCache(RedisCache):
+    """Redis cache backend that reports the time spent in each call to the current request.
+
+    `get_or_set` isn't timed itself since it calls `get` and `add`, and timing it would also
+    count however long the default takes to compute.
+    """
+
+    get = _timed_cache_method("get")
+    set = _timed_cache_method("set")
+    add = _timed_cache_method("add")
+    touch = _timed_cache_method("touch")
+    delete = _timed_cache_method("delete")
+    get_many = _timed_cache_method("get_many")
+    set_many = _timed_cache_method("set_many")
+    delete_many = _timed_cache_method("delete_many")
+    has_key = _timed_cache_method("has_key")
+    incr = _timed_cache_method("incr")
+    decr = _timed_cache_method("decr")
+    clear = _timed_cache_method("clear")
@@ -0,0 +1,117 @@
+"""
+Live feed of a meeting's attendance for the people taking it. Every attendance write appends an
+event to the meeting's Redis stream once its transaction commits, and the meeting page follows
+the stream with server-sent events instead of being reloaded and recomputing everything.
+
+Rather than holding a connection open, which would take up one of gunicorn's threads for as long
+as the page is open, each request returns the events written since the last one it saw right
+away and ends. The browser's `EventSource` then reconnects after `RETRY_MILLISECONDS` with the
+ID of the last event, so the page is polled with one stream read each time.
+"""
+
+import json
+import logging
+from typing import TYPE_CHECKING
+
+import redis
+from django.db import transaction
+from django.utils import timezone
+
+from portal.redis_client import get_redis_client
+
+if TYPE_CHECKING:
+    from portal.models import Meeting, User
+
+logger = logging.getLogger(__name__)
+
+STREAM_MAX_LENGTH = 1000
+STREAM_TIMEOUT = 60 * 60 * 24
+"""Streams of meetings with no attendance written for this long are deleted."""
+
+RETRY_MILLISECONDS = 2000
+"""How long browsers wait before asking for new events again."""
+MAX_EVENTS = 100
+"""Events read per request, the rest are sent when the browser reconnects."""
+
+START = "0-0"
+
+
+def stream_key(meeting_id) -> str:
+    return f"attendance_stream:{meeting_id}"
+
+
+def attendance_event(
+    user: "User",
+    action: str,
+    is_verified=False,
+    submitted_by: "User | None" = None,
+) -> dict:
+    """An event for a user's attendance being "added" (submitted or verified) or "removed"."""
+    return {
+        "action": action,
+        "user": {"id": user.pk, "name": str(user), "url": user.get_absolute_url()},
+        "is_verified": is_verified,
+        "submitted_by": str(submitted_by)
+        if submitted_by and submitted_by != user
+        else None,
+        "at": timezone.now().isoformat(),
+    }
+
+
+def publish(meeting: "Meeting", events: list[dict]):
+    """Appends the events to the meeting's stream after the current transaction commits. A failure
+    is only logged, the page still shows the attendance when it's next loaded."""
+
+    def append():
+        try:
+            with get_redis_client().pipeline() as pipeline:
+                for event in events:
+                    pipeline.xadd(
+                        stream_key(meeting.pk),
+                        {"event": json.dumps(event)},
+                        maxlen=STREAM_MAX_LENGTH,
+                        approximate=True,
+                    )
+                pipeline.expire(stream_key(meeting.pk), STREAM_TIMEOUT)
+                pipeline.execute()
+        except redis.RedisError:
+            logger.exception(f"Failed to publish attendance events for {meeting}")
+
+    if events:
+        transaction.on_commit(append)
+
+
+def get_cursor(meeting: "Meeting") -> str:
+    """The ID of the meeting's latest event, to follow the stream from after a page is rendered."""
+    try:
+        latest = get_redis_client().xrevrange(stream_key(meeting.pk), count=1)
+    except redis.RedisError:
+        logger.exception(f"Failed to read attendance stream of {meeting}")
+        return START
+    return latest[0][0].decode() if latest else START
+
+
+def read(meeting_id, after: str, user_ids: frozenset[int] | None = None) -> str:
+    """Returns the meeting's events after the `after` ID as server-sent events, only for the
+    users in `user_ids` if given."""
+    # Tell the browser how long to wait before reconnecting
+    messages = [f"retry: {RETRY_MILLISECONDS}\n\n"]
+    try:
+        response = get_redis_client().xread(
+            {stream_key(meeting_id): after}, count=MAX_EVENTS
+        )
+    except redis.RedisError:
+        logger.exception(f"Failed to read attendance stream of meeting {meeting_id}")
+        return messages[0]
+
+    if response:
+        for event_id, fields in response[0][1]:
+            after = event_id.decode()
+            event = json.loads(fields[b"event"])
+            if user_ids is None or event["user"]["id"] in user_ids:
+                messages.append(
+                    f"id: {after}\nevent: attendance\ndata: {json.dumps(event)}\n\n"
+                )
+        # Moves the browser past events of other users too, without dispatching anything
+        messages.append(f"id: {after}\n\n")
+    return "".join(messages)
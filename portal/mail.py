@@ -0,0 +1,226 @@
+"""
+Email queue, so requests that send email (like magic link logins) don't wait on the email provider.
+
+`QueuedEmailBackend` only pushes messages onto a Redis list once the current transaction commits.
+The `flush_email_queue` task sends them from a Celery worker through `EMAIL_DELIVERY_BACKEND`
+(Mailjet in production), `BATCH_SIZE` at a time over one connection. Messages that fail are sent
+again later with backoff, up to `MAX_ATTEMPTS` times.
+
+Each batch is moved to a processing list while it's sent and only removed once it's sent (or its
+failures are scheduled to be retried), so a worker dying mid-batch doesn't lose it: the next flush
+puts the batch back at the front of the queue. Messages of such a batch that were already sent
+are sent again.
+
+To see queued emails locally, start mailpit from dev-docker-compose.yml and a Celery worker, set
+
+    EMAIL_BACKEND=portal.mail.QueuedEmailBackend
+    EMAIL_DELIVERY_BACKEND=django.core.mail.backends.smtp.EmailBackend
+
+and open http://localhost:8025.
+"""
+
+import base64
+import json
+import logging
+from email.mime.base import MIMEBase
+
+import redis
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from sentry_sdk import capture_message
+
+from portal.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "email_queue"
+SCHEDULED_KEY = "email_queue:scheduled"
+SCHEDULED_TIMEOUT = 60
+"""A flush is scheduled again after this long even if the scheduled one never ran."""
+PROCESSING_KEY = "email_queue:processing"
+LOCK_KEY = "email_queue:lock"
+LOCK_TIMEOUT = 10 * 60
+"""Flushes run one at a time, and a flush whose worker died stops blocking the others after this
+long without finishing a batch."""
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 30
+"""Doubled after each failed attempt."""
+
+
+def serialize(message: EmailMessage) -> dict:
+    """The message as JSON for Celery and Redis."""
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            raise ValueError("Queued emails can't have MIME attachments")
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append([filename, base64.b64encode(content).decode(), mimetype])
+
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "content_subtype": message.content_subtype,
+        "alternatives": [
+            [content, mimetype]
+            for content, mimetype in getattr(message, "alternatives", [])
+        ],
+        "attachments": attachments,
+        "attempts": 0,
+    }
+
+
+def deserialize(payload: dict) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        subject=payload["subject"],
+        body=payload["body"],
+        from_email=payload["from_email"],
+        to=payload["to"],
+        cc=payload["cc"],
+        bcc=payload["bcc"],
+        reply_to=payload["reply_to"],
+        headers=payload["headers"],
+    )
+    message.content_subtype = payload["content_subtype"]
+    for content, mimetype in payload["alternatives"]:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype in payload["attachments"]:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Queues messages to be sent by a Celery worker instead of sending them."""
+
+    def send_messages(self, email_messages) -> int:
+        payloads = [json.dumps(serialize(message)) for message in email_messages]
+        if not payloads:
+            return 0
+
+        def enqueue():
+            from portal import tasks
+
+            try:
+                with get_redis_client().pipeline() as pipeline:
+                    pipeline.rpush(QUEUE_KEY, *payloads)
+                    # Only one flush needs to be waiting at a time
+                    pipeline.set(SCHEDULED_KEY, 1, nx=True, ex=SCHEDULED_TIMEOUT)
+                    _, is_unscheduled = pipeline.execute()
+                if is_unscheduled:
+                    tasks.flush_email_queue.delay()
+            except redis.RedisError:
+                if not self.fail_silently:
+                    raise
+                logger.exception(f"Failed to queue {len(payloads)} email(s)")
+
+        transaction.on_commit(enqueue)
+        return len(payloads)
+
+
+def send_batch(payloads: list[dict]) -> dict:
+    """Sends the messages over one connection, scheduling failed ones to be sent again later.
+
+    Returns
+    -------
+        how many messages were sent, will be retried, and were given up on
+    """
+    failed = []
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Failed to connect to send emails")
+        failed = payloads
+    else:
+        try:
+            for payload in payloads:
+                try:
+                    connection.send_messages([deserialize(payload)])
+                except Exception:
+                    # Each backend raises its own errors (SMTP, Anymail, ...)
+                    logger.exception(f"Failed to send email to {payload['to']}")
+                    failed.append(payload)
+        finally:
+            connection.close()
+
+    for payload in failed:
+        payload["attempts"] += 1
+    retrying = [payload for payload in failed if payload["attempts"] < MAX_ATTEMPTS]
+    given_up = len(failed) - len(retrying)
+    if given_up:
+        capture_message(
+            f"Gave up sending {given_up} email(s) after {MAX_ATTEMPTS} attempts"
+        )
+    if retrying:
+        from portal import tasks
+
+        attempts = min(payload["attempts"] for payload in retrying)
+        tasks.send_emails.apply_async(
+            (retrying,), countdown=RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+        )
+
+    return {
+        "sent": len(payloads) - len(failed),
+        "retrying": len(retrying),
+        "failed": given_up,
+    }
+
+
+def take_batch(client: redis.Redis) -> list[dict]:
+    """Moves up to `BATCH_SIZE` messages from the front of the queue to the processing list."""
+    with client.pipeline() as pipeline:
+        for _ in range(BATCH_SIZE):
+            pipeline.lmove(QUEUE_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+        return [json.loads(payload) for payload in pipeline.execute() if payload]
+
+
+def requeue_unsent(client: redis.Redis) -> int:
+    """Puts a batch left in the processing list by a flush that died back at the front of the
+    queue, in order, returning how many messages it had."""
+    count = 0
+    while client.lmove(PROCESSING_KEY, QUEUE_KEY, "RIGHT", "LEFT"):
+        count += 1
+    return count
+
+
+def flush_queue() -> dict:
+    """Sends every queued message, in batches.
+
+    Returns
+    -------
+        how many messages were sent, will be retried, and were given up on
+    """
+    client = get_redis_client()
+    # Messages queued from now on schedule another flush
+    client.delete(SCHEDULED_KEY)
+
+    results = {"sent": 0, "retrying": 0, "failed": 0}
+    lock = client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    # The flush already running sends the new messages too, and the scheduled flush a minute
+    # later catches any that arrive as it finishes
+    if not lock.acquire(blocking=False):
+        return results
+
+    try:
+        if unsent := requeue_unsent(client):
+            logger.warning(f"Requeued {unsent} email(s) of an interrupted flush")
+
+        while batch := take_batch(client):
+            for key, count in send_batch(batch).items():
+                results[key] += count
+            client.delete(PROCESSING_KEY)
+            lock.reacquire()
+    finally:
+        lock.release()
+    return results
@@ -0,0 +1,159 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = """
+import json, os, sys
+from time import perf_counter
+
+started_at = perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rcos_io.settings")
+from django.conf import settings
+settings.INSTALLED_APPS
+timings = {"settings": perf_counter() - started_at}
+
+step_started_at = perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+timings["app"] = perf_counter() - step_started_at
+
+if sys.argv[1] == "warm":
+    from portal.warmup import warm_up
+    timings.update({"warmup_" + name: seconds for name, seconds in warm_up().items()})
+timings["ready"] = perf_counter() - started_at
+
+from django.test import Client
+client = Client(HTTP_HOST="localhost", REMOTE_ADDR="192.0.2.1")
+for request in ("first_request", "second_request"):
+    step_started_at = perf_counter()
+    status_code = client.get(sys.argv[2], secure=True).status_code
+    timings[request] = perf_counter() - step_started_at
+
+print(json.dumps({"status_code": status_code, "timings": timings}))
+"""
+"""Run in a fresh interpreter so nothing is already imported, connected, or cached."""
+
+SETUP_SCRIPT = """
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rcos_io.settings")
+import django
+django.setup()
+"""
+"""What every management command and Celery worker imports before doing anything."""
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+class Command(BaseCommand):
+    help = "Measure how long a new web process takes to start and serve its first request, with and without warming up (see portal/warmup.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/", help="Path to request (default: /).")
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Processes to start for each of cold and warm (default: 5).",
+        )
+        parser.add_argument(
+            "--imports",
+            type=int,
+            default=15,
+            metavar="N",
+            help="Profile the imports of django.setup() with -X importtime and list the N slowest top-level ones (default: 15, 0 to skip).",
+        )
+        parser.add_argument(
+            "--max-import-ms",
+            type=float,
+            help="Fail if django.setup()'s imports take longer than this.",
+        )
+        parser.add_argument("--json", help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        if options["max_import_ms"] is not None and not options["imports"]:
+            raise CommandError(
+                "--max-import-ms needs import profiling, drop --imports 0."
+            )
+
+        results = {}
+        for mode in ("cold", "warm"):
+            runs = [self.run(mode, options["path"]) for _ in range(options["repeat"])]
+            # Every run measures the same steps, use the median to ignore outliers
+            results[mode] = {
+                step: statistics.median(run["timings"][step] for run in runs) * 1000
+                for step in runs[0]["timings"]
+            }
+
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{mode.capitalize()} start (status {runs[-1]['status_code']})"
+                )
+            )
+            for step, ms in results[mode].items():
+                self.stdout.write(f"  {step:<24} {ms:>8.1f}ms")
+
+        saved_ms = results["cold"]["first_request"] - results["warm"]["first_request"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warming up saves the first request {saved_ms:.1f}ms "
+                f"and takes {results['warm']['ready'] - results['cold']['ready']:.1f}ms."
+            )
+        )
+
+        if options["imports"]:
+            results["imports"] = self.profile_imports(options["imports"])
+
+        if options["json"]:
+            Path(options["json"]).write_text(json.dumps(results, indent=4))
+
+        if (
+            options["max_import_ms"] is not None
+            and results["imports"]["total_ms"] > options["max_import_ms"]
+        ):
+            raise CommandError(
+                f"Imports took {results['imports']['total_ms']:.1f}ms, over the budget of {options['max_import_ms']}ms."
+            )
+
+    def run(self, mode: str, path: str) -> dict:
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, mode, path],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Process failed to start:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def profile_imports(self, limit: int) -> dict:
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", SETUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Process failed to set up:\n{process.stderr}")
+
+        # Top-level imports aren't indented, and their cumulative time includes everything they import
+        top_level = {}
+        for line in process.stderr.splitlines():
+            match = IMPORT_TIME_PATTERN.match(line)
+            if match and not match[3]:
+                top_level[match[4]] = int(match[2]) / 1000
+        total_ms = sum(top_level.values())
+        slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"django.setup() imports ({total_ms:.1f}ms)")
+        )
+        for module, ms in slowest[:limit]:
+            self.stdout.write(f"  {module:<40} {ms:>8.1f}ms")
+
+        return {"total_ms": total_ms, "slowest": dict(slowest[:limit])}
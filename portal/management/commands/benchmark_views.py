@@ -0,0 +1,415 @@
+import json
+import statistics
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.backends.django import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from portal import urls
+from portal.calendar import get_calendar_token
+from portal.models import Meeting, Project, Semester, ShortLink, SmallGroup, User
+
+DEFAULT_BUDGETS_PATH = Path(settings.BASE_DIR) / "stresstests" / "budgets.json"
+
+ROLES = ("anonymous", "student", "mentor", "coordinator", "superuser")
+
+SKIPPED_ROUTES = {
+    # Side effects or calls to external services
+    "impersonate",
+    "loadtest_login",
+    "discord_flow",
+    "github_flow",
+    "discord_flow_callback/",
+    "link_github_callback",
+    "unlink_discord",
+    "unlink_github",
+    "discord_admin_index",
+    "discord_admin_delete_channels",
+    "discord_admin_refresh_channels",
+    "discord_admin_channel_deletion_progress",
+}
+
+CACHE_METHODS = (
+    "get",
+    "set",
+    "add",
+    "delete",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "get_or_set",
+    "has_key",
+    "incr",
+    "decr",
+    "touch",
+)
+
+BUDGET_METRICS = ("queries", "sql_ms", "cache_calls", "template_ms", "wall_ms")
+COUNT_METRICS = ("queries", "cache_calls")
+"""Unlike timings, these are the same on every machine, so tests check them with `--counts-only`."""
+BUDGET_HEADROOM = {
+    "queries": 1,
+    "cache_calls": 1,
+    "sql_ms": 2,
+    "template_ms": 2,
+    "wall_ms": 2,
+}
+"""How much `--update-budgets` multiplies measurements by. Counts are exact, timings are noisy."""
+TIMING_SLACK_MS = 5
+"""Added to timing budgets so views that take a millisecond or two aren't failed by noise."""
+
+
+@dataclass
+class Measurement:
+    status_code: int = 0
+    queries: int = 0
+    sql_ms: float = 0
+    cache_calls: int = 0
+    template_ms: float = 0
+    wall_ms: float = 0
+    over_budget: list[str] = field(default_factory=list)
+
+
+class Instruments:
+    """Counts cache calls and times template rendering while active."""
+
+    def __init__(self):
+        self.cache_calls = 0
+        self.template_seconds = 0.0
+        self._depths = {"cache": 0, "template": 0}
+
+    @contextmanager
+    def outermost(self, kind: str):
+        # Cache methods call each other (e.g. get_or_set calls get) and templates render other
+        # templates, so only the outermost call is counted
+        self._depths[kind] += 1
+        try:
+            yield self._depths[kind] == 1
+        finally:
+            self._depths[kind] -= 1
+
+    @contextmanager
+    def install(self):
+        cache = caches["default"]
+        original_render = Template.render
+        instruments = self
+
+        def wrap_cache_method(method):
+            def wrapper(*args, **kwargs):
+                with instruments.outermost("cache") as is_outermost:
+                    if is_outermost:
+                        instruments.cache_calls += 1
+                    return method(*args, **kwargs)
+
+            return wrapper
+
+        def render(template, *args, **kwargs):
+            with instruments.outermost("template") as is_outermost:
+                started_at = perf_counter()
+                try:
+                    return original_render(template, *args, **kwargs)
+                finally:
+                    if is_outermost:
+                        instruments.template_seconds += perf_counter() - started_at
+
+        for name in CACHE_METHODS:
+            setattr(cache, name, wrap_cache_method(getattr(cache, name)))
+        Template.render = render
+        try:
+            yield self
+        finally:
+            for name in CACHE_METHODS:
+                delattr(cache, name)
+            Template.render = original_render
+
+
+class Command(BaseCommand):
+    help = "Request every portal route as each kind of user and check SQL queries, cache calls, and render times against the checked-in budgets. Run against data from generate_synthetic_data."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budgets",
+            default=str(DEFAULT_BUDGETS_PATH),
+            help="Path to the budgets JSON file.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Measured requests per route and role after one warmup request (default: 5).",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the cache before every request to measure uncached rendering.",
+        )
+        parser.add_argument(
+            "--route", action="append", help="Only benchmark these route names."
+        )
+        parser.add_argument("--role", action="append", choices=ROLES)
+        parser.add_argument(
+            "--counts-only",
+            action="store_true",
+            help="Only check query and cache call counts, not timings, e.g. on CI machines.",
+        )
+        parser.add_argument(
+            "--update-budgets",
+            action="store_true",
+            help="Write the measurements (with headroom) as the new budgets instead of checking them.",
+        )
+        parser.add_argument("--json", help="Also write the full results to this file.")
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(
+                self.style.WARNING(
+                    "DEBUG is on, timings include debug overhead and won't match production."
+                )
+            )
+
+        budgets_path = Path(options["budgets"])
+        budgets = json.loads(budgets_path.read_text()) if budgets_path.exists() else {}
+
+        users = self.get_users()
+        routes = self.get_routes(users)
+        if options["route"]:
+            routes = {
+                name: url for name, url in routes.items() if name in options["route"]
+            }
+        roles = options["role"] or ROLES
+        checked_metrics = COUNT_METRICS if options["counts_only"] else BUDGET_METRICS
+
+        results: dict[str, dict[str, Measurement]] = {}
+        for name, url in routes.items():
+            results[name] = {}
+            for role in roles:
+                if role != "anonymous" and users.get(role) is None:
+                    continue
+                measurement = self.measure(
+                    url, users.get(role), options["repeat"], options["cold"]
+                )
+                budget = {
+                    **budgets.get("default", {}),
+                    **budgets.get(name, {}).get(role, {}),
+                }
+                measurement.over_budget = [
+                    metric
+                    for metric in checked_metrics
+                    if metric in budget
+                    and getattr(measurement, metric) > budget[metric]
+                ]
+                # A view that fails early easily stays within budget, so its status is checked too
+                expected_status = budget.get("status_code")
+                if measurement.status_code >= 500 or (
+                    expected_status is not None
+                    and measurement.status_code != expected_status
+                ):
+                    measurement.over_budget.insert(0, "status_code")
+                results[name][role] = measurement
+                self.report(name, role, measurement, options["update_budgets"])
+
+        if options["json"]:
+            Path(options["json"]).write_text(
+                json.dumps(
+                    {
+                        name: {role: asdict(m) for role, m in by_role.items()}
+                        for name, by_role in results.items()
+                    },
+                    indent=4,
+                )
+            )
+
+        if options["update_budgets"]:
+            self.update_budgets(budgets_path, budgets, results)
+            return
+
+        failures = [
+            f"{name} ({role}): {', '.join(m.over_budget)}"
+            for name, by_role in results.items()
+            for role, m in by_role.items()
+            if m.over_budget
+        ]
+        if failures:
+            raise CommandError("Over budget:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("All views are within budget."))
+
+    def get_users(self) -> dict[str, User | None]:
+        semester = Semester.get_active()
+        if semester is None:
+            raise CommandError(
+                "No active semester, generate data with generate_synthetic_data first."
+            )
+
+        # Each role's conditions go in one filter() so they apply to the same enrollment, the
+        # active semester's, and not to one from another semester
+        return {
+            "student": User.objects.filter(
+                enrollments__semester=semester,
+                enrollments__is_mentor=False,
+                enrollments__is_coordinator=False,
+                enrollments__project__isnull=False,
+            ).first(),
+            "mentor": User.objects.filter(
+                enrollments__semester=semester, enrollments__is_mentor=True
+            ).first(),
+            "coordinator": User.objects.filter(
+                enrollments__semester=semester, enrollments__is_coordinator=True
+            ).first(),
+            "superuser": User.objects.filter(is_superuser=True).first(),
+        }
+
+    def get_routes(self, users: dict[str, User | None]) -> dict[str, str]:
+        """Returns the URL to request for every named portal route, filling in parameters with
+        representative objects from the active semester."""
+        semester = Semester.get_active()
+        student = users["student"]
+        project = (
+            Project.objects.filter(enrollments__semester=semester)
+            .order_by("pk")
+            .first()
+        )
+        meeting = (
+            Meeting.objects.filter(
+                semester=semester,
+                type=Meeting.LARGE_GROUP,
+                starts_at__lte=timezone.now(),
+            )
+            .order_by("-starts_at")
+            .first()
+        )
+        small_group = SmallGroup.objects.filter(semester=semester).first()
+        shortlink = ShortLink.objects.first()
+        now = timezone.now()
+
+        parameters = {
+            "users_detail": (student.pk,) if student else None,
+            "users_enroll": (student.pk,) if student else None,
+            "user_attendance": (student.pk,) if student else None,
+            "projects_detail": (project.slug,) if project else None,
+            "modify_project_team": (project.slug,) if project else None,
+            "edit_project": (project.slug,) if project else None,
+            "projects_add_pitch": (project.slug,) if project else None,
+            "projects_add_proposal": (project.slug,) if project else None,
+            "meetings_detail": (meeting.pk,) if meeting else None,
+            "meeting_attendance_stream": (meeting.pk,) if meeting else None,
+            "export_meeting_attendance": (meeting.pk,) if meeting else None,
+            "meetings_calendar_feed": (get_calendar_token(student),)
+            if student
+            else None,
+            "small_groups_detail": (small_group.pk,) if small_group else None,
+            "shortlink_redirect": (shortlink.code,) if shortlink else None,
+        }
+        query_strings = {
+            "user_attendance": f"?semester={semester.pk}",
+            "modify_project_team": f"?semester={semester.pk}",
+            "meetings_api": f"?start={(now - timezone.timedelta(days=30)).date()}&end={(now + timezone.timedelta(days=30)).date()}",
+        }
+
+        routes = {}
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if pattern.name in SKIPPED_ROUTES:
+                continue
+
+            args = ()
+            if pattern.pattern.converters:
+                args = parameters.get(pattern.name)
+                if args is None:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"Skipping {pattern.name}, no object to request it with"
+                        )
+                    )
+                    continue
+
+            routes[pattern.name] = reverse(pattern.name, args=args) + query_strings.get(
+                pattern.name, ""
+            )
+        return routes
+
+    def measure(self, url: str, user: User | None, repeat: int, cold: bool):
+        # Requests come from an address outside INTERNAL_IPS so the debug toolbar stays off
+        client = Client(
+            HTTP_HOST="localhost",
+            REMOTE_ADDR="192.0.2.1",
+            # Record errors as 500s like any other response
+            raise_request_exception=False,
+        )
+        if user:
+            client.force_login(user)
+
+        # Warm up so imports, template loading, and (unless cold) the cache aren't measured
+        client.get(url, secure=True)
+
+        measurements = []
+        for _ in range(repeat):
+            if cold:
+                caches["default"].clear()
+
+            instruments = Instruments()
+            with instruments.install(), CaptureQueriesContext(connection) as queries:
+                started_at = perf_counter()
+                response = client.get(url, secure=True)
+                wall_seconds = perf_counter() - started_at
+
+            measurements.append(
+                Measurement(
+                    status_code=response.status_code,
+                    queries=len(queries),
+                    sql_ms=sum(float(q["time"]) for q in queries.captured_queries)
+                    * 1000,
+                    cache_calls=instruments.cache_calls,
+                    template_ms=instruments.template_seconds * 1000,
+                    wall_ms=wall_seconds * 1000,
+                )
+            )
+
+        # Counts should be the same every time, timings use the median to ignore outliers
+        return Measurement(
+            status_code=measurements[-1].status_code,
+            queries=max(m.queries for m in measurements),
+            cache_calls=max(m.cache_calls for m in measurements),
+            sql_ms=statistics.median(m.sql_ms for m in measurements),
+            template_ms=statistics.median(m.template_ms for m in measurements),
+            wall_ms=statistics.median(m.wall_ms for m in measurements),
+        )
+
+    def report(self, name: str, role: str, m: Measurement, quiet_budget: bool):
+        line = (
+            f"{name:<40} {role:<12} {m.status_code} "
+            f"{m.queries:>4}q {m.sql_ms:>8.1f}ms sql {m.cache_calls:>4} cache "
+            f"{m.template_ms:>8.1f}ms tpl {m.wall_ms:>8.1f}ms"
+        )
+        if m.over_budget and not quiet_budget:
+            self.stdout.write(
+                self.style.ERROR(line + " OVER: " + ", ".join(m.over_budget))
+            )
+        else:
+            self.stdout.write(line)
+
+    def update_budgets(self, path: Path, budgets: dict, results):
+        for name, by_role in results.items():
+            route_budgets = budgets.setdefault(name, {})
+            for role, m in by_role.items():
+                route_budgets[role] = {"status_code": m.status_code} | {
+                    metric: round(
+                        getattr(m, metric) * BUDGET_HEADROOM[metric] + TIMING_SLACK_MS,
+                        1,
+                    )
+                    if metric.endswith("_ms")
+                    else getattr(m, metric) * BUDGET_HEADROOM[metric]
+                    for metric in BUDGET_METRICS
+                }
+        path.write_text(json.dumps(budgets, indent=4, sort_keys=True) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote budgets to {path}"))
@@ -1,13 +1,11 @@
-from datetime import timedelta
-
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
+from portal.deletion import DEFAULT_CHUNK_SIZE, delete_in_chunks
 from portal.models import User
 
 
 class Command(BaseCommand):
-    help = "Delete all non-verified (unapproved) users that have never logged in and signed up 7+ days ago. Staff and superusers are never deleted."
+    help = "Delete all non-verified (unapproved) users that have never logged in and signed up 7+ days ago, in chunks. Staff and superusers are never deleted."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -20,15 +18,29 @@ class Command(BaseCommand):
             action="store_true",
             help="Skip the confirmation prompt.",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Users to delete per transaction (default: {DEFAULT_CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--after",
+            type=int,
+            metavar="PK",
+            help="Resume an interrupted run, only deleting users with a greater ID than this.",
+        )
+        parser.add_argument(
+            "--max-rate",
+            type=float,
+            metavar="USERS_PER_SECOND",
+            help="Wait between chunks to delete at most this many users per second.",
+        )
 
     def handle(self, *args, **options):
-        unverified_users = User.objects.filter(
-            is_approved=False,
-            is_staff=False,
-            is_superuser=False,
-            last_login__isnull=True,
-            date_joined__lt=timezone.now() - timedelta(days=7),
-        )
+        unverified_users = User.get_unverified()
+        if options["after"] is not None:
+            unverified_users = unverified_users.filter(pk__gt=options["after"])
         count = unverified_users.count()
 
         if count == 0:
@@ -54,7 +66,22 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.NOTICE("Aborted."))
                 return
 
-        deleted_count, _ = unverified_users.delete()
+        deleted_count = 0
+        for chunk in delete_in_chunks(
+            unverified_users,
+            chunk_size=options["chunk_size"],
+            max_rows_per_second=options["max_rate"],
+        ):
+            deleted_count += chunk.deleted
+            cascaded = ", ".join(
+                f"{rows} {label}" for label, rows in chunk.cascaded.items() if rows
+            )
+            self.stdout.write(
+                f"Deleted {deleted_count}/{count} user(s)"
+                + (f" (and {cascaded})" if cascaded else "")
+                + f", resume with --after {chunk.last_pk}"
+            )
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Successfully deleted {deleted_count} unverified user(s)."
@@ -0,0 +1,690 @@
+import csv
+import io
+import json
+import random
+import string
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from portal.models import (
+    Enrollment,
+    Meeting,
+    MeetingAttendance,
+    MeetingAttendanceCode,
+    Project,
+    ProjectPitch,
+    ProjectProposal,
+    ProjectTag,
+    Room,
+    Semester,
+    SmallGroup,
+    User,
+)
+
+SCALES = {
+    "small": {"semesters": 3, "users": 500, "projects": 60},
+    "medium": {"semesters": 6, "users": 5_000, "projects": 500},
+    "large": {"semesters": 10, "users": 20_000, "projects": 2_000},
+}
+
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.rpi.edu"
+"""Generated users' emails use this domain so they can be found and flushed later."""
+SYNTHETIC_SEMESTER_PREFIX = "Synthetic "
+"""Generated semesters' names start with this, since their IDs could be those of real ones."""
+
+TAGS = [
+    "javascript",
+    "typescript",
+    "python",
+    "html",
+    "css",
+    "c",
+    "c++",
+    "rust",
+    "c#",
+    "php",
+    "swift",
+    "r",
+    "golang",
+    "ruby",
+    "sql",
+    "kotlin",
+    "hardware",
+]
+
+WEEKS_PER_SEMESTER = 14
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Generate a large, realistic, deterministic dataset for load testing and benchmarks. The newest generated semester is the active one."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=SCALES.keys(),
+            default="small",
+            help="Preset dataset size (default: small).",
+        )
+        parser.add_argument("--semesters", type=int, help="Override the preset.")
+        parser.add_argument("--users", type=int, help="Override the preset.")
+        parser.add_argument("--projects", type=int, help="Override the preset.")
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, the same seed always generates the same data.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5_000, help="Rows per INSERT."
+        )
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete previously generated data (and the generated semesters, going by their names) first.",
+        )
+        parser.add_argument(
+            "--targets",
+            help="Write the IDs of generated users, projects, meetings, etc. to this JSON file for load tests.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from faker import Faker
+        except ImportError as e:
+            raise CommandError(
+                "Faker is required, install the dev dependencies with `uv sync`."
+            ) from e
+
+        sizes = {
+            key: options[key] or value
+            for key, value in SCALES[options["scale"]].items()
+        }
+        self.rng = random.Random(options["seed"])
+        self.faker = Faker()
+        self.faker.seed_instance(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+
+        semester_dates = self.get_semester_dates(sizes["semesters"])
+
+        if existing_ids := list(
+            Semester.objects.filter(
+                pk__in=[semester_id for semester_id, _, _, _ in semester_dates]
+            )
+            .exclude(name__startswith=SYNTHETIC_SEMESTER_PREFIX)
+            .values_list("pk", flat=True)
+        ):
+            raise CommandError(
+                f"Semesters {', '.join(existing_ids)} already exist. Generated semesters are "
+                "the ones leading up to today, generate data into a database without them."
+            )
+
+        if options["flush"]:
+            self.flush()
+        elif (
+            User.objects.filter(email__endswith="@" + SYNTHETIC_EMAIL_DOMAIN).exists()
+            or Semester.objects.filter(
+                name__startswith=SYNTHETIC_SEMESTER_PREFIX
+            ).exists()
+        ):
+            raise CommandError(
+                "Generated data already exists, pass --flush to replace it."
+            )
+
+        started_at = timezone.now()
+        with transaction.atomic():
+            self.create_rooms_and_tags()
+            self.create_semesters(semester_dates)
+            self.create_users(sizes["users"])
+            self.create_projects(sizes["projects"])
+            self.create_enrollments()
+            self.create_small_groups()
+            self.create_pitches_and_proposals()
+            self.create_meetings()
+            self.create_attendances()
+            self.create_attendance_codes()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated data in {(timezone.now() - started_at).total_seconds():.1f}s"
+            )
+        )
+
+        if options["targets"]:
+            self.write_targets(options["targets"])
+
+    def log(self, message: str):
+        self.stdout.write(f"{message}...")
+
+    def flush(self):
+        self.log("Deleting previously generated data")
+        with transaction.atomic():
+            Semester.objects.filter(name__startswith=SYNTHETIC_SEMESTER_PREFIX).delete()
+            Project.objects.filter(slug__startswith="synthetic-").delete()
+            User.objects.filter(email__endswith="@" + SYNTHETIC_EMAIL_DOMAIN).delete()
+            Room.objects.filter(building="Synthetic Hall").delete()
+
+    def copy_rows(self, model, fields: list[str], rows):
+        """Loads rows with Postgres' COPY, which is much faster than INSERT for the largest tables."""
+        columns = ", ".join(model._meta.get_field(f).column for f in fields)
+        # CSV would otherwise read empty strings as NULL
+        sql = f"COPY {model._meta.db_table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        with connection.cursor() as cursor:
+            for batch in batched(rows, self.batch_size * 10):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    ["\\N" if value is None else value for value in row]
+                    for row in batch
+                )
+                if hasattr(cursor.cursor, "copy"):
+                    # psycopg 3, installed for connection pooling
+                    with cursor.cursor.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+                else:
+                    buffer.seek(0)
+                    cursor.copy_expert(sql, buffer)
+
+    def get_semester_dates(self, count: int) -> list[tuple[str, str, date, date]]:
+        """Returns `(id, name, start date, end date)` for spring/fall semesters, oldest first, ending with one in progress.
+
+        The IDs depend on today's date, so data generated on different days has different semesters.
+        """
+        today = self.now.date()
+        start = today - timedelta(days=30)
+        semesters = []
+        year, month = start.year, (1 if start.month < 7 else 8)
+        for _ in range(count):
+            # Offset the active semester's dates so that it is in progress
+            semester_start = start if not semesters else date(year, month, 25)
+            semester_end = semester_start + timedelta(weeks=WEEKS_PER_SEMESTER + 2)
+            name = f"{SYNTHETIC_SEMESTER_PREFIX}{'Spring' if month == 1 else 'Fall'} {year}"
+            semesters.append((f"{year}{month:02}", name, semester_start, semester_end))
+            year, month = (year, 1) if month == 8 else (year - 1, 8)
+        return list(reversed(semesters))
+
+    def create_rooms_and_tags(self):
+        self.log("Creating rooms and tags")
+        self.rooms = Room.objects.bulk_create(
+            [
+                Room(building="Synthetic Hall", room=str(100 + i), capacity=30 + i * 10)
+                for i in range(12)
+            ]
+        )
+        existing_tags = set(ProjectTag.objects.values_list("name", flat=True))
+        ProjectTag.objects.bulk_create(
+            [ProjectTag(name=tag) for tag in TAGS if tag not in existing_tags]
+        )
+        self.tags = list(ProjectTag.objects.filter(name__in=TAGS))
+
+    def create_semesters(self, semester_dates):
+        self.log(f"Creating {len(semester_dates)} semesters")
+        self.semesters = Semester.objects.bulk_create(
+            [
+                Semester(
+                    id=semester_id,
+                    name=name,
+                    start_date=start_date,
+                    end_date=end_date,
+                    project_pitch_deadline=timezone.make_aware(
+                        datetime.combine(start_date + timedelta(weeks=1), time(23, 59))
+                    ),
+                    project_proposal_deadline=timezone.make_aware(
+                        datetime.combine(start_date + timedelta(weeks=3), time(23, 59))
+                    ),
+                )
+                for semester_id, name, start_date, end_date in semester_dates
+            ]
+        )
+        for semester in self.semesters:
+            semester.rooms.set(self.rooms)
+
+    def create_users(self, count: int):
+        self.log(f"Creating {count} users")
+        # Faker is slow, so draw names from pools instead of generating each one
+        first_names = [self.faker.first_name() for _ in range(500)]
+        last_names = [self.faker.last_name() for _ in range(1000)]
+        current_year = self.now.year
+
+        users = []
+        for i in range(count):
+            rcs_id = f"syn{i:05}"
+            users.append(
+                User(
+                    email=f"{rcs_id}@{SYNTHETIC_EMAIL_DOMAIN}",
+                    password="!",
+                    first_name=self.rng.choice(first_names),
+                    last_name=self.rng.choice(last_names),
+                    role=User.RPI,
+                    rcs_id=rcs_id,
+                    is_approved=self.rng.random() > 0.05,
+                    graduation_year=current_year + self.rng.randint(-4, 4),
+                    is_name_public=self.rng.random() > 0.3,
+                    github_username=f"{rcs_id}-gh" if self.rng.random() > 0.4 else None,
+                )
+            )
+        self.users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        User.objects.filter(pk__in=[u.pk for u in self.users]).update(
+            search_vector=SearchVector("first_name", "last_name", "rcs_id", "email")
+        )
+
+        # An administrator for load tests to use, kept out of enrollments
+        self.admin = User.objects.create(
+            email=f"admin@{SYNTHETIC_EMAIL_DOMAIN}",
+            password="!",
+            first_name="Synthetic",
+            last_name="Admin",
+            is_approved=True,
+            is_staff=True,
+            is_superuser=True,
+        )
+
+    def create_projects(self, count: int):
+        self.log(f"Creating {count} projects")
+        projects = []
+        for i in range(count):
+            name = (
+                f"{self.faker.word().capitalize()} {self.faker.word().capitalize()} {i}"
+            )
+            projects.append(
+                Project(
+                    name=name,
+                    slug=f"synthetic-{slugify(name)}",
+                    owner=self.rng.choice(self.users),
+                    is_approved=self.rng.random() > 0.1,
+                    description=self.faker.paragraph(nb_sentences=5),
+                )
+            )
+        self.projects = Project.objects.bulk_create(
+            projects, batch_size=self.batch_size
+        )
+        Project.objects.filter(pk__in=[p.pk for p in self.projects]).update(
+            search_vector=SearchVector("name", "description")
+        )
+
+        ProjectTags = Project.tags.through
+        ProjectTags.objects.bulk_create(
+            [
+                ProjectTags(project_id=project.pk, projecttag_id=tag.pk)
+                for project in self.projects
+                for tag in self.rng.sample(self.tags, self.rng.randint(1, 3))
+            ],
+            batch_size=self.batch_size,
+        )
+
+        # A few projects are much more popular than the rest
+        self.project_weights = [
+            1 / (rank + 1) ** 0.8 for rank in range(len(self.projects))
+        ]
+
+    def create_enrollments(self):
+        """Students stay in RCOS for a few consecutive semesters and mostly stick with their project."""
+        self.log("Creating enrollments")
+        self.enrollments: dict[str, list[tuple[int, int | None, str]]] = {
+            s.pk: [] for s in self.semesters
+        }
+        """Semester ID to (user ID, project ID, role) for each enrollment."""
+        self.active_projects: dict[str, list[Project]] = {}
+
+        # Each semester only some of the projects are running
+        for semester in self.semesters:
+            active = [
+                project
+                for project in self.projects
+                if project.is_approved and self.rng.random() < 0.35
+            ]
+            self.active_projects[semester.pk] = active or self.projects[:1]
+
+        for user in self.users:
+            first = self.rng.randrange(len(self.semesters))
+            length = min(
+                len(self.semesters) - first, 1 + int(self.rng.expovariate(0.7))
+            )
+            project = None
+            for semester in self.semesters[first : first + length]:
+                active = self.active_projects[semester.pk]
+                if project not in active or self.rng.random() < 0.2:
+                    project = self.rng.choices(
+                        active, weights=self.project_weights[: len(active)]
+                    )[0]
+                self.enrollments[semester.pk].append((user.pk, project.pk, "student"))
+
+        now = self.now.isoformat()
+        rows = []
+        for semester in self.semesters:
+            semester_enrollments = self.enrollments[semester.pk]
+            self.rng.shuffle(semester_enrollments)
+
+            # Assign roles: a few coordinators, ~5% mentors, 1-2 leads per project
+            leads_per_project: dict[int, int] = {}
+            for index, (user_id, project_id, _) in enumerate(semester_enrollments):
+                if index < 3:
+                    role = "coordinator"
+                elif index < 3 + len(semester_enrollments) // 20:
+                    role = "mentor"
+                elif leads_per_project.get(project_id, 0) < self.rng.randint(1, 2):
+                    leads_per_project[project_id] = (
+                        leads_per_project.get(project_id, 0) + 1
+                    )
+                    role = "lead"
+                else:
+                    role = "student"
+                semester_enrollments[index] = (user_id, project_id, role)
+
+                rows.append(
+                    (
+                        now,
+                        now,
+                        semester.pk,
+                        user_id,
+                        project_id,
+                        self.rng.choice((0, 1, 2, 4, 4, 4)),
+                        False,
+                        role == "lead",
+                        role == "coordinator",
+                        role == "mentor",
+                        False,
+                        "",
+                    )
+                )
+
+        self.copy_rows(
+            Enrollment,
+            [
+                "created_at",
+                "updated_at",
+                "semester",
+                "user",
+                "project",
+                "credits",
+                "is_for_pay",
+                "is_project_lead",
+                "is_coordinator",
+                "is_mentor",
+                "is_faculty_advisor",
+                "notes_markdown",
+            ],
+            rows,
+        )
+
+    def create_small_groups(self):
+        self.log("Creating small groups")
+        SmallGroupProjects = SmallGroup.projects.through
+        SmallGroupMentors = SmallGroup.mentors.through
+
+        self.small_groups: dict[str, list[SmallGroup]] = {}
+        group_projects = []
+        group_mentors = []
+        for semester in self.semesters:
+            projects = self.active_projects[semester.pk]
+            mentors = [
+                user_id
+                for user_id, _, role in self.enrollments[semester.pk]
+                if role == "mentor"
+            ]
+            group_count = max(1, len(projects) // 8)
+            groups = SmallGroup.objects.bulk_create(
+                [
+                    SmallGroup(
+                        semester=semester,
+                        name=f"Small Group {i + 1}",
+                        room=self.rooms[i % len(self.rooms)],
+                    )
+                    for i in range(group_count)
+                ]
+            )
+            self.small_groups[semester.pk] = groups
+
+            for index, project in enumerate(projects):
+                group_projects.append(
+                    SmallGroupProjects(
+                        smallgroup_id=groups[index % group_count].pk,
+                        project_id=project.pk,
+                    )
+                )
+            for index, user_id in enumerate(mentors):
+                group_mentors.append(
+                    SmallGroupMentors(
+                        smallgroup_id=groups[index % group_count].pk, user_id=user_id
+                    )
+                )
+
+        SmallGroupProjects.objects.bulk_create(
+            group_projects, batch_size=self.batch_size
+        )
+        SmallGroupMentors.objects.bulk_create(group_mentors, batch_size=self.batch_size)
+
+    def create_pitches_and_proposals(self):
+        self.log("Creating pitches and proposals")
+        active_semester = self.semesters[-1]
+        pitches = []
+        proposals = []
+        for semester in self.semesters:
+            for project in self.active_projects[semester.pk]:
+                if self.rng.random() < 0.8:
+                    pitches.append(
+                        ProjectPitch(
+                            semester=semester,
+                            project=project,
+                            url=f"https://example.com/pitches/{semester.pk}/{project.pk}",
+                        )
+                    )
+                if self.rng.random() < 0.9:
+                    is_graded = semester != active_semester or self.rng.random() < 0.5
+                    proposals.append(
+                        ProjectProposal(
+                            semester=semester,
+                            project=project,
+                            url=f"https://example.com/proposals/{semester.pk}/{project.pk}",
+                            grade=self.rng.randint(60, 99) if is_graded else None,
+                        )
+                    )
+        ProjectPitch.objects.bulk_create(pitches, batch_size=self.batch_size)
+        ProjectProposal.objects.bulk_create(proposals, batch_size=self.batch_size)
+
+    def create_meetings(self):
+        self.log("Creating meetings")
+        meetings = []
+        for semester in self.semesters:
+            students = [user_id for user_id, _, _ in self.enrollments[semester.pk]]
+            for week in range(WEEKS_PER_SEMESTER):
+                monday = semester.start_date + timedelta(
+                    weeks=week, days=-semester.start_date.weekday()
+                )
+
+                def at(day: int, hour: int, monday=monday):
+                    return timezone.make_aware(
+                        datetime.combine(monday + timedelta(days=day), time(hour))
+                    )
+
+                meetings.append(
+                    Meeting(
+                        semester=semester,
+                        type=Meeting.LARGE_GROUP,
+                        starts_at=at(1, 16),
+                        ends_at=at(1, 18),
+                        room=self.rooms[0],
+                        is_published=True,
+                        description_markdown=self.faker.paragraph(),
+                    )
+                )
+                meetings.append(
+                    Meeting(
+                        semester=semester,
+                        type=Meeting.SMALL_GROUP,
+                        starts_at=at(4, 16),
+                        ends_at=at(4, 18),
+                        is_published=True,
+                    )
+                )
+                if week % 2 == 0:
+                    meetings.append(
+                        Meeting(
+                            semester=semester,
+                            type=Meeting.MENTOR,
+                            starts_at=at(0, 18),
+                            ends_at=at(0, 19),
+                            is_published=self.rng.random() < 0.5,
+                        )
+                    )
+                if week % 4 == 0:
+                    meetings.append(
+                        Meeting(
+                            semester=semester,
+                            type=Meeting.COORDINATOR,
+                            starts_at=at(2, 18),
+                            ends_at=at(2, 19),
+                            is_published=False,
+                        )
+                    )
+                for _ in range(self.rng.randint(0, 2)):
+                    meetings.append(
+                        Meeting(
+                            semester=semester,
+                            type=Meeting.WORKSHOP,
+                            name=self.faker.catch_phrase(),
+                            host_id=self.rng.choice(students),
+                            starts_at=at(3, 18),
+                            ends_at=at(3, 19),
+                            room=self.rng.choice(self.rooms),
+                            is_published=self.rng.random() < 0.9,
+                            presentation_url=(
+                                "https://example.com/slides"
+                                if self.rng.random() < 0.7
+                                else ""
+                            ),
+                        )
+                    )
+        self.meetings = Meeting.objects.bulk_create(
+            meetings, batch_size=self.batch_size
+        )
+
+    def create_attendances(self):
+        """Every student has their own reliability, so attendance is skewed like the real thing."""
+        self.log("Creating attendances")
+        reliability = {user.pk: self.rng.betavariate(5, 1.5) for user in self.users}
+        enrollments_by_semester = {
+            semester_id: [(user_id, role) for user_id, _, role in enrollments]
+            for semester_id, enrollments in self.enrollments.items()
+        }
+
+        def rows():
+            now = self.now.isoformat()
+            for meeting in self.meetings:
+                if meeting.starts_at > self.now or not meeting.is_attendance_taken:
+                    continue
+
+                for user_id, role in enrollments_by_semester[meeting.semester_id]:
+                    if meeting.type == Meeting.COORDINATOR:
+                        attends = role == "coordinator"
+                    elif meeting.type == Meeting.MENTOR:
+                        attends = role in ("mentor", "coordinator")
+                    elif meeting.type == Meeting.WORKSHOP:
+                        attends = self.rng.random() < 0.1 * reliability[user_id]
+                    else:
+                        attends = self.rng.random() < reliability[user_id]
+
+                    if attends:
+                        yield (
+                            now,
+                            now,
+                            meeting.pk,
+                            user_id,
+                            self.rng.random() > 0.03,
+                            user_id,
+                        )
+
+        self.copy_rows(
+            MeetingAttendance,
+            [
+                "created_at",
+                "updated_at",
+                "meeting",
+                "user",
+                "is_verified",
+                "submitted_by",
+            ],
+            rows(),
+        )
+
+    def create_attendance_codes(self):
+        """Creates an attendance code for each of the active semester's meetings for load tests to submit."""
+        self.log("Creating attendance codes")
+        active_semester = self.semesters[-1]
+        codes = set()
+        attendance_codes = []
+        for meeting in self.meetings:
+            if meeting.semester_id != active_semester.pk:
+                continue
+            code = "".join(self.rng.choices(string.ascii_uppercase, k=5))
+            if code in codes:
+                continue
+            codes.add(code)
+            attendance_codes.append(MeetingAttendanceCode(code=code, meeting=meeting))
+        self.attendance_codes = MeetingAttendanceCode.objects.bulk_create(
+            attendance_codes, ignore_conflicts=True
+        )
+
+    def write_targets(self, path: str):
+        """Writes a sample of generated objects for load tests to request."""
+        active_semester = self.semesters[-1]
+        enrollments = self.enrollments[active_semester.pk]
+        users_by_pk = {user.pk: user for user in self.users}
+        projects_by_pk = {project.pk: project for project in self.projects}
+
+        def accounts(role: str, limit: int):
+            return [
+                {
+                    "pk": user_id,
+                    "email": users_by_pk[user_id].email,
+                    "rcs_id": users_by_pk[user_id].rcs_id,
+                    "project_slug": projects_by_pk[project_id].slug
+                    if project_id
+                    else None,
+                }
+                for user_id, project_id, enrollment_role in enrollments
+                if enrollment_role == role
+            ][:limit]
+
+        targets = {
+            "semester": active_semester.pk,
+            "users": {
+                "student": accounts("student", 500),
+                "lead": accounts("lead", 100),
+                "mentor": accounts("mentor", 50),
+                "coordinator": accounts("coordinator", 3),
+                "admin": [{"pk": self.admin.pk, "email": self.admin.email}],
+            },
+            "user_ids": [user.pk for user in self.rng.sample(self.users, 200)],
+            "project_slugs": [
+                project.slug
+                for project in self.rng.sample(
+                    self.active_projects[active_semester.pk],
+                    min(200, len(self.active_projects[active_semester.pk])),
+                )
+            ],
+            "meeting_ids": [
+                meeting.pk
+                for meeting in self.meetings
+                if meeting.semester_id == active_semester.pk
+            ],
+            "small_group_ids": [
+                group.pk for group in self.small_groups[active_semester.pk]
+            ],
+            "attendance_codes": [code.code for code in self.attendance_codes],
+        }
+
+        with open(path, "w") as file:
+            json.dump(targets, file, indent=4)
+        self.stdout.write(self.style.SUCCESS(f"Wrote load test targets to {path}"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from portal.contributions import (
+    RecordedGitHub,
+    get_active_repositories,
+    ingest_contributions,
+)
+from portal.models import ProjectRepository
+
+
+class Command(BaseCommand):
+    help = "Ingest GitHub contributions to active projects' repositories since they were last ingested. Runs hourly via Celery beat."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            help="Only ingest the repositories of the project with this slug, active or not.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Forget where ingestion left off and ingest everything again.",
+        )
+        recordings = parser.add_mutually_exclusive_group()
+        recordings.add_argument(
+            "--record",
+            metavar="FILE",
+            help="Record GitHub's responses to this file.",
+        )
+        recordings.add_argument(
+            "--replay",
+            metavar="FILE",
+            help="Replay GitHub's responses from this file instead of calling GitHub.",
+        )
+
+    def handle(self, *args, **options):
+        repositories = None
+        if options["project"]:
+            repositories = ProjectRepository.objects.filter(
+                project__slug=options["project"]
+            )
+        if options["full"]:
+            ProjectRepository.objects.filter(
+                pk__in=(
+                    repositories
+                    if repositories is not None
+                    else get_active_repositories()
+                )
+            ).update(contributions_synced_at=None, contributions_etag="")
+
+        source = None
+        if options["record"] or options["replay"]:
+            source = RecordedGitHub(
+                options["record"] or options["replay"], record=bool(options["record"])
+            )
+
+        results = ingest_contributions(repositories, source)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {results['updated']} repositories, {results['unchanged']} unchanged, {results['failed']} failed."
+            )
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from portal.discord_reconcile import apply_member_delta, diff_server_members
+
+
+class Command(BaseCommand):
+    help = "Bring every linked Discord server member's nickname and roles in line with the database. Runs nightly via Celery beat."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the changes that would be made without making them.",
+        )
+
+    def handle(self, *args, **options):
+        deltas = diff_server_members()
+
+        if not deltas:
+            self.stdout.write(
+                self.style.SUCCESS("All Discord members are up to date. Nothing to do.")
+            )
+            return
+
+        for delta in deltas:
+            self.stdout.write(str(delta))
+
+        if options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"[DRY RUN] Would update {len(deltas)} Discord member(s)."
+                )
+            )
+            return
+
+        failed = [delta for delta in deltas if not apply_member_delta(delta)]
+        for delta in failed:
+            self.stdout.write(self.style.ERROR(f"Failed: {delta}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {len(deltas) - len(failed)} Discord member(s), {len(failed)} failed."
+            )
+        )
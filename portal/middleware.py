@@ -0,0 +1,250 @@
+import logging
+from contextlib import (
+    AbstractContextManager,
+    ExitStack,
+    asynccontextmanager,
+    contextmanager,
+)
+from time import perf_counter, time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from portal import nplusone, routers
+from portal.instrumentation import RequestTimings, current_timings, query_wrapper
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def on_sync_thread(context_manager: AbstractContextManager):
+    """Enters a context manager on the thread the request's sync code runs on. Database
+    connections belong to a thread, so under ASGI their query wrappers have to be installed on the
+    thread that runs the queries rather than on the event loop's."""
+    value = await sync_to_async(context_manager.__enter__)()
+    try:
+        yield value
+    except BaseException as e:
+        if not await sync_to_async(context_manager.__exit__)(
+            type(e), e, e.__traceback__
+        ):
+            raise
+    else:
+        await sync_to_async(context_manager.__exit__)(None, None, None)
+
+
+@contextmanager
+def timing_queries():
+    with ExitStack() as stack:
+        for alias in settings.DATABASES:
+            stack.enter_context(connections[alias].execute_wrapper(query_wrapper))
+        yield
+
+
+class ServerTimingMiddleware:
+    """
+    Counts and times the SQL queries, cache calls, and Discord/GitHub calls made while handling
+    each request. They are reported in the `Server-Timing` header (visible in the browser's
+    network tab) and as log fields, and requests slower than `SLOW_REQUEST_THRESHOLD_MS`
+    are logged as warnings along with their slowest queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, stay async so async views don't get run on a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started_at = perf_counter()
+        try:
+            with timing_queries():
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.report(request, response, timings, started_at)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started_at = perf_counter()
+        try:
+            async with on_sync_thread(timing_queries()):
+                response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.report(request, response, timings, started_at)
+
+    def report(self, request, response, timings: RequestTimings, started_at: float):
+        total_ms = (perf_counter() - started_at) * 1000
+
+        metrics = [
+            f'{name};dur={timing.seconds * 1000:.1f};desc="{timing.count}"'
+            for name, timing in sorted(timings.timings.items())
+        ]
+        metrics.append(f"total;dur={total_ms:.1f}")
+        response["Server-Timing"] = ", ".join(metrics)
+
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": request.resolver_match.view_name
+            if request.resolver_match
+            else None,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 1),
+            **{
+                f"{name}_{unit}": value
+                for name, timing in timings.timings.items()
+                for unit, value in (
+                    ("count", timing.count),
+                    ("ms", round(timing.seconds * 1000, 1)),
+                )
+            },
+        }
+
+        if total_ms >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            slowest_queries = "\n".join(
+                f"  {seconds * 1000:.1f}ms {sql}"
+                for seconds, sql in timings.get_slowest_queries(
+                    settings.SLOW_REQUEST_LOGGED_QUERIES
+                )
+            )
+            logger.warning(
+                f"Slow request {request.method} {request.path} took {total_ms:.0f}ms"
+                + (f", slowest queries:\n{slowest_queries}" if slowest_queries else ""),
+                extra=fields,
+            )
+        else:
+            logger.debug(
+                f"{request.method} {request.path} took {total_ms:.0f}ms", extra=fields
+            )
+
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Checks every request for N+1 queries according to `NPLUSONE_MODE`, logging them in "warn"
+    mode and raising `NPlusOneError` in "strict" mode.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_MODE not in nplusone.MODES:
+            raise ImproperlyConfigured(
+                f"NPLUSONE_MODE must be one of {', '.join(nplusone.MODES)}"
+            )
+        if settings.NPLUSONE_MODE == nplusone.OFF:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def detect_n_plus_one(self, request):
+        return nplusone.detect_n_plus_one(
+            strict=settings.NPLUSONE_MODE == nplusone.STRICT,
+            description=f"{request.method} {request.path}",
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with self.detect_n_plus_one(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with on_sync_thread(self.detect_n_plus_one(request)):
+            return await self.get_response(request)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pins users to the primary database for `REPLICA_STICKINESS_SECONDS` after they submit
+    something, so views served from the replica don't show them stale data.
+    """
+
+    cookie_name = "primary_until"
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        return self.process_response(request, await self.get_response(request))
+
+    def process_request(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            pinned_until = 0
+        request.pinned_to_primary = pinned_until > time()
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            response.set_cookie(
+                self.cookie_name,
+                str(time() + settings.REPLICA_STICKINESS_SECONDS),
+                max_age=settings.REPLICA_STICKINESS_SECONDS,
+                httponly=True,
+                samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise's middleware with an async path. WhiteNoise's own is sync-only, which under ASGI
+    makes Django run every middleware and view after it, async views included, on a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Opens the file
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("portal", "0051_alter_meeting_host_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shortlink",
+            name="click_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="How many times the link has been followed (periodically flushed from the cache)",
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("portal", "0053_meeting_portal_meet_updated_8e1b48_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectrepository",
+            name="contributions_etag",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="ETag of the repository's GitHub event feed when contributions were last ingested",
+                max_length=200,
+            ),
+        ),
+        migrations.AddField(
+            model_name="projectrepository",
+            name="contributions_synced_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When contributions were last ingested from GitHub",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="WeeklyContribution",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("github_username", models.CharField(max_length=200)),
+                ("week", models.DateField(help_text="The Monday the week starts on")),
+                ("commits", models.PositiveIntegerField(default=0)),
+                (
+                    "pull_requests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="pull requests opened"
+                    ),
+                ),
+                (
+                    "reviews",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="pull request reviews"
+                    ),
+                ),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="weekly_contributions",
+                        to="portal.projectrepository",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-week", "github_username"],
+                "indexes": [
+                    models.Index(
+                        fields=["github_username", "week"],
+                        name="portal_week_github__2dd000_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("repository", "week", "github_username"),
+                        name="unique_weekly_contribution",
+                    )
+                ],
+            },
+        ),
+    ]
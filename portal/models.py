@@ -1,9 +1,11 @@
+import asyncio
 import logging
 import re
 from collections import defaultdict
+from datetime import date, timedelta
 from decimal import Decimal
-from time import sleep
-from typing import Optional
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Optional
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
@@ -11,20 +13,25 @@ from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.mail import send_mail
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Manager, Q
-from django.db.models.functions import Lower
-from django.db.models.signals import post_save, pre_save
+from django.db import models, transaction
+from django.db.models import Manager, Q, Sum
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.template.defaultfilters import slugify
 from django.urls import reverse
 from django.utils import formats, timezone
-from gql import Client
 from requests import HTTPError
 from sentry_sdk import capture_exception
 
+from portal import live_attendance, roles
+from portal.redis_client import get_redis_client
 from portal.services import discord, github
 
+if TYPE_CHECKING:
+    from gql import Client
+
 logger = logging.getLogger(__name__)
 
 
@@ -204,10 +211,50 @@ class Organization(TimestampedModel):
                 discord.add_role_to_member(user.discord_user_id, self.discord_role_id)
                 sleep(1)
 
+    EMAIL_DOMAINS_CACHE_KEY = "organization_email_domains"
+
+    @classmethod
+    def get_email_domains(cls) -> dict[str, "Organization"]:
+        """Organizations by their (lowercase) email domains, cached until one is saved or
+        deleted. Load it once to look up many emails, e.g. when importing users."""
+
+        def get_domains():
+            domains = {}
+            # The oldest organization wins if two share a domain
+            for organization in cls.objects.exclude(
+                email_domain="", email_domain_secondary=""
+            ).order_by("-pk"):
+                for domain in (
+                    organization.email_domain,
+                    organization.email_domain_secondary,
+                ):
+                    if domain:
+                        domains[domain.lower()] = organization
+            return domains
+
+        return cache.get_or_set(cls.EMAIL_DOMAINS_CACHE_KEY, get_domains, 60 * 60 * 24)
+
+    @classmethod
+    def for_email(
+        cls, email: str, domains: dict[str, "Organization"] | None = None
+    ) -> Optional["Organization"]:
+        """The organization with the email's domain, if any."""
+        if domains is None:
+            domains = cls.get_email_domains()
+        return domains.get(email.rpartition("@")[2].lower())
+
     def __str__(self) -> str:
         return self.name
 
 
+def clear_organization_email_domains_cache(*args, **kwargs):
+    cache.delete(Organization.EMAIL_DOMAINS_CACHE_KEY)
+
+
+post_save.connect(clear_organization_email_domains_cache, sender=Organization)
+post_delete.connect(clear_organization_email_domains_cache, sender=Organization)
+
+
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
@@ -370,35 +417,18 @@ class User(AbstractUser, TimestampedModel):
             .first()
         )
 
-    def is_mentor(self, semester=None):
-        if semester is None:
-            active_enrollment = self.get_active_enrollment()
-            return active_enrollment and active_enrollment.is_mentor
+    def get_roles(self, semester=None) -> "roles.RoleSnapshot":
+        """The user's roles in the semester, or the active semester by default."""
+        return roles.get_roles(self, semester or cache.get("active_semester"))
 
-        return self.enrollments.filter(
-            is_mentor=True,
-            semester=semester,
-        ).exists()
+    def is_mentor(self, semester=None):
+        return self.get_roles(semester).is_mentor
 
     def is_coordinator(self, semester=None):
-        if semester is None:
-            active_enrollment = self.get_active_enrollment()
-            return active_enrollment and active_enrollment.is_coordinator
-
-        return self.enrollments.filter(
-            is_coordinator=True,
-            semester=semester,
-        ).exists()
+        return self.get_roles(semester).is_coordinator
 
     def is_faculty_advisor(self, semester=None):
-        if semester is None:
-            active_enrollment = self.get_active_enrollment()
-            return active_enrollment and active_enrollment.is_faculty_advisor
-
-        return self.enrollments.filter(
-            is_faculty_advisor=True,
-            semester=semester,
-        ).exists()
+        return self.get_roles(semester).is_faculty_advisor
 
     @property
     def discord_mention(self):
@@ -437,9 +467,16 @@ class User(AbstractUser, TimestampedModel):
                 capture_exception(e)
 
         if not sent:
-            # Send backup email
-            # TODO: send_mail
-            pass
+            # Send backup email, queued in production so this doesn't wait on it
+            try:
+                send_mail(
+                    "New message from RCOS IO",
+                    message_content,
+                    None,
+                    [self.email],
+                )
+            except Exception as e:
+                capture_exception(e)
 
     def get_active_semesters(self):
         return (
@@ -465,6 +502,18 @@ class User(AbstractUser, TimestampedModel):
             except Exception as e:
                 capture_exception(e)
 
+    @classmethod
+    def get_unverified(cls):
+        """Users who signed up over a week ago, never logged in, and were never approved, most
+        likely bots. Never includes staff or superusers."""
+        return cls.objects.filter(
+            is_approved=False,
+            is_staff=False,
+            is_superuser=False,
+            last_login__isnull=True,
+            date_joined__lt=timezone.now() - timedelta(days=7),
+        )
+
     def get_absolute_url(self):
         return reverse("users_detail", args=[str(self.pk)])
 
@@ -503,27 +552,23 @@ def pre_save_user(instance, sender, *args, **kwargs):
             instance.is_approved = True
             instance.rcs_id = instance.email.removesuffix("@rpi.edu").lower()
 
-        # Search for org with matching email domain
-        email_domain = instance.email.split("@")[1]
-        try:
-            instance.organization = Organization.objects.get(
-                Q(email_domain=email_domain) | Q(email_domain_secondary=email_domain)
-            )
+        # Search for org with matching email domain, unless one was already found (e.g. by an
+        # importer with `Organization.get_email_domains()`)
+        organization = instance.organization or Organization.for_email(instance.email)
+        if organization:
+            instance.organization = organization
             instance.is_approved = True
 
-            if instance.discord_user_id and instance.organization.discord_role_id:
-                try:
-                    discord.add_role_to_member(
-                        instance.discord_user_id, instance.organization.discord_role_id
-                    )
-                except HTTPError as e:
-                    capture_exception(e)
-                    logger.exception(
-                        f"Failed to add org Discord role for {instance.organization} to {instance}",
-                        exc_info=e,
+            if instance.discord_user_id and organization.discord_role_id:
+                # Not worth holding up the save for, and only once the user really exists
+                from portal import tasks
+
+                discord_user_id = instance.discord_user_id
+                transaction.on_commit(
+                    lambda: tasks.add_discord_role.delay(
+                        discord_user_id, organization.discord_role_id
                     )
-        except Organization.DoesNotExist:
-            pass
+                )
 
 
 pre_save.connect(pre_save_user, sender=User)
@@ -778,7 +823,7 @@ class Project(TimestampedModel):
     def get_absolute_url(self):
         return reverse("projects_detail", kwargs={"slug": self.slug})
 
-    def get_repositories(self, client: Client):
+    def get_repositories(self, client: "Client"):
         repositories = []
         for repo in self.repositories.all():
             cache_key = f"github_repo:{repo.pk}"
@@ -790,6 +835,32 @@ class Project(TimestampedModel):
 
         return repositories
 
+    async def aget_repositories(self):
+        """Async version of `get_repositories` that fetches uncached repositories concurrently.
+        Repositories that fail to load are left out instead of failing the rest."""
+        repos = [repo async for repo in self.repositories.all()]
+        cache_keys = {repo.pk: f"github_repo:{repo.pk}" for repo in repos}
+        cached = await cache.aget_many(cache_keys.values())
+
+        missing = [repo for repo in repos if cache_keys[repo.pk] not in cached]
+        results = await asyncio.gather(
+            *(github.aget_repository_details(repo.url) for repo in missing),
+            return_exceptions=True,
+        )
+        fetched = {}
+        for repo, result in zip(missing, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch repository {repo.url}: {result}")
+            else:
+                fetched[cache_keys[repo.pk]] = result["repository"]
+        await cache.aset_many(fetched, 60 * 60)
+
+        return [
+            cached[key] if key in cached else fetched[key]
+            for key in cache_keys.values()
+            if key in cached or key in fetched
+        ]
+
     def get_semester_team(self, semester: Semester):
         """Fetches enrollments for a given semester with user data eagerly loaded via select_related."""
         return (
@@ -844,6 +915,20 @@ class ProjectRepository(TimestampedModel):
     )
     url = models.URLField(help_text="URL of GitHub repository")
 
+    # Where contribution ingestion left off, see portal/contributions.py
+    contributions_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When contributions were last ingested from GitHub",
+    )
+    contributions_etag = models.CharField(
+        max_length=200,
+        blank=True,
+        editable=False,
+        help_text="ETag of the repository's GitHub event feed when contributions were last ingested",
+    )
+
     @property
     def short_name(self):
         return self.url.lower().lstrip("https://github.com/")
@@ -852,6 +937,68 @@ class ProjectRepository(TimestampedModel):
         return self.url
 
 
+class WeeklyContributionQuerySet(models.QuerySet):
+    TOTALS = {
+        "commit_count": Coalesce(Sum("commits"), 0),
+        "pull_request_count": Coalesce(Sum("pull_requests"), 0),
+        "review_count": Coalesce(Sum("reviews"), 0),
+    }
+
+    def during(self, semester: Semester):
+        return self.filter(
+            week__gte=WeeklyContribution.week_of(semester.start_date),
+            week__lte=semester.end_date,
+        )
+
+    def totals(self) -> dict[str, int]:
+        """Sums up contributions, e.g. `{"commit_count": 3, "pull_request_count": 1, "review_count": 0}`."""
+        return self.aggregate(**self.TOTALS)
+
+    def totals_by(self, field: str) -> dict:
+        """Sums up contributions for each value of `field`, in one query."""
+        return {
+            row.pop(field): row
+            for row in self.order_by().values(field).annotate(**self.TOTALS)
+        }
+
+
+class WeeklyContribution(TimestampedModel):
+    """How much a GitHub user contributed to a project repository in a week. Rows are written
+    by `portal.contributions.ingest_contributions` and keyed by GitHub username rather than user,
+    so contributors who haven't linked their account yet are counted once they do."""
+
+    repository = models.ForeignKey(
+        ProjectRepository,
+        on_delete=models.CASCADE,
+        related_name="weekly_contributions",
+    )
+    github_username = models.CharField(max_length=200)
+    week = models.DateField(help_text="The Monday the week starts on")
+
+    commits = models.PositiveIntegerField(default=0)
+    pull_requests = models.PositiveIntegerField("pull requests opened", default=0)
+    reviews = models.PositiveIntegerField("pull request reviews", default=0)
+
+    objects: Manager["WeeklyContribution"] = WeeklyContributionQuerySet.as_manager()
+
+    @staticmethod
+    def week_of(day: date) -> date:
+        return day - timedelta(days=day.weekday())
+
+    def __str__(self) -> str:
+        return f"{self.github_username} - {self.repository} - week of {self.week}"
+
+    class Meta:
+        ordering = ["-week", "github_username"]
+        indexes = [models.Index(fields=["github_username", "week"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["repository", "week", "github_username"],
+                name="unique_weekly_contribution",
+            )
+        ]
+
+
 class ProjectPitch(TimestampedModel):
     semester = models.ForeignKey(
         Semester, on_delete=models.CASCADE, related_name="project_pitches"
@@ -1102,6 +1249,12 @@ class Enrollment(TimestampedModel):
         get_latest_by = ["semester"]
 
 
+def forget_enrollment_roles(sender, instance: "Enrollment", *args, **kwargs):
+    roles.forget_roles([instance.user_id], instance.semester_id)
+
+
+post_save.connect(forget_enrollment_roles, sender=Enrollment)
+post_delete.connect(forget_enrollment_roles, sender=Enrollment)
 # post_save.connect(sync_discord, sender=Enrollment)
 
 
@@ -1211,6 +1364,22 @@ class Meeting(TimestampedModel):
         through_fields=("meeting", "user"),
     )
 
+    PUBLIC_VISIBILITY = "public"
+    STUDENT_VISIBILITY = "student"
+    MENTOR_VISIBILITY = "mentor"
+    COORDINATOR_VISIBILITY = "coordinator"
+    VISIBILITIES = (
+        PUBLIC_VISIBILITY,
+        STUDENT_VISIBILITY,
+        MENTOR_VISIBILITY,
+        COORDINATOR_VISIBILITY,
+    )
+    """The classes of users that see the same set of meetings."""
+
+    DELETED_CACHE_KEY = "deleted_meetings"
+    DELETED_RETENTION = timezone.timedelta(days=30)
+    """How long deleted meetings are remembered for incremental syncs."""
+
     objects = models.Manager()
 
     public = PublicManager()
@@ -1281,11 +1450,7 @@ class Meeting(TimestampedModel):
         query = {"meeting": self}
 
         if small_group:
-            small_group_user_ids = (
-                small_group.get_users().values_list("pk", flat=True)
-                if small_group
-                else None
-            )
+            small_group_user_ids = small_group.get_user_ids()
             expected_users = expected_users.filter(pk__in=small_group_user_ids)
             query["user__in"] = small_group_user_ids
 
@@ -1319,10 +1484,25 @@ class Meeting(TimestampedModel):
         }
 
     def get_small_group_attendance_ratios(self):
+        """Each small group's share of its expected users with verified attendance, worked out
+        from the cached memberships with one query for all groups instead of several each."""
+        members_by_group = SmallGroup.get_members_by_group(self.semester_id)
+        expected_ids = set(self.expected_attendance_users.values_list("pk", flat=True))
+        attended_ids = set(
+            MeetingAttendance.objects.filter(
+                meeting=self, is_verified=True
+            ).values_list("user_id", flat=True)
+        )
+
         small_groups = {}
         for small_group in SmallGroup.objects.filter(semester_id=self.semester_id):
-            attendance_data = self.get_attendance_data(small_group)
-            small_groups[small_group.name] = attendance_data["attendance_ratio"]
+            members = members_by_group.get(small_group.pk, frozenset())
+            expected_count = len(members & expected_ids)
+            small_groups[small_group.name] = (
+                len(members & attended_ids) / expected_count
+                if expected_count > 0
+                else 0
+            )
 
         return small_groups
 
@@ -1342,13 +1522,22 @@ class Meeting(TimestampedModel):
     def get_absolute_url(self):
         return reverse("meetings_detail", args=[str(self.id)])
 
-    def sync_discord(self, is_deleted=False):
-        description = f"""**{self.get_type_display()} Meeting**
-
-        View details: {settings.PUBLIC_BASE_URL}/meetings/{self.pk}
-        {f'Slides: {self.presentation_url}' if self.presentation_url else ''}
-        """
+    def get_discord_event(self) -> discord.ServerScheduledEventParams:
+        """The Discord scheduled event this meeting should have, see portal/discord_events.py."""
+        description = f"**{self.get_type_display()} Meeting**\n\nView details: {settings.PUBLIC_BASE_URL}{self.get_absolute_url()}"
+        if self.presentation_url:
+            description += f"\nSlides: {self.presentation_url}"
+        return {
+            "name": self.display_name,
+            "description": description,
+            "scheduled_start_time": self.starts_at.isoformat(),
+            "scheduled_end_time": self.ends_at.isoformat(),
+            "entity_metadata": {"location": str(self.room) if self.room else "Discord"},
+        }
 
+    def sync_discord(self, is_deleted=False):
+        """Creates, updates, or deletes this meeting's Discord event right away. Meetings are
+        normally synced in bulk by the `sync_discord_events` task instead."""
         try:
             if is_deleted:
                 discord.delete_server_event(self.discord_event_id)
@@ -1357,23 +1546,12 @@ class Meeting(TimestampedModel):
             else:
                 if self.is_ongoing or self.is_upcoming:
                     if not self.discord_event_id and self.is_published:
-                        event = discord.create_server_event(
-                            name=self.display_name,
-                            scheduled_start_time=self.starts_at.isoformat(),
-                            scheduled_end_time=self.ends_at.isoformat(),
-                            description=description,
-                            location=str(self.room),
-                        )
+                        event = discord.create_server_event(self.get_discord_event())
                         self.discord_event_id = event["id"]
                         self.save()
                     elif self.discord_event_id and self.is_published:
                         discord.update_server_event(
-                            self.discord_event_id,
-                            name=self.display_name,
-                            scheduled_start_time=self.starts_at.isoformat(),
-                            scheduled_end_time=self.ends_at.isoformat(),
-                            description=description,
-                            location=str(self.room),
+                            self.discord_event_id, self.get_discord_event()
                         )
                     elif self.discord_event_id and not self.is_published:
                         discord.delete_server_event(self.discord_event_id)
@@ -1385,41 +1563,214 @@ class Meeting(TimestampedModel):
     def __str__(self) -> str:
         return f"{self.display_name} - {formats.date_format(timezone.localtime(self.starts_at), 'D M j Y @ P')}"
 
+    @classmethod
+    def get_visibility(cls, user) -> str:
+        """Returns which class of meetings (one of `VISIBILITIES`) the user can see."""
+        if not user.is_authenticated:
+            return cls.PUBLIC_VISIBILITY
+
+        if user.is_superuser:
+            return cls.COORDINATOR_VISIBILITY
+
+        user_roles = user.get_roles()
+        if user_roles.is_coordinator:
+            return cls.COORDINATOR_VISIBILITY
+        if user_roles.is_mentor:
+            return cls.MENTOR_VISIBILITY
+        return cls.STUDENT_VISIBILITY
+
+    @classmethod
+    def get_visibility_queryset(cls, visibility: str):
+        if visibility == cls.COORDINATOR_VISIBILITY:
+            return cls.objects.all()
+        if visibility == cls.MENTOR_VISIBILITY:
+            return cls.objects.exclude(is_published=False, type=Meeting.COORDINATOR)
+        if visibility == cls.STUDENT_VISIBILITY:
+            return cls.objects.exclude(
+                is_published=False, type__in=(Meeting.MENTOR, Meeting.COORDINATOR)
+            )
+        return cls.public.all()
+
     @classmethod
     def get_user_queryset(cls, user):
-        if user.is_authenticated:
-            active_enrollment = user.get_active_enrollment()
-            queryset = cls.objects
-            if user.is_superuser or (
-                active_enrollment and active_enrollment.is_coordinator
-            ):
-                pass
-            elif active_enrollment and active_enrollment.is_mentor:
-                queryset = queryset.exclude(
-                    is_published=False, type=Meeting.COORDINATOR
-                )
-            else:
-                queryset = queryset.exclude(
-                    is_published=False, type__in=(Meeting.MENTOR, Meeting.COORDINATOR)
-                )
-        else:
-            queryset = cls.public
+        return cls.get_visibility_queryset(cls.get_visibility(user))
 
-        return queryset
+    @staticmethod
+    def ics_cache_key(visibility: str):
+        return f"meetings_ics:{visibility}"
+
+    @classmethod
+    def get_deleted_since(cls, since) -> list[int] | None:
+        """Returns the IDs of meetings deleted after `since`, or `None` if that is further back than we remember."""
+        if timezone.now() - since > cls.DELETED_RETENTION:
+            return None
+        return [
+            pk
+            for pk, deleted_at in cache.get(cls.DELETED_CACHE_KEY, [])
+            if deleted_at > since
+        ]
 
     class Meta:
         ordering = ["starts_at"]
         get_latest_by = ["starts_at"]
+        indexes = [
+            models.Index(fields=["updated_at"]),
+        ]
+
+
+def clear_meetings_ics_cache(sender, instance, *args, **kwargs):
+    cache.delete_many([Meeting.ics_cache_key(v) for v in Meeting.VISIBILITIES])
+
+
+def remember_deleted_meeting(sender, instance: Meeting, *args, **kwargs):
+    now = timezone.now()
+    deleted = [
+        (pk, deleted_at)
+        for pk, deleted_at in cache.get(Meeting.DELETED_CACHE_KEY, [])
+        if now - deleted_at < Meeting.DELETED_RETENTION
+    ]
+    deleted.append((instance.pk, now))
+    cache.set(Meeting.DELETED_CACHE_KEY, deleted, None)
+
+
+post_save.connect(clear_meetings_ics_cache, sender=Meeting)
+post_delete.connect(clear_meetings_ics_cache, sender=Meeting)
+post_delete.connect(remember_deleted_meeting, sender=Meeting)
 
 
 # post_save.connect(sync_discord, sender=Meeting)
 # post_delete.connect(sync_discord_on_delete, sender=Meeting)
 
 
+def failed_verification_cache_key(user_id) -> str:
+    """Marks users who failed attendance verification, so their next attendances need verifying too."""
+    return f"failed-verification:{user_id}"
+
+
+FAILED_VERIFICATION_TIMEOUT = 60 * 60 * 24 * 30 * 3  # 3 months
+
+
 class MeetingAttendanceManager(models.Manager):
     def get_queryset(self) -> models.QuerySet:
         return super().get_queryset().select_related("user")
 
+    def verify_many(
+        self, meeting: "Meeting", users: list[User], submitted_by: User
+    ) -> dict[int, str]:
+        """Adds verified attendances for the users (and an attendance for the submitter), enrolling
+        them in the meeting's semester if they aren't yet, in a fixed number of queries.
+
+        Returns
+        -------
+            each user's result by ID: "added", "verified", or "already verified"
+        """
+        if not users:
+            return {}
+
+        user_ids = [user.pk for user in users]
+        was_verified = dict(
+            self.filter(
+                meeting=meeting, user_id__in=[*user_ids, submitted_by.pk]
+            ).values_list("user_id", "is_verified")
+        )
+
+        Enrollment.objects.bulk_create(
+            [
+                Enrollment(user_id=pk, semester_id=meeting.semester_id)
+                for pk in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+        # Bulk creating doesn't send the signals that would
+        roles.forget_roles(user_ids, meeting.semester_id)
+        # Inserts missing attendances and verifies existing ones in one statement
+        self.bulk_create(
+            [
+                MeetingAttendance(
+                    meeting=meeting,
+                    user_id=pk,
+                    is_verified=True,
+                    submitted_by=submitted_by,
+                )
+                for pk in user_ids
+            ],
+            update_conflicts=True,
+            unique_fields=["meeting", "user"],
+            update_fields=["is_verified", "updated_at"],
+        )
+        cache.delete_many([failed_verification_cache_key(pk) for pk in user_ids])
+
+        changed = [user for user in users if not was_verified.get(user.pk)]
+        if submitted_by.pk not in user_ids and submitted_by.pk not in was_verified:
+            # Whoever is taking attendance is at the meeting too
+            self.bulk_create(
+                [
+                    MeetingAttendance(
+                        meeting=meeting, user=submitted_by, submitted_by=submitted_by
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+            changed.append(submitted_by)
+
+        live_attendance.publish(
+            meeting,
+            [
+                live_attendance.attendance_event(
+                    user, "added", is_verified=True, submitted_by=submitted_by
+                )
+                for user in changed
+            ],
+        )
+
+        return {
+            pk: "added"
+            if pk not in was_verified
+            else "already verified"
+            if was_verified[pk]
+            else "verified"
+            for pk in user_ids
+        }
+
+    def remove_many(
+        self, meeting: "Meeting", users: list[User], deny=False
+    ) -> dict[int, str]:
+        """Removes the users' attendances, and with `deny`, marks them as having failed
+        verification so their next attendances need verifying.
+
+        Returns
+        -------
+            each user's result by ID: "denied", "removed", or "not found" if there was nothing
+            to remove
+        """
+        if not users:
+            return {}
+
+        user_ids = [user.pk for user in users]
+        attendances = self.filter(meeting=meeting, user_id__in=user_ids)
+        had_attendance = set(attendances.values_list("user_id", flat=True))
+        attendances.delete()
+
+        if deny:
+            cache.set_many(
+                {failed_verification_cache_key(pk): 1 for pk in user_ids},
+                FAILED_VERIFICATION_TIMEOUT,
+            )
+
+        live_attendance.publish(
+            meeting,
+            [
+                live_attendance.attendance_event(user, "removed")
+                for user in users
+                if user.pk in had_attendance
+            ],
+        )
+
+        return {
+            pk: "denied" if deny else "removed" if pk in had_attendance else "not found"
+            for pk in user_ids
+        }
+
 
 class MeetingAttendance(TimestampedModel):
     meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE)
@@ -1541,13 +1892,36 @@ class SmallGroup(TimestampedModel):
             semester_id=self.semester_id, project__in=self.projects.all()
         ).select_related("user", "project")
 
+    @staticmethod
+    def members_cache_key(semester_id) -> str:
+        return f"small_group_members:{semester_id}"
+
+    @classmethod
+    def get_members_by_group(cls, semester_id) -> dict[int, frozenset[int]]:
+        """The IDs of the users on each small group's projects in the semester, by small group ID.
+        Cached until a small group's projects or an enrollment in the semester changes."""
+
+        def get_members():
+            members = defaultdict(set)
+            for small_group_id, user_id in Enrollment.objects.filter(
+                semester_id=semester_id,
+                project__small_groups__semester_id=semester_id,
+            ).values_list("project__small_groups", "user_id"):
+                members[small_group_id].add(user_id)
+            return {pk: frozenset(user_ids) for pk, user_ids in members.items()}
+
+        return cache.get_or_set(
+            cls.members_cache_key(semester_id), get_members, 60 * 60 * 24
+        )
+
+    def get_user_ids(self) -> frozenset[int]:
+        return self.get_members_by_group(self.semester_id).get(self.pk, frozenset())
+
     def get_users(self):
-        return User.objects.filter(enrollments__in=self.get_enrollments())
+        return User.objects.filter(pk__in=self.get_user_ids())
 
     def has_user(self, user):
-        return self.projects.filter(
-            enrollments__user=user, enrollments__semester=self.semester
-        ).exists()
+        return user.pk in self.get_user_ids()
 
     def __str__(self) -> str:
         return self.display_name
@@ -1556,6 +1930,37 @@ class SmallGroup(TimestampedModel):
         ordering = ["semester", Lower("name"), "room"]
 
 
+def forget_small_group_members(sender, instance, *args, **kwargs):
+    cache.delete(SmallGroup.members_cache_key(instance.semester_id))
+
+
+def forget_small_group_members_on_projects_changed(
+    sender, instance, action, reverse, pk_set, *args, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if isinstance(instance, SmallGroup):
+        semester_ids = {instance.semester_id}
+    else:
+        # Changed from the project's side, find the small groups it was added to or removed from
+        semester_ids = set(
+            SmallGroup.objects.filter(
+                Q(pk__in=pk_set or ()) | Q(projects=instance)
+            ).values_list("semester_id", flat=True)
+        )
+    cache.delete_many([SmallGroup.members_cache_key(pk) for pk in semester_ids])
+
+
+post_save.connect(forget_small_group_members, sender=SmallGroup)
+post_delete.connect(forget_small_group_members, sender=SmallGroup)
+post_save.connect(forget_small_group_members, sender=Enrollment)
+post_delete.connect(forget_small_group_members, sender=Enrollment)
+m2m_changed.connect(
+    forget_small_group_members_on_projects_changed, sender=SmallGroup.projects.through
+)
+
+
 class MeetingAttendanceCode(TimestampedModel):
     code = models.CharField(max_length=20, primary_key=True)
     meeting = models.ForeignKey(
@@ -1663,9 +2068,60 @@ class StatusUpdateSubmission(TimestampedModel):
         ordering = ["created_at"]
 
 
+_shortlink_urls: dict[str, tuple[str, float]] = {}
+"""In-process cache of short link code -> (destination URL, expiry) to skip Redis on hot links."""
+
+
 class ShortLink(TimestampedModel):
+    URL_CACHE_TIMEOUT = 60 * 60 * 24
+    MISSING_CACHE_TIMEOUT = 60
+    """Unknown codes are remembered for this long so repeated misses (e.g. crawlers) skip the database."""
+    LOCAL_CACHE_TIMEOUT = 60
+    """Kept short since other workers' in-process caches can't be invalidated on update."""
+
+    CLICKS_KEY = "shortlink_clicks"
+    """Redis hash of code -> clicks since the last flush."""
+    FLUSHING_CLICKS_KEY = "shortlink_clicks:flushing"
+    """Where `tasks.flush_shortlink_clicks` moves the hash while it's being flushed."""
+
     code = models.CharField(max_length=20, primary_key=True)
     url = models.URLField()
+    click_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="How many times the link has been followed (periodically flushed from the cache)",
+    )
+
+    @staticmethod
+    def url_cache_key(code: str):
+        return f"shortlink:{code}"
+
+    @classmethod
+    def resolve(cls, code: str) -> str | None:
+        """Returns the destination URL for a code, checking the in-process cache, then Redis, then the database."""
+        now = monotonic()
+        local = _shortlink_urls.get(code)
+        if local and local[1] > now:
+            return local[0]
+
+        url = cache.get(cls.url_cache_key(code))
+        if url is None:
+            url = cls.objects.filter(code=code).values_list("url", flat=True).first()
+            if url is None:
+                # Creating the link replaces this right away, see `warm_shortlink_cache`
+                cache.set(cls.url_cache_key(code), "", cls.MISSING_CACHE_TIMEOUT)
+                return None
+            cache.set(cls.url_cache_key(code), url, cls.URL_CACHE_TIMEOUT)
+        elif not url:
+            return None
+
+        _shortlink_urls[code] = (url, now + cls.LOCAL_CACHE_TIMEOUT)
+        return url
+
+    @classmethod
+    def record_click(cls, code: str):
+        """Counts a click in Redis. Counts are moved into the database by `tasks.flush_shortlink_clicks`."""
+        get_redis_client().hincrby(cls.CLICKS_KEY, code, 1)
 
     def __str__(self) -> str:
         return f"{settings.PUBLIC_BASE_URL}/{self.code}"
@@ -1674,3 +2130,21 @@ class ShortLink(TimestampedModel):
         indexes = [
             models.Index(fields=["code"]),
         ]
+
+
+def warm_shortlink_cache(sender, instance: ShortLink, created, *args, **kwargs):
+    cache.set(
+        ShortLink.url_cache_key(instance.code),
+        instance.url,
+        ShortLink.URL_CACHE_TIMEOUT,
+    )
+    _shortlink_urls.pop(instance.code, None)
+
+
+def clear_shortlink_cache(sender, instance: ShortLink, *args, **kwargs):
+    cache.delete(ShortLink.url_cache_key(instance.code))
+    _shortlink_urls.pop(instance.code, None)
+
+
+post_save.connect(warm_shortlink_cache, sender=ShortLink)
+post_delete.connect(clear_shortlink_cache, sender=ShortLink)
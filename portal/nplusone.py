@@ -0,0 +1,151 @@
+"""
+Detects N+1 queries: the same shape of query run over and over while handling one request,
+usually from a template or loop following a relation per object instead of using
+`select_related`/`prefetch_related`.
+
+Enabled for every request with the `NPLUSONE_MODE` setting ("warn" logs them, "strict" raises
+`NPlusOneError` so tests and `benchmark_views` fail), shown in the debug toolbar in development,
+and usable anywhere with `detect_n_plus_one()`:
+
+    with detect_n_plus_one(strict=True):
+        client.get(url)
+"""
+
+import logging
+import re
+import sys
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+WARN = "warn"
+STRICT = "strict"
+MODES = (OFF, WARN, STRICT)
+
+PORTAL_DIR = Path(__file__).resolve().parent
+LOCATIONS_KEPT = 3
+
+STRING_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_PATTERN = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql: str) -> str:
+    """Reduces a query to its shape so queries differing only in their parameters match."""
+    sql = STRING_LITERAL_PATTERN.sub("?", sql)
+    sql = NUMBER_LITERAL_PATTERN.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    return IN_LIST_PATTERN.sub("IN (...)", sql)
+
+
+def get_trigger_location() -> str:
+    """Finds the innermost template tag and portal code that led to the current query."""
+    template_location = code_location = None
+    frame = sys._getframe(1)
+    while frame and not (template_location and code_location):
+        node = frame.f_locals.get("self")
+        if template_location is None and isinstance(node, Node) and node.origin:
+            template_location = (
+                f"{node.origin.template_name or node.origin.name}:{node.token.lineno}"
+            )
+
+        path = Path(frame.f_code.co_filename)
+        if (
+            code_location is None
+            and path.is_relative_to(PORTAL_DIR)
+            and path.name != "nplusone.py"
+            and path.name != "instrumentation.py"
+        ):
+            code_location = f"{path.relative_to(PORTAL_DIR.parent)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return " from ".join(filter(None, (template_location, code_location))) or "unknown"
+
+
+@dataclass
+class RepeatedQuery:
+    sql: str
+    """The first query seen with this shape."""
+    count: int = 0
+    locations: list[str] = field(default_factory=list)
+
+    def __str__(self):
+        return f"{self.count}x {self.sql}\n    at " + "\n    at ".join(self.locations)
+
+
+class QueryDetector:
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.queries: dict[tuple[str, str], RepeatedQuery] = {}
+
+    def record(self, alias: str, sql: str):
+        key = (alias, fingerprint(sql))
+        query = self.queries.get(key)
+        if query is None:
+            query = self.queries[key] = RepeatedQuery(sql)
+        query.count += 1
+
+        # Finding the location walks the stack, so only do it for queries that look repeated
+        if query.count > 1 and len(query.locations) < LOCATIONS_KEPT:
+            location = get_trigger_location()
+            if location not in query.locations:
+                query.locations.append(location)
+
+    def get_problems(self) -> list[RepeatedQuery]:
+        return sorted(
+            (q for q in self.queries.values() if q.count > self.threshold),
+            key=lambda q: q.count,
+            reverse=True,
+        )
+
+    def wrapper_for(self, alias: str):
+        def wrapper(execute, sql, params, many, context):
+            self.record(alias, sql)
+            return execute(sql, params, many, context)
+
+        return wrapper
+
+
+@contextmanager
+def collect_queries(threshold: int | None = None) -> Iterator[QueryDetector]:
+    """Records the shape of every query run inside the block."""
+    detector = QueryDetector(
+        settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+    )
+    with ExitStack() as stack:
+        for alias in settings.DATABASES:
+            stack.enter_context(
+                connections[alias].execute_wrapper(detector.wrapper_for(alias))
+            )
+        yield detector
+
+
+@contextmanager
+def detect_n_plus_one(
+    threshold: int | None = None, strict: bool = False, description: str = ""
+) -> Iterator[QueryDetector]:
+    """Logs (or with `strict`, raises `NPlusOneError` for) any query shape run more than
+    `threshold` times inside the block."""
+    with collect_queries(threshold) as detector:
+        yield detector
+
+    if problems := detector.get_problems():
+        message = (
+            f"Repeated queries{' in ' + description if description else ''}:\n"
+            + "\n".join(map(str, problems))
+        )
+        if strict:
+            raise NPlusOneError(message)
+        logger.warning(message)
@@ -0,0 +1,17 @@
+"""
+Shared plain Redis client for what Django's cache can't do, like counting short link clicks in a
+hash, the email queue's lists, and attendance streams. One client, so one connection pool, per
+process.
+"""
+
+import redis
+from django.conf import settings
+
+_client: redis.Redis | None = None
+
+
+def get_redis_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
@@ -0,0 +1,122 @@
+"""
+What a user is in a semester (enrolled, Faculty Advisor, Coordinator, Mentor, project lead),
+read from their enrollment once and cached until the enrollment changes, so authorization
+checks across the portal don't each query enrollments.
+
+    roles = get_roles(request.user, meeting.semester_id)
+    if roles.can_manage_attendance(meeting):
+        ...
+
+Enrollment saves and deletes clear the cache through signals (see portal/models.py). Code that
+changes enrollments without them, like `QuerySet.update()` and `bulk_create()`, has to call
+`forget_roles()` itself.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from django.core.cache import cache
+
+if TYPE_CHECKING:
+    from portal.models import Meeting, Project, Semester, User
+
+ROLES_CACHE_TIMEOUT = 60 * 60 * 24
+
+ENROLLMENT_ROLE_FIELDS = (
+    "is_faculty_advisor",
+    "is_coordinator",
+    "is_mentor",
+    "is_project_lead",
+    "project_id",
+)
+
+
+@dataclass(frozen=True)
+class RoleSnapshot:
+    user_id: int | None = None
+    semester_id: str | None = None
+    is_superuser: bool = False
+    is_enrolled: bool = False
+    is_faculty_advisor: bool = False
+    is_coordinator: bool = False
+    is_mentor: bool = False
+    is_project_lead: bool = False
+    project_id: int | None = None
+
+    @property
+    def is_mentor_or_above(self) -> bool:
+        return (
+            self.is_superuser
+            or self.is_faculty_advisor
+            or self.is_coordinator
+            or self.is_mentor
+        )
+
+    def leads(self, project: "Project") -> bool:
+        return self.is_project_lead and self.project_id == project.pk
+
+    def hosts(self, meeting: "Meeting") -> bool:
+        return self.user_id is not None and meeting.host_id == self.user_id
+
+    def can_manage_attendance(self, meeting: "Meeting") -> bool:
+        from portal.models import Meeting
+
+        if self.is_superuser or self.hosts(meeting):
+            return True
+        # Mentors can manage general meeting attendance except mentor and coordinator meetings
+        return self.is_mentor and meeting.type not in (
+            Meeting.MENTOR,
+            Meeting.COORDINATOR,
+        )
+
+
+def roles_cache_key(user_id, semester_id) -> str:
+    return f"roles:{user_id}:{semester_id}"
+
+
+def get_roles(user: "User", semester: "Semester | str | None") -> RoleSnapshot:
+    """The user's roles in the semester (a semester or its ID). Anonymous users and a `None`
+    semester have none, though superusers are always superusers."""
+    if not user.is_authenticated:
+        return RoleSnapshot()
+
+    semester_id = getattr(semester, "pk", semester)
+    if semester_id is None:
+        return RoleSnapshot(user_id=user.pk, is_superuser=user.is_superuser)
+
+    # Checked several times a request, so also remembered on the user
+    memo = getattr(user, "_roles", None)
+    if memo is None:
+        memo = user._roles = {}
+    if semester_id not in memo:
+
+        def get_enrollment_roles():
+            from portal.models import Enrollment
+
+            # Cached as False rather than None so not being enrolled is cached too
+            return (
+                Enrollment.objects.filter(user_id=user.pk, semester_id=semester_id)
+                .values(*ENROLLMENT_ROLE_FIELDS)
+                .first()
+                or False
+            )
+
+        enrollment_roles = cache.get_or_set(
+            roles_cache_key(user.pk, semester_id),
+            get_enrollment_roles,
+            ROLES_CACHE_TIMEOUT,
+        )
+        memo[semester_id] = RoleSnapshot(
+            user_id=user.pk,
+            semester_id=semester_id,
+            # Read from the user every time so it's never out of date
+            is_superuser=user.is_superuser,
+            is_enrolled=bool(enrollment_roles),
+            **(enrollment_roles or {}),
+        )
+    return memo[semester_id]
+
+
+def forget_roles(user_ids, semester_id):
+    """Clears the cached roles of the users in the semester after their enrollments change."""
+    cache.delete_many([roles_cache_key(user_id, semester_id) for user_id in user_ids])
@@ -0,0 +1,89 @@
+"""
+Sends reads to the read replica (the `replica` database, configured by `PGREPLICA_HOST`) from
+views and reports that opt in with `@replica_view` or `use_replica()`. Everything else, and all
+writes, use the primary.
+
+Replicas lag slightly behind the primary, so after a user submits something they're pinned to
+the primary for `REPLICA_STICKINESS_SECONDS` by `ReplicaStickinessMiddleware` and see their own
+changes.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.response import SimpleTemplateResponse
+
+REPLICA = "replica"
+
+reading_from_replica: ContextVar[bool] = ContextVar(
+    "reading_from_replica", default=False
+)
+
+
+def replica_configured() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Reads inside the block go to the replica if there is one."""
+    token = reading_from_replica.set(enabled and replica_configured())
+    try:
+        yield
+    finally:
+        reading_from_replica.reset(token)
+
+
+def replica_view(view):
+    """Serves GET and HEAD requests to a view from the replica, unless the user recently
+    submitted something and should see it. Works with sync and async views."""
+
+    def should_use_replica(request) -> bool:
+        return request.method in ("GET", "HEAD") and not getattr(
+            request, "pinned_to_primary", False
+        )
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with use_replica(should_use_replica(request)):
+                response = await view(request, *args, **kwargs)
+                if isinstance(response, SimpleTemplateResponse):
+                    await sync_to_async(response.render)()
+                return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replica(should_use_replica(request)):
+            response = view(request, *args, **kwargs)
+            # Template responses are lazy, render them while still reading from the replica
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+            return response
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Reads inside a transaction need to see what it has written
+        if reading_from_replica.get() and not connections["default"].in_atomic_block:
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases have the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
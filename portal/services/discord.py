@@ -1,25 +1,239 @@
-from typing import Any, NotRequired, TypedDict, cast
+import asyncio
+import logging
+import re
+import threading
+from collections.abc import Iterator
+from datetime import datetime
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, NotRequired, TypedDict, cast
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from portal.instrumentation import response_hook
+from portal.services import http
+
+if TYPE_CHECKING:
+    import httpx
 
 DISCORD_VERSION_NUMBER = "10"
 DISCORD_API_ENDPOINT = f"https://discord.com/api/v{DISCORD_VERSION_NUMBER}"
 
-DISCORD_OAUTH2_URL = (
-    "https://discord.com/api/oauth2/authorize"
-    f"?client_id={settings.DISCORD_CLIENT_ID}&redirect_uri={settings.DISCORD_REDIRECT_URL}"
-    "&response_type=code&scope=identify%20guilds.join&prompt=consent"
+
+def get_oauth2_url() -> str:
+    """The URL to send users to for them to authorize linking their Discord account."""
+    return (
+        "https://discord.com/api/oauth2/authorize"
+        f"?client_id={settings.DISCORD_CLIENT_ID}&redirect_uri={settings.DISCORD_REDIRECT_URL}"
+        "&response_type=code&scope=identify%20guilds.join&prompt=consent"
+    )
+
+
+def get_headers() -> dict[str, str]:
+    """
+    Base headers to send along with Discord API requests.
+    Most important is the `Authorization` header with the Discord bot's secret token
+    which authenticates requests and gives us permission to do things as the bot.
+    """
+    return {"Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}"}
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Tracks Discord's rate limit buckets so concurrent requests wait only as long as Discord requires.
+
+    Discord reports which bucket a route belongs to and how many requests it has left in the
+    `X-RateLimit-*` response headers. Requests to a route with an exhausted bucket wait for
+    the bucket to reset, and a global 429 pauses every request. Any other 429 pauses requests to
+    its route (including the retry) for as long as Discord asks.
+
+    See https://discord.com/developers/docs/topics/rate-limits
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._route_buckets: dict[str, str] = {}
+        self._buckets: dict[str, tuple[int, float]] = {}
+        """Bucket ID to (remaining requests, monotonic time the bucket resets)."""
+        self._global_reset_at = 0.0
+
+    def _reserve(self, route: str) -> float:
+        """Takes a request from the route's bucket, or returns how long to wait for one."""
+        with self._lock:
+            now = monotonic()
+            delay = self._global_reset_at - now
+            bucket = self._route_buckets.get(route)
+            if delay <= 0 and bucket in self._buckets:
+                remaining, reset_at = self._buckets[bucket]
+                if reset_at <= now:
+                    # Bucket has reset, the next response will tell us the new limit
+                    del self._buckets[bucket]
+                elif remaining > 0:
+                    self._buckets[bucket] = (remaining - 1, reset_at)
+                else:
+                    delay = reset_at - now
+            return max(delay, 0)
+
+    def acquire(self, route: str):
+        """Blocks until a request to the route can be made without being rate limited."""
+        while delay := self._reserve(route):
+            sleep(delay)
+
+    async def aacquire(self, route: str):
+        """Waits until a request to the route can be made without being rate limited."""
+        while delay := self._reserve(route):
+            await asyncio.sleep(delay)
+
+    def update(
+        self, route: str, response: "requests.Response | httpx.Response"
+    ) -> float:
+        """Records the rate limit state reported by a response.
+
+        Returns:
+        -------
+            how many seconds to wait before retrying if the request was rate limited, otherwise 0
+        """
+        headers = response.headers
+        now = monotonic()
+        retry_after = 0.0
+
+        with self._lock:
+            bucket = headers.get("X-RateLimit-Bucket")
+            if bucket and "X-RateLimit-Remaining" in headers:
+                self._route_buckets[route] = bucket
+                self._buckets[bucket] = (
+                    int(headers["X-RateLimit-Remaining"]),
+                    now + float(headers.get("X-RateLimit-Reset-After", 0)),
+                )
+
+            if response.status_code == 429:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                retry_after = float(
+                    body.get("retry_after", headers.get("Retry-After", 1))
+                )
+                if body.get("global") or headers.get("X-RateLimit-Global"):
+                    self._global_reset_at = max(
+                        self._global_reset_at, now + retry_after
+                    )
+                else:
+                    # Without a bucket in the response, hold back the route on its own
+                    bucket = bucket or self._route_buckets.setdefault(route, route)
+                    self._buckets[bucket] = (0, now + retry_after)
+
+        return retry_after
+
+
+rate_limiter = RateLimiter()
+session = requests.Session()
+"""Shared between requests (and threads) to reuse connections to the Discord API."""
+session.hooks["response"].append(response_hook("discord"))
+
+MAJOR_PARAMETER_ROUTE_PATTERN = re.compile(
+    r"(?<!/channels)(?<!/guilds)(?<!/webhooks)/\d+"
 )
 
-HEADERS = {
-    "Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}",
-}
-"""
-Base headers to send along with Discord API requests.
-Most important is the `Authorization` header with the Discord bot's secret token
-which authenticates requests and gives us permission to do things as the bot.
-"""
+
+def api_request(method: str, path: str, max_retries=3, **kwargs) -> requests.Response:
+    """Makes a request to the Discord API as the bot, waiting out rate limits and retrying
+    rate limited requests, server errors, and timeouts.
+
+    Args:
+    ----
+        method: HTTP method
+        path: path under the API endpoint, e.g. `/channels/123`
+        max_retries: how many times to retry a failed request before giving up
+        **kwargs: passed to `requests.Session.request`
+
+    Raises:
+    ------
+        HTTPError on failed request after retries
+        RequestException on timeouts or connection errors after retries
+    """
+    # Rate limits are per route, but separate for each channel, guild, or webhook ID
+    route = method + " " + MAJOR_PARAMETER_ROUTE_PATTERN.sub("/:id", path)
+    kwargs.setdefault("timeout", 3)
+
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire(route)
+        try:
+            response = session.request(
+                method, DISCORD_API_ENDPOINT + path, headers=get_headers(), **kwargs
+            )
+        except (requests.Timeout, requests.ConnectionError):
+            if attempt == max_retries:
+                raise
+            logger.warning(f"{route} timed out, retrying")
+            sleep(2**attempt)
+            continue
+
+        retry_after = rate_limiter.update(route, response)
+        if attempt < max_retries:
+            if response.status_code == 429:
+                logger.warning(f"{route} rate limited, retrying in {retry_after}s")
+                continue
+            if response.status_code >= 500:
+                logger.warning(f"{route} failed with {response.status_code}, retrying")
+                sleep(2**attempt)
+                continue
+
+        response.raise_for_status()
+        return response
+
+    raise AssertionError("unreachable")
+
+
+async def aapi_request(
+    method: str, path: str, max_retries=3, **kwargs
+) -> "httpx.Response":
+    """Async version of `api_request`, sharing its rate limits.
+
+    Raises:
+    ------
+        httpx.HTTPStatusError on failed request after retries
+        httpx.RequestError on timeouts or connection errors after retries
+    """
+    import httpx
+
+    route = method + " " + MAJOR_PARAMETER_ROUTE_PATTERN.sub("/:id", path)
+
+    for attempt in range(max_retries + 1):
+        await rate_limiter.aacquire(route)
+        try:
+            response = await http.request(
+                "discord",
+                method,
+                DISCORD_API_ENDPOINT + path,
+                headers=get_headers(),
+                **kwargs,
+            )
+        except httpx.TransportError:
+            if attempt == max_retries:
+                raise
+            logger.warning(f"{route} timed out, retrying")
+            await asyncio.sleep(2**attempt)
+            continue
+
+        retry_after = rate_limiter.update(route, response)
+        if attempt < max_retries:
+            if response.status_code == 429:
+                logger.warning(f"{route} rate limited, retrying in {retry_after}s")
+                continue
+            if response.status_code >= 500:
+                logger.warning(f"{route} failed with {response.status_code}, retrying")
+                await asyncio.sleep(2**attempt)
+                continue
+
+        response.raise_for_status()
+        return response
+
+    raise AssertionError("unreachable")
 
 
 class DiscordTokens(TypedDict):
@@ -46,7 +260,7 @@ def get_tokens(code: str) -> DiscordTokens:
     ------
         HTTPError: if HTTP request fails.
     """
-    response = requests.post(
+    response = session.post(
         f"{DISCORD_API_ENDPOINT}/oauth2/token",
         data={
             "client_id": settings.DISCORD_CLIENT_ID,
@@ -66,6 +280,31 @@ def get_tokens(code: str) -> DiscordTokens:
     return tokens
 
 
+async def aget_tokens(code: str) -> DiscordTokens:
+    """Async version of `get_tokens`.
+
+    Raises
+    ------
+        httpx.HTTPError: if HTTP request fails.
+    """
+    response = await http.request(
+        "discord",
+        "POST",
+        f"{DISCORD_API_ENDPOINT}/oauth2/token",
+        data={
+            "client_id": settings.DISCORD_CLIENT_ID,
+            "client_secret": settings.DISCORD_CLIENT_SECRET,
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.DISCORD_REDIRECT_URL,
+            "scope": "identity guilds.join",
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
 class DiscordUser(TypedDict):
     """See https://discord.com/developers/docs/resources/user#user-object."""
 
@@ -100,7 +339,7 @@ def get_user_info(access_token: str) -> DiscordUser:
     See:
     https://discord.com/developers/docs/topics/oauth2#authorization-code-grant-access-token-exchange-example.
     """
-    response = requests.get(
+    response = session.get(
         f"{DISCORD_API_ENDPOINT}/users/@me",
         headers={
             "Authorization": f"Bearer {access_token}",
@@ -115,6 +354,26 @@ def get_user_info(access_token: str) -> DiscordUser:
     return user
 
 
+async def aget_user_info(access_token: str) -> DiscordUser:
+    """Async version of `get_user_info`.
+
+    Raises
+    ------
+        httpx.HTTPError on request failure
+    """
+    response = await http.request(
+        "discord",
+        "GET",
+        f"{DISCORD_API_ENDPOINT}/users/@me",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        },
+    )
+    response.raise_for_status()
+    return response.json()
+
+
 def upsert_server_member(
     access_token: str,
     user_id: str,
@@ -146,10 +405,10 @@ def upsert_server_member(
     if nickname is not None:
         data["nick"] = nickname
 
-    response = requests.put(
+    response = session.put(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}",
         json=data,
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
 
@@ -163,16 +422,47 @@ def upsert_server_member(
 
     # Add roles
     for role in roles if roles else []:
-        response = requests.put(
+        response = session.put(
             f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}/roles/{role}",
             json={"roles": roles},
-            headers=HEADERS,
+            headers=get_headers(),
             timeout=3,
         )
 
     return joined_server
 
 
+async def aupsert_server_member(
+    access_token: str,
+    user_id: str,
+    nickname: str | None = None,
+    roles: list[str] | None = None,
+) -> bool:
+    """Async version of `upsert_server_member`. Once the member is in the server, their
+    nickname and roles are updated concurrently.
+
+    Raises:
+        httpx.HTTPError on failed request
+    """
+    data: dict[str, Any] = {"access_token": access_token}
+    if nickname is not None:
+        data["nick"] = nickname
+
+    member_path = f"/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}"
+    response = await aapi_request("PUT", member_path, json=data)
+    joined_server = response.status_code == 201
+
+    updates = [
+        aapi_request("PUT", f"{member_path}/roles/{role}") for role in roles or []
+    ]
+    # Nicknames are only set by the request above when joining
+    if not joined_server and nickname is not None:
+        updates.append(aapi_request("PATCH", member_path, json={"nick": nickname}))
+    await asyncio.gather(*updates)
+
+    return joined_server
+
+
 def get_user(user_id: str) -> DiscordUser | None:
     """Given a Discord user's id, gets their user info.
 
@@ -185,8 +475,8 @@ def get_user(user_id: str) -> DiscordUser | None:
         HTTPError on failed request (e.g. not found)
     See https://discord.com/developers/docs/resources/user#get-user.
     """
-    response = requests.get(
-        f"{DISCORD_API_ENDPOINT}/users/{user_id}", headers=HEADERS, timeout=3
+    response = session.get(
+        f"{DISCORD_API_ENDPOINT}/users/{user_id}", headers=get_headers(), timeout=3
     )
 
     if response.status_code == 404:
@@ -211,9 +501,9 @@ def get_server_member(user_id: str) -> dict[str, Any] | None:
         HTTPError on failed request (e.g. not found)
     See https://discord.com/developers/docs/resources/guild#get-guild-member.
     """
-    response = requests.get(
+    response = session.get(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
 
@@ -230,12 +520,12 @@ def get_server_member(user_id: str) -> dict[str, Any] | None:
 
 def create_user_dm_channel(user_id: str):
     """https://discord.com/developers/docs/resources/user#create-dm."""
-    response = requests.post(
+    response = session.post(
         f"{DISCORD_API_ENDPOINT}/users/@me/channels",
         json={
             "recipient_id": user_id,
         },
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
     response.raise_for_status()
@@ -246,10 +536,10 @@ def create_user_dm_channel(user_id: str):
 
 def dm_user(dm_channel_id: str, message_content: str):
     """https://discord.com/developers/docs/resources/channel#create-message."""
-    response = requests.post(
+    response = session.post(
         f"{DISCORD_API_ENDPOINT}/channels/{dm_channel_id}/messages",
         json={"content": message_content},
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
     response.raise_for_status()
@@ -270,16 +560,18 @@ class CreateServerChannelParams(TypedDict):
 
 
 def create_server_channel(params: CreateServerChannelParams):
-    response = requests.post(
+    response = session.post(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/channels",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
         json=params,
     )
 
     response.raise_for_status()
 
-    return cast(dict[str, Any], response.json())
+    channel = cast(ServerChannel, response.json())
+    update_cached_server_channel(channel)
+    return channel
 
 
 class ModifyChannelParams(CreateServerChannelParams):
@@ -287,16 +579,18 @@ class ModifyChannelParams(CreateServerChannelParams):
 
 
 def modify_server_channel(channel_id: str, params: ModifyChannelParams):
-    response = requests.patch(
+    response = session.patch(
         f"{DISCORD_API_ENDPOINT}/channels/{channel_id}",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
         json=params,
     )
 
     response.raise_for_status()
 
-    return cast(dict[str, Any], response.json())
+    channel = cast(ServerChannel, response.json())
+    update_cached_server_channel(channel)
+    return channel
 
 
 class SendMessageParams(TypedDict):
@@ -304,15 +598,13 @@ class SendMessageParams(TypedDict):
 
 
 def send_message(channel_id: str, params: SendMessageParams):
-    response = requests.post(
-        f"{DISCORD_API_ENDPOINT}/channels/{channel_id}/messages",
-        headers=HEADERS,
-        timeout=3,
-        json=params,
-    )
-
-    response.raise_for_status()
+    """Posts a message to a channel as the bot.
 
+    Raises:
+        HTTPError on failed request
+    See https://discord.com/developers/docs/resources/message#create-message.
+    """
+    response = api_request("POST", f"/channels/{channel_id}/messages", json=params)
     return cast(dict[str, Any], response.json())
 
 
@@ -325,9 +617,9 @@ class CreateRoleParams(TypedDict):
 
 
 def create_role(params: CreateRoleParams):
-    response = requests.post(
+    response = session.post(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/roles",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
         json=params,
     )
@@ -346,18 +638,58 @@ def add_role_to_member(user_id: str, role_id: str):
         role_id: ID of Discord role to add to member
     Raises:
         HTTPError on failed request (will not fail if role is already set)
-    See https://discord.com/developers/docs/resources/guild#modify-guild-member.
+    See https://discord.com/developers/docs/resources/guild#add-guild-member-role.
     """
-    response = requests.put(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}"
-        f"/members/{user_id}/roles/{role_id}",
-        headers=HEADERS,
-        timeout=3,
+    return api_request(
+        "PUT", f"/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}/roles/{role_id}"
     )
-    response.raise_for_status()
-    # https://requests.readthedocs.io/en/latest/user/quickstart/#response-status-codes
-    # throws HTTPError for 4XX or 5XX
-    return response
+
+
+def remove_role_from_member(user_id: str, role_id: str):
+    """Removes a role from a server member.
+
+    Args:
+    ----
+        user_id: Discord user's unique account ID (same as member ID)
+        role_id: ID of Discord role to remove from member
+    Raises:
+        HTTPError on failed request (will not fail if role is not set)
+    See https://discord.com/developers/docs/resources/guild#remove-guild-member-role.
+    """
+    return api_request(
+        "DELETE",
+        f"/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}/roles/{role_id}",
+    )
+
+
+class ServerMember(TypedDict):
+    """https://discord.com/developers/docs/resources/guild#guild-member-object."""
+
+    user: DiscordUser
+    nick: NotRequired[str | None]
+    roles: list[str]
+
+
+def list_server_members(page_size=1000) -> Iterator[ServerMember]:
+    """Yields every member of the server, paging through them in order of user ID.
+
+    Raises:
+        HTTPError on failed request
+    See https://discord.com/developers/docs/resources/guild#list-guild-members.
+    """
+    after = "0"
+    while True:
+        response = api_request(
+            "GET",
+            f"/guilds/{settings.DISCORD_SERVER_ID}/members",
+            params={"limit": page_size, "after": after},
+        )
+        members = cast(list[ServerMember], response.json())
+        yield from members
+
+        if len(members) < page_size:
+            return
+        after = members[-1]["user"]["id"]
 
 
 def kick_user_from_server(user_id: str):
@@ -370,9 +702,9 @@ def kick_user_from_server(user_id: str):
         HTTPError on failed request (e.g. missing permission to kick member)
     See https://discord.com/developers/docs/resources/guild#remove-guild-member.
     """
-    response = requests.delete(
+    response = session.delete(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
     response.raise_for_status()
@@ -390,108 +722,108 @@ def set_member_nickname(user_id: str, nickname: str):
         nickname: the nickname to give the user, must be <= 32 characters
     Raises:
         HTTPError on failed request
-    See https://discord.com/developers/docs/resources/guild#modify-current-member.
+    See https://discord.com/developers/docs/resources/guild#modify-guild-member.
     """
-    response = requests.patch(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}",
+    return api_request(
+        "PATCH",
+        f"/guilds/{settings.DISCORD_SERVER_ID}/members/{user_id}",
         json={"nick": nickname},
-        headers=HEADERS,
-        timeout=3,
     )
-    response.raise_for_status()
-    # https://requests.readthedocs.io/en/latest/user/quickstart/#response-status-codes
-    # throws HTTPError for 4XX or 5XX
-    return response
+
+
+class ServerScheduledEventMetadata(TypedDict):
+    location: NotRequired[str]
 
 
 class ServerScheduledEvent(TypedDict):
+    """https://discord.com/developers/docs/resources/guild-scheduled-event#guild-scheduled-event-object."""
+
     id: str
     guild_id: str
     name: str
-    description: NotRequired[str]
+    description: NotRequired[str | None]
     scheduled_start_time: str
+    scheduled_end_time: NotRequired[str | None]
+    privacy_level: int
+    status: int
+    entity_type: int
+    entity_metadata: NotRequired[ServerScheduledEventMetadata | None]
+
+
+class ServerScheduledEventParams(TypedDict):
+    name: NotRequired[str]
+    description: NotRequired[str]
+    scheduled_start_time: NotRequired[str]
     scheduled_end_time: NotRequired[str]
-    privacy_level: str
-    status: str
+    entity_metadata: NotRequired[ServerScheduledEventMetadata]
+
+
+EXTERNAL_EVENT_ENTITY_TYPE = 3
+GUILD_ONLY_PRIVACY_LEVEL = 2
+
+
+def list_server_events() -> list[ServerScheduledEvent]:
+    """Lists the server's scheduled and active events.
+
+    Raises:
+        HTTPError on failed request
+    See https://discord.com/developers/docs/resources/guild-scheduled-event#list-scheduled-events-for-guild.
+    """
+    response = api_request(
+        "GET", f"/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events"
+    )
+    return cast(list[ServerScheduledEvent], response.json())
 
 
 def get_server_event(event_id: str) -> ServerScheduledEvent:
     """https://discord.com/developers/docs/resources/guild-scheduled-event#get-guild-scheduled-event."""
-    response = requests.get(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}",
-        headers=HEADERS,
-        timeout=3,
+    response = api_request(
+        "GET", f"/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}"
     )
-    response.raise_for_status()
-    # https://requests.readthedocs.io/en/latest/user/quickstart/#response-status-codes
-    # throws HTTPError for 4XX or 5XX
-    return cast(dict[str, Any], response.json())
+    return cast(ServerScheduledEvent, response.json())
 
 
-def create_server_event(
-    name: str,
-    scheduled_start_time: str,
-    scheduled_end_time: str,
-    description: str,
-    location: str | None,
-) -> ServerScheduledEvent:
-    """https://discord.com/developers/docs/resources/guild-scheduled-event#create-guild-scheduled-event."""
-    response = requests.post(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events",
+def create_server_event(params: ServerScheduledEventParams) -> ServerScheduledEvent:
+    """Creates an external event (one with a location rather than a channel).
+
+    Raises:
+        HTTPError on failed request
+    See https://discord.com/developers/docs/resources/guild-scheduled-event#create-guild-scheduled-event.
+    """
+    response = api_request(
+        "POST",
+        f"/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events",
         json={
-            "entity_metadata": {"location": location},
-            "name": name,
-            "description": description,
-            "entity_type": 3,  # external event
-            "scheduled_start_time": scheduled_start_time,
-            "scheduled_end_time": scheduled_end_time,
-            "privacy_level": 2,
+            **params,
+            "entity_type": EXTERNAL_EVENT_ENTITY_TYPE,
+            "privacy_level": GUILD_ONLY_PRIVACY_LEVEL,
         },
-        headers=HEADERS,
-        timeout=3,
     )
-    response.raise_for_status()
-    return response.json()
+    return cast(ServerScheduledEvent, response.json())
 
 
 def update_server_event(
-    event_id: str,
-    name: str,
-    scheduled_start_time: str,
-    scheduled_end_time: str,
-    description: str,
-    location: str | None,
+    event_id: str, params: ServerScheduledEventParams
 ) -> ServerScheduledEvent:
-    """https://discord.com/developers/docs/resources/guild-scheduled-event#create-guild-scheduled-event."""
-    response = requests.patch(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}",
-        json={
-            "entity_metadata": {"location": location},
-            "name": name,
-            "description": description,
-            "entity_type": 3,  # external event
-            "scheduled_start_time": scheduled_start_time,
-            "scheduled_end_time": scheduled_end_time,
-            "privacy_level": 2,
-        },
-        headers=HEADERS,
-        timeout=3,
+    """Changes only the given fields of an event.
+
+    Raises:
+        HTTPError on failed request
+    See https://discord.com/developers/docs/resources/guild-scheduled-event#modify-guild-scheduled-event.
+    """
+    response = api_request(
+        "PATCH",
+        f"/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}",
+        json=params,
     )
-    response.raise_for_status()
-    return response.json()
+    return cast(ServerScheduledEvent, response.json())
 
 
-def delete_server_event(
-    event_id: str,
-):
+def delete_server_event(event_id: str):
     """https://discord.com/developers/docs/resources/guild-scheduled-event#delete-guild-scheduled-event."""
-    response = requests.delete(
-        f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}",
-        headers=HEADERS,
-        timeout=3,
+    return api_request(
+        "DELETE", f"/guilds/{settings.DISCORD_SERVER_ID}/scheduled-events/{event_id}"
     )
-    response.raise_for_status()
-    return response.json()
 
 
 class ServerChannel(TypedDict):
@@ -506,20 +838,107 @@ class ServerChannel(TypedDict):
 
 
 def get_server_channels():
-    response = requests.get(
+    response = session.get(
         f"{DISCORD_API_ENDPOINT}/guilds/{settings.DISCORD_SERVER_ID}/channels",
-        headers=HEADERS,
+        headers=get_headers(),
         timeout=3,
     )
     response.raise_for_status()
     return cast(list[ServerChannel], response.json())
 
 
-def delete_channel(channel_id: str):
-    response = requests.delete(
-        f"{DISCORD_API_ENDPOINT}/channels/{channel_id}",
-        headers=HEADERS,
-        timeout=3,
-    )
-    response.raise_for_status()
+def delete_channel(channel_id: str, update_snapshot=True):
+    """Deletes a channel, waiting out rate limits and retrying transient failures.
+
+    Pass `update_snapshot=False` when deleting channels concurrently, since updating the snapshot
+    isn't atomic, and clear it once they're deleted instead.
+
+    Raises:
+    ------
+        HTTPError on failed request (e.g. 404 if already deleted)
+    See https://discord.com/developers/docs/resources/channel#deleteclose-channel.
+    """
+    try:
+        response = api_request("DELETE", f"/channels/{channel_id}")
+    except requests.HTTPError as e:
+        if update_snapshot and e.response is not None and e.response.status_code == 404:
+            remove_cached_server_channel(channel_id)
+        raise
+    if update_snapshot:
+        remove_cached_server_channel(channel_id)
     return cast(ServerChannel, response.json())
+
+
+SERVER_CHANNELS_CACHE_KEY = "discord_server_channels"
+SERVER_CHANNELS_CACHE_TIMEOUT = 60 * 5
+"""Channels changed outside of the portal show up after at most this many seconds."""
+
+
+class ServerChannelsSnapshot(TypedDict):
+    channels: dict[str, ServerChannel]
+    """Server channels keyed by ID."""
+    fetched_at: datetime
+
+
+def get_server_channels_snapshot(force_refresh=False) -> ServerChannelsSnapshot:
+    """Returns the server's channels from the cache, only listing them from Discord when the snapshot
+    is missing, expired, or a refresh is forced.
+
+    Channels created, modified, or deleted through this module are written through to the snapshot
+    so the admin page shows them without waiting for it to expire.
+    """
+    snapshot: ServerChannelsSnapshot | None = (
+        None if force_refresh else cache.get(SERVER_CHANNELS_CACHE_KEY)
+    )
+    if snapshot is None:
+        snapshot = {
+            "channels": {c["id"]: c for c in get_server_channels()},
+            "fetched_at": timezone.now(),
+        }
+        cache.set(SERVER_CHANNELS_CACHE_KEY, snapshot, SERVER_CHANNELS_CACHE_TIMEOUT)
+    return snapshot
+
+
+def update_cached_server_channel(channel: ServerChannel):
+    snapshot: ServerChannelsSnapshot | None = cache.get(SERVER_CHANNELS_CACHE_KEY)
+    if snapshot is not None:
+        snapshot["channels"][channel["id"]] = channel
+        cache.set(SERVER_CHANNELS_CACHE_KEY, snapshot, SERVER_CHANNELS_CACHE_TIMEOUT)
+
+
+def remove_cached_server_channel(channel_id: str):
+    snapshot: ServerChannelsSnapshot | None = cache.get(SERVER_CHANNELS_CACHE_KEY)
+    if snapshot is not None and snapshot["channels"].pop(channel_id, None):
+        cache.set(SERVER_CHANNELS_CACHE_KEY, snapshot, SERVER_CHANNELS_CACHE_TIMEOUT)
+
+
+def group_channels_by_category(
+    channels: list[ServerChannel],
+) -> dict[tuple[str | None, str], list[ServerChannel]]:
+    """Groups channels under their categories in a single pass over the channels.
+
+    Returns:
+    -------
+        a dict of `(category id, category name): [child channels]` sorted by position,
+        with uncategorized channels under `(None, "No category")` at the end
+    """
+    channels = sorted(channels, key=lambda c: c.get("position", 0))
+
+    categories = {c["id"]: c for c in channels if c["type"] == CATEGORY_CHANNEL_TYPE}
+    children: dict[str | None, list[ServerChannel]] = {
+        category_id: [] for category_id in categories
+    }
+    children[None] = []
+
+    for channel in channels:
+        if channel["type"] == CATEGORY_CHANNEL_TYPE:
+            continue
+        parent_id = channel.get("parent_id")
+        children[parent_id if parent_id in categories else None].append(channel)
+
+    grouped = {
+        (category_id, category.get("name", "")): children[category_id]
+        for category_id, category in categories.items()
+    }
+    grouped[(None, "No category")] = children[None]
+    return grouped
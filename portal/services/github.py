@@ -1,18 +1,93 @@
 import re
-from typing import TypedDict
+from typing import TYPE_CHECKING, TypedDict
 
 import requests
 from django.conf import settings
-from gql import Client, gql
-from gql.transport.requests import RequestsHTTPTransport
 
-GITHUB_AUTH_URL = (
-    "https://github.com/login/oauth/authorize"
-    f"?client_id={settings.GITHUB_OAUTH_APP_CLIENT_ID}&redirect_uri={settings.GITHUB_OAUTH_APP_REDIRECT_URL}"
-)
+from portal.instrumentation import response_hook, timed
+from portal.services import http
+
+if TYPE_CHECKING:
+    from gql import Client
+
+
+def get_auth_url() -> str:
+    """The URL to send users to for them to authorize linking their GitHub account."""
+    return (
+        "https://github.com/login/oauth/authorize"
+        f"?client_id={settings.GITHUB_OAUTH_APP_CLIENT_ID}&redirect_uri={settings.GITHUB_OAUTH_APP_REDIRECT_URL}"
+    )
+
 
 GITHUB_REPO_REGEX = re.compile("https://github.com/.+/.+", re.IGNORECASE)
 
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+GITHUB_API_URL = "https://api.github.com"
+
+VIEWER_LOGIN_QUERY = """
+    {
+        viewer {
+            login
+        }
+    }
+    """
+
+REPOSITORY_DETAILS_QUERY = """
+    query RepoDetails($owner: String!, $name: String!) {
+        repository(owner: $owner, name: $name) {
+            owner {
+                login
+            }
+            name
+            url
+            description
+            forkCount
+            stargazerCount
+            primaryLanguage {
+                name
+                color
+            }
+            defaultBranchRef {
+            target {
+                ... on Commit {
+                history(first: 5) {
+                    nodes {
+                    url
+                    author {
+                        name
+                        user {
+                            login
+                        }
+                        avatarUrl
+                    }
+                    authoredDate
+                    additions
+                    deletions
+                    messageHeadline
+                    messageBody
+                    }
+                }
+                }
+            }
+            }
+            readme: object(expression: "main:README.md") {
+            ... on Blob {
+                text
+            }
+            }
+            license: object(expression: "main:LICENSE") {
+            ... on Blob {
+                text
+            }
+            }
+        }
+    }
+    """
+
+
+class GitHubQueryError(Exception):
+    """GitHub responded to a GraphQL query with errors instead of data."""
+
 
 class GitHubTokens(TypedDict):
     """https://docs.github.com/en/developers/apps/building-oauth-apps/authorizing-oauth-apps#response."""
@@ -42,6 +117,7 @@ def get_tokens(code: str) -> GitHubTokens:
         },
         headers={"Accept": "application/json"},
         timeout=3,
+        hooks={"response": response_hook("github")},
     )
     response.raise_for_status()
     # https://requests.readthedocs.io/en/latest/user/quickstart/#response-status-codes
@@ -50,23 +126,128 @@ def get_tokens(code: str) -> GitHubTokens:
     return tokens
 
 
-def get_user_username(client: Client) -> str:
-    query = gql(
-        """
-        {
-            viewer {
-                login
-            }
-        }
-        """
+async def aget_tokens(code: str) -> GitHubTokens:
+    """Async version of `get_tokens`.
+
+    Raises:
+        httpx.HTTPError on failed request
+    """
+    response = await http.request(
+        "github",
+        "POST",
+        "https://github.com/login/oauth/access_token",
+        data={
+            "client_id": settings.GITHUB_OAUTH_APP_CLIENT_ID,
+            "client_secret": settings.GITHUB_OAUTH_APP_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": settings.GITHUB_OAUTH_APP_REDIRECT_URL,
+        },
+        headers={"Accept": "application/json"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def aexecute(query: str, variables: dict | None = None, token: str | None = None):
+    """Runs a GraphQL query against the GitHub API with the shared async client, as the user the
+    token belongs to or the portal's own token.
+
+    Raises:
+        httpx.HTTPError on failed request
+        GitHubQueryError if the query has errors
+    """
+    response = await http.request(
+        "github",
+        "POST",
+        GITHUB_GRAPHQL_URL,
+        json={"query": query, "variables": variables or {}},
+        headers={"Authorization": f"bearer {token or settings.GITHUB_API_TOKEN}"},
     )
+    response.raise_for_status()
+    body = response.json()
+    if body.get("errors"):
+        raise GitHubQueryError(body["errors"])
+    return body["data"]
+
+
+def execute(query: str, variables: dict | None = None, token: str | None = None):
+    """Sync version of `aexecute` for background tasks, which don't need a GQL client.
+
+    Raises:
+        HTTPError on failed request
+        GitHubQueryError if the query has errors
+    """
+    response = requests.post(
+        GITHUB_GRAPHQL_URL,
+        json={"query": query, "variables": variables or {}},
+        headers={"Authorization": f"bearer {token or settings.GITHUB_API_TOKEN}"},
+        timeout=10,
+        hooks={"response": response_hook("github")},
+    )
+    response.raise_for_status()
+    body = response.json()
+    if body.get("errors"):
+        raise GitHubQueryError(body["errors"])
+    return body["data"]
+
+
+def parse_repository_url(repo_url: str) -> tuple[str, str]:
+    """Returns the owner and name of the repository at a GitHub URL."""
+    owner, name = repo_url.rstrip("/").split("/")[-2:]
+    return owner, name.removesuffix(".git")
+
+
+def get_repository_events_etag(repo_url: str, etag: str = "") -> str | None:
+    """Asks GitHub whether anything has happened in a repository since the ETag of its event
+    feed was `etag`, without downloading the feed when nothing has. Conditional requests GitHub
+    answers with 304 Not Modified don't count against the rate limit.
+
+    Returns
+    -------
+        the feed's new ETag, or None if it hasn't changed
+    Raises:
+        HTTPError on failed request
+    See https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api#use-conditional-requests-if-appropriate.
+    """
+    owner, name = parse_repository_url(repo_url)
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"bearer {settings.GITHUB_API_TOKEN}",
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+
+    response = requests.get(
+        f"{GITHUB_API_URL}/repos/{owner}/{name}/events",
+        params={"per_page": 1},
+        headers=headers,
+        timeout=10,
+        hooks={"response": response_hook("github")},
+    )
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response.headers.get("ETag", "")
+
+
+def get_user_username(client: "Client") -> str:
+    from gql import gql
 
-    result = client.execute(query)
+    query = gql(VIEWER_LOGIN_QUERY)
+
+    with timed("github"):
+        result = client.execute(query)
+    return result["viewer"]["login"]
+
+
+async def aget_user_username(token: str) -> str:
+    result = await aexecute(VIEWER_LOGIN_QUERY, token=token)
     return result["viewer"]["login"]
 
 
-def client_factory(token: str = settings.GITHUB_API_TOKEN):
-    """Creates a new GQL client pointing to the Hasura API.
+def client_factory(token: str | None = None) -> "Client":
+    """Creates a new GQL client pointing to the GitHub API, authenticated as the user the token
+    belongs to or the portal's own token.
     Instead of using one client across the app, one client should be made per request
     to avoid threading errors.
 
@@ -74,70 +255,30 @@ def client_factory(token: str = settings.GITHUB_API_TOKEN):
     -------
         new GQL client.
     """
+    # gql is slow to import and only needed on the few pages that talk to GitHub
+    from gql import Client
+    from gql.transport.requests import RequestsHTTPTransport
+
     transport = RequestsHTTPTransport(
-        url="https://api.github.com/graphql",
+        url=GITHUB_GRAPHQL_URL,
         verify=True,
         retries=3,
-        headers={"Authorization": f"bearer {token}"},
+        headers={"Authorization": f"bearer {token or settings.GITHUB_API_TOKEN}"},
     )
     return Client(transport=transport)
 
 
-def get_repository_details(client: Client, repo_url: str):
+def get_repository_details(client: "Client", repo_url: str):
+    from gql import gql
+
     owner, name = repo_url.split("/")[-2:]
-    query = gql(
-        """
-        query RepoDetails($owner: String!, $name: String!) {
-            repository(owner: $owner, name: $name) {
-                owner {
-                    login
-                }
-                name
-                url
-                description
-                forkCount
-                stargazerCount
-                primaryLanguage {
-                    name
-                    color
-                }
-                defaultBranchRef {
-                target {
-                    ... on Commit {
-                    history(first: 5) {
-                        nodes {
-                        url
-                        author {
-                            name
-                            user {
-                                login
-                            }
-                            avatarUrl
-                        }
-                        authoredDate
-                        additions
-                        deletions
-                        messageHeadline
-                        messageBody
-                        }
-                    }
-                    }
-                }
-                }
-                readme: object(expression: "main:README.md") {
-                ... on Blob {
-                    text
-                }
-                }
-                license: object(expression: "main:LICENSE") {
-                ... on Blob {
-                    text
-                }
-                }
-            }
-        }
-        """
-    )
+    query = gql(REPOSITORY_DETAILS_QUERY)
 
-    result = client.execute(query, variable_values={"owner": owner, "name": name})
+    with timed("github"):
+        result = client.execute(query, variable_values={"owner": owner, "name": name})
     return result
+
+
+async def aget_repository_details(repo_url: str):
+    owner, name = repo_url.split("/")[-2:]
+    return await aexecute(REPOSITORY_DETAILS_QUERY, {"owner": owner, "name": name})
@@ -0,0 +1,84 @@
+"""
+Shared async HTTP client for the Discord and GitHub services' async functions, so concurrent
+calls reuse pooled connections instead of each opening their own.
+
+A client's connections belong to the event loop they were opened on, so there is one client
+per running loop. Under ASGI that's one per worker process; under WSGI, Django runs each
+async view in its own loop, so connections are only shared within a request and async views
+that make requests are decorated with `@closes_client` to close them afterwards.
+"""
+
+import asyncio
+from functools import wraps
+from time import perf_counter
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from django.core.handlers.asgi import ASGIRequest
+
+from portal.instrumentation import record
+
+if TYPE_CHECKING:
+    import httpx
+
+TIMEOUT_SECONDS = 3
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+
+_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_client() -> "httpx.AsyncClient":
+    # Only needed by async views, so not imported until one runs
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return client
+
+
+async def aclose_client():
+    """Closes the running loop's client, if it has one."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def closes_client(view):
+    """Closes the client an async view used once it has responded, unless it's served over ASGI
+    and the client can be kept for the worker's later requests."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            if not isinstance(request, ASGIRequest):
+                await aclose_client()
+
+    return wrapper
+
+
+async def request(service: str, method: str, url: str, **kwargs) -> "httpx.Response":
+    """Makes a request with the shared client, timing it under `service` for the current request.
+
+    Raises:
+    ------
+        httpx.RequestError on timeouts or connection errors
+    """
+    started_at = perf_counter()
+    try:
+        response = await get_client().request(method, url, **kwargs)
+    finally:
+        record(service, perf_counter() - started_at)
+    return response
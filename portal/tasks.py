@@ -1,38 +1,209 @@
-import os
-import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+import redis
 from celery import shared_task
-from django.db.models import Manager
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from requests import HTTPError
+from requests import HTTPError, RequestException
+from sentry_sdk import capture_exception
 
-from portal.models import Meeting
+from portal import mail
+from portal.alerts import send_digests
+from portal.contributions import ingest_contributions
+from portal.deletion import delete_in_chunks
+from portal.discord_events import sync_meeting_events
+from portal.discord_reconcile import apply_member_delta, diff_server_members
+from portal.models import Meeting, ShortLink, User
+from portal.redis_client import get_redis_client
 from portal.services import discord
 
+logger = logging.getLogger(__name__)
 
-@shared_task
-def delete_discord_channels(channel_ids: list[str]):
-    for channel_id in channel_ids:
+CHANNEL_DELETION_WORKERS = 5
+CHANNEL_DELETION_CACHE_TIMEOUT = 60 * 60 * 24
+LATEST_CHANNEL_DELETION_CACHE_KEY = "discord_channel_deletion:latest"
+
+
+def channel_deletion_cache_key(task_id: str):
+    return f"discord_channel_deletion:{task_id}"
+
+
+@shared_task(bind=True)
+def delete_discord_channels(self, channel_ids: list[str]):
+    """Deletes Discord channels concurrently, recording each channel's result in the cache
+    under the task ID so the Discord admin page can show progress.
+
+    Pacing is left to the Discord service's rate limiter, which also retries transient failures.
+    """
+    cache_key = channel_deletion_cache_key(self.request.id)
+    known_channels = discord.get_server_channels_snapshot()["channels"]
+    progress = {
+        "total": len(channel_ids),
+        "names": {
+            channel_id: known_channels[channel_id].get("name", channel_id)
+            if channel_id in known_channels
+            else channel_id
+            for channel_id in channel_ids
+        },
+        "results": {},
+        "started_at": timezone.now(),
+        "finished_at": None,
+    }
+    cache.set(cache_key, progress, CHANNEL_DELETION_CACHE_TIMEOUT)
+    lock = threading.Lock()
+
+    def delete_channel(channel_id: str):
         try:
-            discord.delete_channel(channel_id)
+            # Workers removing channels from the snapshot at once would overwrite each other's
+            # removals, so it's cleared once they're done instead
+            discord.delete_channel(channel_id, update_snapshot=False)
+            result = {"status": "deleted"}
         except HTTPError as e:
-            print(e, e.response)
-        time.sleep(2)
+            if e.response is not None and e.response.status_code == 404:
+                result = {"status": "missing"}
+            else:
+                capture_exception(e)
+                logger.exception(f"Failed to delete Discord channel {channel_id}")
+                result = {"status": "failed", "error": str(e)}
+        except RequestException as e:
+            capture_exception(e)
+            logger.exception(f"Failed to delete Discord channel {channel_id}")
+            result = {"status": "failed", "error": str(e)}
+
+        with lock:
+            progress["results"][channel_id] = result
+            cache.set(cache_key, progress, CHANNEL_DELETION_CACHE_TIMEOUT)
+
+    with ThreadPoolExecutor(max_workers=CHANNEL_DELETION_WORKERS) as executor:
+        # Consume the results so exceptions aren't swallowed
+        list(executor.map(delete_channel, channel_ids))
+    cache.delete(discord.SERVER_CHANNELS_CACHE_KEY)
+
+    progress["finished_at"] = timezone.now()
+    cache.set(cache_key, progress, CHANNEL_DELETION_CACHE_TIMEOUT)
+
+    return {
+        status: sum(1 for r in progress["results"].values() if r["status"] == status)
+        for status in ("deleted", "missing", "failed")
+    }
 
 
 @shared_task
 def meetings_alert():
-    today = timezone.now().date()
-
-    # Find meetings today
-    todays_meetings: Manager[Meeting] = Meeting.objects.filter(start_date__date=today)
-
-    for meeting in todays_meetings:
-        if not meeting.presentation_url:
-            # Meeting today is missing presentation URL, alert!
-            discord.send_message(
-                os.environ["DISCORD_ALERTS_CHANNEL_ID"],
-                {
-                    "content": f"Meeting **{meeting}** does not have presentation slides added yet!"
-                },
+    """Posts the daily digest of upcoming meetings and projects that aren't ready, see
+    portal/alerts.py."""
+    results = send_digests()
+
+    logger.info(
+        f"Sent {results['sent']} readiness digest(s), {results['failed']} failed"
+    )
+    return results
+
+
+@shared_task
+def flush_shortlink_clicks():
+    """Moves the click counts accumulated in Redis by `ShortLink.record_click` into the database."""
+    client = get_redis_client()
+    # Renaming takes every count and resets them at once, later clicks start a new hash. Counts
+    # left over from a flush that died are flushed first.
+    if not client.exists(ShortLink.FLUSHING_CLICKS_KEY):
+        try:
+            client.renamenx(ShortLink.CLICKS_KEY, ShortLink.FLUSHING_CLICKS_KEY)
+        except redis.ResponseError:
+            # No clicks since the last flush
+            return
+
+    with transaction.atomic():
+        for code, count in client.hgetall(ShortLink.FLUSHING_CLICKS_KEY).items():
+            ShortLink.objects.filter(code=code.decode()).update(
+                click_count=F("click_count") + int(count)
             )
+    client.delete(ShortLink.FLUSHING_CLICKS_KEY)
+
+
+@shared_task
+def reconcile_discord_members():
+    """Brings every linked server member's nickname and roles in line with the database."""
+    deltas = diff_server_members()
+    failed = [delta for delta in deltas if not apply_member_delta(delta)]
+
+    logger.info(f"Reconciled {len(deltas)} Discord member(s), {len(failed)} failed")
+    return {"changed": len(deltas), "failed": len(failed)}
+
+
+@shared_task
+def ingest_github_contributions():
+    """Ingests new activity in active projects' GitHub repositories, see portal/contributions.py."""
+    results = ingest_contributions()
+
+    logger.info(
+        f"Ingested contributions: {results['updated']} repositories updated, "
+        f"{results['unchanged']} unchanged, {results['failed']} failed"
+    )
+    return results
+
+
+@shared_task
+def sync_discord_events(meeting_ids: list[int] | None = None):
+    """Syncs the Discord events of the meetings (every upcoming one by default), see
+    portal/discord_events.py."""
+    meetings = (
+        None if meeting_ids is None else Meeting.objects.filter(pk__in=meeting_ids)
+    )
+    results = sync_meeting_events(meetings)
+
+    logger.info(
+        f"Synced Discord events: {results['created']} created, {results['updated']} updated, "
+        f"{results['deleted']} deleted, {results['failed']} failed"
+    )
+    return results
+
+
+@shared_task
+def delete_unverified_users(user_ids: list[int], after_pk: int | None = None):
+    """Deletes the users that are still unverified, a chunk at a time (see portal/deletion.py).
+    If interrupted, run again with `after_pk` set to the last ID logged to resume."""
+    deleted_count = 0
+    for chunk in delete_in_chunks(
+        User.get_unverified().filter(pk__in=user_ids), after_pk=after_pk
+    ):
+        deleted_count += chunk.deleted
+        logger.info(
+            f"Deleted {deleted_count}/{len(user_ids)} unverified user(s), last ID {chunk.last_pk}"
+        )
+    return {"deleted": deleted_count}
+
+
+@shared_task
+def add_discord_role(discord_user_id: str, role_id: str):
+    """Gives a server member a role, queued by saves that shouldn't wait on Discord."""
+    try:
+        discord.add_role_to_member(discord_user_id, role_id)
+    except HTTPError as e:
+        capture_exception(e)
+        logger.exception(
+            f"Failed to add Discord role {role_id} to {discord_user_id}", exc_info=e
+        )
+
+
+@shared_task
+def flush_email_queue():
+    """Sends the emails queued by `QueuedEmailBackend` in batches, see portal/mail.py."""
+    results = mail.flush_queue()
+    if any(results.values()):
+        logger.info(
+            f"Sent {results['sent']} queued email(s), {results['retrying']} to retry, "
+            f"{results['failed']} failed"
+        )
+    return results
+
+
+# Acknowledged once run, so the emails are sent by another worker if this one dies meanwhile
+@shared_task(acks_late=True)
+def send_emails(payloads: list[dict]):
+    """Sends emails again that failed to send, see portal/mail.py."""
+    return mail.send_batch(payloads)
@@ -95,3 +95,8 @@ def to_short_repository(repository_url: str):
     return repository_url.removeprefix("https://github.com/").removeprefix(
         "https://www.github.com/"
     )
+
+
+@register.filter(name="get_item")
+def get_item(dictionary: dict, key):
+    return dictionary.get(key) if dictionary else None
@@ -0,0 +1,102 @@
+from datetime import date, datetime
+from pathlib import Path
+
+from django.test import TestCase
+from django.utils import timezone
+
+from portal.contributions import RecordedGitHub, ingest_contributions
+from portal.models import Project, ProjectRepository, WeeklyContribution
+
+RECORDING = Path(__file__).parent / "recordings" / "github_contributions.json"
+"""Responses for rcos/portal, with a second page of commits, and rcos/deleted, which GitHub
+no longer finds, both last ingested at `SYNCED_AT`."""
+
+SYNCED_AT = timezone.make_aware(datetime(2026, 9, 16, 12))
+
+
+class IngestContributionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        project = Project.objects.create(slug="portal", name="Portal")
+        cls.repository = ProjectRepository.objects.create(
+            project=project,
+            url="https://github.com/rcos/portal",
+            contributions_synced_at=SYNCED_AT,
+            contributions_etag='"portal-1"',
+        )
+        cls.deleted = ProjectRepository.objects.create(
+            project=project,
+            url="https://github.com/rcos/deleted",
+            contributions_synced_at=SYNCED_AT,
+            contributions_etag='"deleted-1"',
+        )
+
+    def setUp(self):
+        # Rows from before the week being ingested are kept, rows from it are replaced
+        WeeklyContribution.objects.bulk_create(
+            [
+                WeeklyContribution(
+                    repository=self.repository,
+                    github_username="alice",
+                    week=date(2026, 9, 7),
+                    commits=4,
+                ),
+                WeeklyContribution(
+                    repository=self.repository,
+                    github_username="alice",
+                    week=date(2026, 9, 14),
+                    commits=1,
+                ),
+            ]
+        )
+
+    def ingest(self, *repositories) -> dict:
+        return ingest_contributions(repositories, source=RecordedGitHub(RECORDING))
+
+    def assertContributions(self):
+        self.assertEqual(
+            list(
+                WeeklyContribution.objects.order_by(
+                    "week", "github_username"
+                ).values_list(
+                    "github_username", "week", "commits", "pull_requests", "reviews"
+                )
+            ),
+            [
+                ("alice", date(2026, 9, 7), 4, 0, 0),
+                ("alice", date(2026, 9, 14), 1, 0, 1),
+                ("bob", date(2026, 9, 14), 0, 1, 0),
+                ("alice", date(2026, 9, 21), 2, 0, 0),
+            ],
+        )
+
+    def test_ingests_changed_repositories(self):
+        results = self.ingest(self.repository, self.deleted)
+
+        # The batch failed on the deleted repository, and was retried one at a time
+        self.assertEqual(results, {"updated": 1, "unchanged": 0, "failed": 1})
+        self.assertContributions()
+        self.repository.refresh_from_db()
+        self.assertEqual(self.repository.contributions_etag, '"portal-2"')
+        self.assertGreater(self.repository.contributions_synced_at, SYNCED_AT)
+        self.deleted.refresh_from_db()
+        self.assertEqual(self.deleted.contributions_synced_at, SYNCED_AT)
+
+    def test_skips_unchanged_repositories(self):
+        self.ingest(self.repository)
+        self.repository.refresh_from_db()
+
+        results = self.ingest(self.repository)
+
+        self.assertEqual(results, {"updated": 0, "unchanged": 1, "failed": 0})
+        self.assertContributions()
+
+    def test_reingesting_replaces_weeks(self):
+        self.ingest(self.repository)
+        ProjectRepository.objects.filter(pk=self.repository.pk).update(
+            contributions_synced_at=SYNCED_AT, contributions_etag='"portal-1"'
+        )
+        self.repository.refresh_from_db()
+
+        self.assertEqual(self.ingest(self.repository)["updated"], 1)
+        self.assertContributions()
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from portal.deletion import delete_in_chunks
+from portal.models import Enrollment, Semester, User
+from portal.roles import get_roles
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DeleteInChunksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.semester = Semester.objects.create(
+            id=f"{today.year}01",
+            name="Test Semester",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+        )
+        cls.bots = [User.objects.create_user(f"bot{i}@example.com") for i in range(5)]
+        cls.human = User.objects.create_user("human@example.com")
+        cls.bot_pks = [bot.pk for bot in cls.bots]
+
+    def setUp(self):
+        cache.clear()
+        self.queryset = User.objects.filter(email__startswith="bot")
+
+    def test_deletes_in_chunks(self):
+        chunks = list(delete_in_chunks(self.queryset, chunk_size=2))
+
+        self.assertEqual([chunk.deleted for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            [chunk.last_pk for chunk in chunks], self.bot_pks[1::2] + self.bot_pks[-1:]
+        )
+        self.assertFalse(self.queryset.exists())
+        self.assertTrue(User.objects.filter(pk=self.human.pk).exists())
+
+    def test_resumes_after_pk(self):
+        chunks = list(
+            delete_in_chunks(self.queryset, chunk_size=2, after_pk=self.bot_pks[2])
+        )
+
+        self.assertEqual(sum(chunk.deleted for chunk in chunks), 2)
+        self.assertEqual(
+            list(self.queryset.values_list("pk", flat=True)), self.bot_pks[:3]
+        )
+
+    def test_keeps_rows_that_stopped_matching(self):
+        chunks = delete_in_chunks(self.queryset, chunk_size=2)
+        next(chunks)
+        User.objects.filter(pk=self.bot_pks[2]).update(email="person@example.com")
+
+        self.assertEqual(sum(chunk.deleted for chunk in chunks), 2)
+        self.assertTrue(User.objects.filter(pk=self.bot_pks[2]).exists())
+
+    def test_deletes_enrollments_and_forgets_roles(self):
+        bot = self.bots[0]
+        Enrollment.objects.create(semester=self.semester, user=bot)
+        self.assertTrue(get_roles(bot, self.semester).is_enrolled)
+        other = Enrollment.objects.create(semester=self.semester, user=self.human)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            chunks = list(delete_in_chunks(self.queryset, chunk_size=10))
+
+        self.assertEqual(chunks[0].cascaded, {"portal.Enrollment": 1})
+        self.assertEqual(list(Enrollment.objects.all()), [other])
+        self.assertFalse(get_roles(User(pk=bot.pk), self.semester).is_enrolled)
+
+    @patch("portal.deletion.sleep")
+    def test_limits_rate(self, sleep):
+        list(delete_in_chunks(self.queryset, chunk_size=2, max_rows_per_second=1))
+
+        self.assertEqual(sleep.call_count, 3)
+        self.assertGreater(sleep.call_args.args[0], 0)
@@ -0,0 +1,163 @@
+import json
+from unittest import mock
+
+import httpx
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from portal import tasks
+from portal.services import discord
+
+
+def response(status_code=200, headers=None, body=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps(body or {}).encode()
+    return response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ("monotonic", "sleep"):
+            patcher = mock.patch(
+                f"portal.services.discord.{name}", getattr(self.clock, name)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(discord, "rate_limiter", discord.RateLimiter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, *responses):
+        with mock.patch.object(
+            discord.session, "request", side_effect=responses
+        ) as request:
+            result = discord.api_request("GET", "/guilds/1/members")
+        return result, request.call_count
+
+    def test_waits_for_exhausted_bucket(self):
+        headers = {
+            "X-RateLimit-Bucket": "abc",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset-After": "2.5",
+        }
+        self.request(response(headers=headers))
+        self.request(response())
+
+        self.assertEqual(self.clock.sleeps, [2.5])
+
+    def test_retries_429_after_retry_after(self):
+        headers = {"X-RateLimit-Bucket": "abc", "X-RateLimit-Remaining": "0"}
+        result, calls = self.request(
+            response(429, headers, {"retry_after": 1.5}), response()
+        )
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(calls, 2)
+        self.assertEqual(self.clock.sleeps, [1.5])
+
+    def test_retries_429_without_bucket_after_retry_after(self):
+        result, calls = self.request(
+            response(429, {"Retry-After": "3"}),
+            response(429, body={"retry_after": 2}),
+            response(),
+        )
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(calls, 3)
+        self.assertEqual(self.clock.sleeps, [3, 2])
+
+    def test_global_429_pauses_every_route(self):
+        self.request(response(429, body={"retry_after": 4, "global": True}), response())
+        with mock.patch.object(discord.session, "request", return_value=response()):
+            discord.api_request("GET", "/channels/2")
+
+        self.assertEqual(self.clock.sleeps, [4])
+
+    def test_gives_up_after_max_retries(self):
+        with (
+            mock.patch.object(
+                discord.session,
+                "request",
+                return_value=response(429, body={"retry_after": 1}),
+            ) as request,
+            self.assertRaises(requests.HTTPError),
+        ):
+            discord.api_request("GET", "/guilds/1/members", max_retries=2)
+
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(self.clock.sleeps, [1, 1])
+
+    async def test_async_retries_429_after_retry_after(self):
+        async def sleep(seconds):
+            self.clock.sleep(seconds)
+
+        request = httpx.Request("GET", discord.DISCORD_API_ENDPOINT + "/users/@me")
+        responses = [
+            httpx.Response(429, json={"retry_after": 2}, request=request),
+            httpx.Response(200, json={}, request=request),
+        ]
+        with (
+            mock.patch("portal.services.http.request", side_effect=responses),
+            mock.patch("asyncio.sleep", sleep),
+        ):
+            result = await discord.aapi_request("GET", "/users/@me")
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.clock.sleeps, [2])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DeleteChannelsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        cache.set(
+            discord.SERVER_CHANNELS_CACHE_KEY,
+            {
+                "channels": {
+                    id: {"id": id, "name": id} for id in ("general", "a", "b", "c")
+                },
+                "fetched_at": None,
+            },
+        )
+        patcher = mock.patch.object(
+            discord, "api_request", return_value=response(body={})
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_removes_deleted_channel_from_snapshot(self):
+        discord.delete_channel("a")
+
+        self.assertEqual(
+            set(cache.get(discord.SERVER_CHANNELS_CACHE_KEY)["channels"]),
+            {"general", "b", "c"},
+        )
+
+    def test_clears_snapshot_after_deleting_concurrently(self):
+        with mock.patch.object(
+            discord, "remove_cached_server_channel"
+        ) as remove_cached_server_channel:
+            results = tasks.delete_discord_channels.apply(args=(["a", "b", "c"],)).get()
+
+        self.assertEqual(results, {"deleted": 3, "missing": 0, "failed": 0})
+        remove_cached_server_channel.assert_not_called()
+        self.assertIsNone(cache.get(discord.SERVER_CHANNELS_CACHE_KEY))
@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from portal.discord_reconcile import diff_server_members, get_expected_roles
+from portal.models import Enrollment, Project, Semester, User
+
+
+@override_settings(
+    DISCORD_VERIFIED_ROLE_ID="verified", DISCORD_PROJECT_LEAD_ROLE_ID="lead"
+)
+class DiffServerMembersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(
+            slug="portal", name="Portal", discord_role_id="portal"
+        )
+        cls.lead = User.objects.create_user(
+            "lead@example.com",
+            first_name="Lee",
+            is_approved=True,
+            discord_user_id="1",
+        )
+
+    def create_active_semester(self):
+        today = date.today()
+        return Semester.objects.create(
+            id=f"{today.year}01",
+            name="Test Semester",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+        )
+
+    def diff(self, members):
+        with mock.patch(
+            "portal.services.discord.list_server_members", return_value=members
+        ):
+            return diff_server_members()
+
+    def test_adds_missing_roles_and_nickname(self):
+        semester = self.create_active_semester()
+        Enrollment.objects.create(
+            semester=semester,
+            user=self.lead,
+            project=self.project,
+            is_project_lead=True,
+        )
+
+        [delta] = self.diff([{"user": {"id": "1"}, "nick": None, "roles": []}])
+
+        self.assertEqual(delta.user, self.lead)
+        self.assertEqual(delta.nickname, self.lead.display_name)
+        self.assertEqual(delta.add_roles, {"verified", "portal", "lead"})
+        self.assertEqual(delta.remove_roles, set())
+
+    def test_removes_managed_roles_only(self):
+        self.create_active_semester()
+        member = {
+            "user": {"id": "1"},
+            "nick": self.lead.display_name,
+            "roles": ["verified", "portal", "lead", "by-hand"],
+        }
+
+        [delta] = self.diff([member])
+
+        self.assertIsNone(delta.nickname)
+        self.assertEqual(delta.add_roles, set())
+        self.assertEqual(delta.remove_roles, {"portal", "lead"})
+
+    def test_skips_members_in_line_and_unlinked(self):
+        member = {
+            "user": {"id": "1"},
+            "nick": self.lead.display_name,
+            "roles": ["verified"],
+        }
+        stranger = {"user": {"id": "2"}, "nick": None, "roles": ["portal"]}
+
+        self.assertEqual(self.diff([member, stranger]), [])
+
+    def test_keeps_project_roles_without_active_semester(self):
+        member = {
+            "user": {"id": "1"},
+            "nick": self.lead.display_name,
+            "roles": ["verified", "portal", "lead"],
+        }
+
+        self.assertEqual(self.diff([member]), [])
+
+    def test_expects_roles_of_linked_users_only(self):
+        semester = self.create_active_semester()
+        for email, discord_user_id in (
+            ("unlinked@example.com", None),
+            ("blank@example.com", ""),
+        ):
+            user = User.objects.create_user(
+                email, is_approved=True, discord_user_id=discord_user_id
+            )
+            Enrollment.objects.create(
+                semester=semester, user=user, project=self.project
+            )
+
+        self.assertEqual(list(get_expected_roles(semester)), ["1"])
@@ -0,0 +1,26 @@
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+
+from portal.services import http
+
+
+@http.closes_client
+async def view(request):
+    view.client = http.get_client()
+    return HttpResponse()
+
+
+class ClosesClientTests(SimpleTestCase):
+    def test_closes_client_under_wsgi(self):
+        async_to_sync(view)(RequestFactory().get("/"))
+
+        self.assertTrue(view.client.is_closed)
+
+    async def test_keeps_client_under_asgi(self):
+        await view(AsyncRequestFactory().get("/"))
+
+        self.assertFalse(view.client.is_closed)
+        self.assertIs(http.get_client(), view.client)
+        await http.aclose_client()
+        self.assertTrue(view.client.is_closed)
@@ -0,0 +1,156 @@
+import json
+from unittest import mock
+
+from django.core import mail as outbox
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import SimpleTestCase, override_settings
+
+from portal import mail
+from portal.redis_client import get_redis_client
+
+
+class FlakyEmailBackend(EmailBackend):
+    """Fails to send to anyone at fail.example.com."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(to.endswith("@fail.example.com") for to in message.to):
+                raise ConnectionError("Failed to send")
+        return super().send_messages(messages)
+
+
+def payload(to: str, **kwargs) -> dict:
+    return mail.serialize(EmailMultiAlternatives("Subject", "Body", to=[to], **kwargs))
+
+
+class SerializeTests(SimpleTestCase):
+    def test_round_trip(self):
+        message = EmailMultiAlternatives(
+            "Subject",
+            "Body",
+            "from@example.com",
+            to=["to@example.com"],
+            cc=["cc@example.com"],
+            bcc=["bcc@example.com"],
+            reply_to=["reply@example.com"],
+            headers={"X-Tag": "login"},
+        )
+        message.attach_alternative("<p>Body</p>", "text/html")
+        message.attach("notes.txt", "Notes", "text/plain")
+        message.attach("data.bin", b"\x00\xff", "application/octet-stream")
+
+        # Through JSON as it goes through Redis and Celery
+        copy = mail.deserialize(json.loads(json.dumps(mail.serialize(message))))
+
+        for attribute in (
+            "subject",
+            "body",
+            "from_email",
+            "to",
+            "cc",
+            "bcc",
+            "reply_to",
+            "extra_headers",
+            "content_subtype",
+        ):
+            self.assertEqual(getattr(copy, attribute), getattr(message, attribute))
+        self.assertEqual(
+            [tuple(a) for a in copy.alternatives],
+            [tuple(a) for a in message.alternatives],
+        )
+        self.assertEqual(
+            copy.attachments,
+            [
+                ("notes.txt", "Notes", "text/plain"),
+                ("data.bin", b"\x00\xff", "application/octet-stream"),
+            ],
+        )
+
+
+@override_settings(EMAIL_DELIVERY_BACKEND="portal.tests.test_mail.FlakyEmailBackend")
+class SendTests(SimpleTestCase):
+    def setUp(self):
+        keys = (mail.QUEUE_KEY, mail.PROCESSING_KEY, mail.LOCK_KEY)
+        get_redis_client().delete(*keys)
+        self.addCleanup(get_redis_client().delete, *keys)
+        patcher = mock.patch("portal.tasks.send_emails.apply_async")
+        self.retry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_failed_messages_with_backoff(self):
+        failing = payload("to@fail.example.com")
+        failing["attempts"] = 2
+
+        with self.assertLogs("portal.mail", "ERROR"):
+            results = mail.send_batch([payload("to@example.com"), failing])
+
+        self.assertEqual(results, {"sent": 1, "retrying": 1, "failed": 0})
+        self.assertEqual(outbox.outbox[0].to, ["to@example.com"])
+        ([retrying],) = self.retry.call_args.args[0]
+        self.assertEqual(retrying["to"], ["to@fail.example.com"])
+        self.assertEqual(retrying["attempts"], 3)
+        self.assertEqual(
+            self.retry.call_args.kwargs["countdown"], mail.RETRY_DELAY_SECONDS * 4
+        )
+
+    def test_gives_up_after_max_attempts(self):
+        failing = payload("to@fail.example.com")
+        failing["attempts"] = mail.MAX_ATTEMPTS - 1
+
+        with self.assertLogs("portal.mail", "ERROR"):
+            results = mail.send_batch([failing])
+
+        self.assertEqual(results, {"sent": 0, "retrying": 0, "failed": 1})
+        self.retry.assert_not_called()
+
+    def test_flush_sends_queue_in_batches(self):
+        get_redis_client().rpush(
+            mail.QUEUE_KEY,
+            *[json.dumps(payload(f"{i}@example.com")) for i in range(3)],
+        )
+
+        with mock.patch.object(mail, "BATCH_SIZE", 2):
+            results = mail.flush_queue()
+
+        self.assertEqual(results, {"sent": 3, "retrying": 0, "failed": 0})
+        self.assertEqual(
+            [message.to for message in outbox.outbox],
+            [["0@example.com"], ["1@example.com"], ["2@example.com"]],
+        )
+        self.assertEqual(get_redis_client().llen(mail.PROCESSING_KEY), 0)
+
+    def test_flush_requeues_interrupted_batch_first(self):
+        client = get_redis_client()
+        client.rpush(mail.PROCESSING_KEY, json.dumps(payload("0@example.com")))
+        client.rpush(mail.PROCESSING_KEY, json.dumps(payload("1@example.com")))
+        client.rpush(mail.QUEUE_KEY, json.dumps(payload("2@example.com")))
+
+        with self.assertLogs("portal.mail", "WARNING"):
+            results = mail.flush_queue()
+
+        self.assertEqual(results["sent"], 3)
+        self.assertEqual(
+            [message.to for message in outbox.outbox],
+            [["0@example.com"], ["1@example.com"], ["2@example.com"]],
+        )
+
+    def test_flush_keeps_batch_when_sending_dies(self):
+        get_redis_client().rpush(mail.QUEUE_KEY, json.dumps(payload("to@example.com")))
+
+        with (
+            mock.patch.object(mail, "send_batch", side_effect=SystemExit),
+            self.assertRaises(SystemExit),
+        ):
+            mail.flush_queue()
+
+        self.assertEqual(get_redis_client().llen(mail.PROCESSING_KEY), 1)
+
+    def test_flush_skipped_while_another_runs(self):
+        get_redis_client().rpush(mail.QUEUE_KEY, json.dumps(payload("to@example.com")))
+        lock = get_redis_client().lock(mail.LOCK_KEY, timeout=mail.LOCK_TIMEOUT)
+        lock.acquire()
+        self.addCleanup(lock.release)
+
+        self.assertEqual(mail.flush_queue(), {"sent": 0, "retrying": 0, "failed": 0})
+        self.assertEqual(get_redis_client().llen(mail.QUEUE_KEY), 1)
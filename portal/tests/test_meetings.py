@@ -0,0 +1,278 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from portal import live_attendance
+from portal.calendar import fold_line, get_calendar_token
+from portal.models import Enrollment, Meeting, MeetingAttendance, Semester, User
+from portal.redis_client import get_redis_client
+
+
+class MeetingTestCase(TestCase):
+    """Creates an active semester, a superuser, and an upcoming large group meeting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.semester = Semester.objects.create(
+            id=f"{today.year}01",
+            name="Test Semester",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+        )
+        starts_at = timezone.now() + timedelta(days=1)
+        cls.admin = User.objects.create_superuser("admin@example.com", "password")
+        cls.meeting = Meeting.objects.create(
+            semester=cls.semester,
+            name="Kickoff",
+            type=Meeting.LARGE_GROUP,
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(hours=2),
+        )
+
+
+class MeetingDetailViewTests(MeetingTestCase):
+    def test_renders_meeting(self):
+        response = self.client.get(reverse("meetings_detail", args=[self.meeting.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Kickoff")
+        self.assertFalse(response.context["can_manage_attendance"])
+
+
+class MeetingAttendanceStreamTests(MeetingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = User.objects.create_user("student@example.com", first_name="Sam")
+
+    def setUp(self):
+        self.addCleanup(
+            get_redis_client().delete,
+            live_attendance.stream_key(self.meeting.pk),
+        )
+        self.url = reverse("meeting_attendance_stream", args=[self.meeting.pk])
+
+    def test_forbidden_to_students(self):
+        self.client.force_login(self.student)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_returns_events_after_cursor(self):
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            live_attendance.publish(
+                self.meeting, [live_attendance.attendance_event(self.student, "added")]
+            )
+        cursor = live_attendance.get_cursor(self.meeting)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = response.content.decode()
+        self.assertIn(f"retry: {live_attendance.RETRY_MILLISECONDS}", content)
+        self.assertIn(f"id: {cursor}\nevent: attendance\n", content)
+        self.assertIn('"action": "added"', content)
+
+        response = self.client.get(self.url, headers={"Last-Event-ID": cursor})
+
+        self.assertNotIn("event: attendance", response.content.decode())
+
+
+class VerifyManyTests(MeetingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.mentor = User.objects.create_user("mentor@example.com")
+        cls.students = [
+            User.objects.create_user(f"student{i}@example.com") for i in range(3)
+        ]
+
+    def test_empty_paste_does_nothing(self):
+        with self.assertNumQueries(0):
+            results = MeetingAttendance.objects.verify_many(
+                self.meeting, [], self.mentor
+            )
+
+        self.assertEqual(results, {})
+        self.assertFalse(MeetingAttendance.objects.exists())
+
+    def test_verifies_and_enrolls(self):
+        added, pending, verified = self.students
+        MeetingAttendance.objects.create(
+            meeting=self.meeting, user=pending, is_verified=False
+        )
+        MeetingAttendance.objects.create(
+            meeting=self.meeting, user=verified, is_verified=True
+        )
+
+        results = MeetingAttendance.objects.verify_many(
+            self.meeting, self.students, self.mentor
+        )
+
+        self.assertEqual(
+            results,
+            {
+                added.pk: "added",
+                pending.pk: "verified",
+                verified.pk: "already verified",
+            },
+        )
+        self.assertEqual(
+            set(
+                MeetingAttendance.objects.filter(
+                    meeting=self.meeting, is_verified=True
+                ).values_list("user_id", flat=True)
+            ),
+            {added.pk, pending.pk, verified.pk, self.mentor.pk},
+        )
+        self.assertEqual(
+            set(
+                Enrollment.objects.filter(semester=self.semester).values_list(
+                    "user_id", flat=True
+                )
+            ),
+            {added.pk, pending.pk, verified.pk},
+        )
+
+    def test_verifying_again_changes_nothing(self):
+        MeetingAttendance.objects.verify_many(self.meeting, self.students, self.mentor)
+
+        results = MeetingAttendance.objects.verify_many(
+            self.meeting, self.students, self.mentor
+        )
+
+        self.assertEqual(set(results.values()), {"already verified"})
+        self.assertEqual(
+            MeetingAttendance.objects.filter(meeting=self.meeting).count(), 4
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class MeetingsCalendarFeedTests(MeetingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.draft = Meeting.objects.create(
+            semester=cls.semester,
+            name="Mentor Planning",
+            type=Meeting.MENTOR,
+            is_published=False,
+            starts_at=cls.meeting.starts_at,
+            ends_at=cls.meeting.ends_at,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_public_feed(self):
+        response = self.client.get(reverse("meetings_public_calendar_feed"))
+
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertContains(response, f"UID:meeting-{self.meeting.pk}@")
+        self.assertNotContains(response, "Mentor Planning")
+
+    def test_personal_feed(self):
+        token = get_calendar_token(self.admin)
+        response = self.client.get(reverse("meetings_calendar_feed", args=[token]))
+
+        self.assertContains(response, "SUMMARY:Mentor Planning")
+        self.assertContains(response, "STATUS:TENTATIVE")
+
+        response = self.client.get(
+            reverse("meetings_calendar_feed", args=[token + "x"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_cached_until_meetings_change(self):
+        url = reverse("meetings_public_calendar_feed")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.meeting.name = "Welcome Back"
+        self.meeting.save()
+
+        self.assertContains(self.client.get(url), "Welcome Back")
+
+    def test_folds_long_lines(self):
+        line = "DESCRIPTION:" + "é" * 100
+
+        folded = fold_line(line)
+
+        self.assertEqual(folded.replace("\r\n ", ""), line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split("\r\n")))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class MeetingsSyncApiTests(MeetingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Meeting.objects.create(
+            semester=cls.semester,
+            name="Workshop",
+            type=Meeting.WORKSHOP,
+            starts_at=cls.meeting.starts_at,
+            ends_at=cls.meeting.ends_at,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("meetings_sync_api")
+
+    def sync(self, since=None) -> dict:
+        response = self.client.get(self.url, {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync(self):
+        data = self.sync()
+
+        self.assertTrue(data["is_full_sync"])
+        self.assertEqual(
+            {meeting["id"] for meeting in data["meetings"]},
+            {self.meeting.pk, self.other.pk},
+        )
+        self.assertEqual(data["removed"], [])
+
+    def test_changes_since_last_sync(self):
+        synced_at = self.sync()["synced_at"]
+        self.meeting.name = "Welcome Back"
+        self.meeting.save()
+        self.other.is_published = False
+        self.other.save()
+        deleted = Meeting.objects.create(
+            semester=self.semester,
+            name="Cancelled",
+            type=Meeting.WORKSHOP,
+            starts_at=self.meeting.starts_at,
+            ends_at=self.meeting.ends_at,
+        )
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        data = self.sync(synced_at)
+
+        self.assertFalse(data["is_full_sync"])
+        self.assertEqual(
+            [meeting["title"] for meeting in data["meetings"]], ["Welcome Back"]
+        )
+        self.assertCountEqual(data["removed"], [deleted_pk, self.other.pk])
+
+    def test_full_sync_when_deletions_are_forgotten(self):
+        since = timezone.now() - Meeting.DELETED_RETENTION - timedelta(days=1)
+
+        self.assertTrue(self.sync(since.isoformat())["is_full_sync"])
+
+    def test_rejects_invalid_since(self):
+        response = self.client.get(self.url, {"since": "yesterday"})
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,109 @@
+import logging
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from portal.middleware import (
+    NPlusOneMiddleware,
+    ReplicaStickinessMiddleware,
+    ServerTimingMiddleware,
+)
+from portal.models import User
+from portal.nplusone import NPlusOneError
+
+
+def count_users(request) -> HttpResponse:
+    return HttpResponse(User.objects.count())
+
+
+async def acount_users(request) -> HttpResponse:
+    return await sync_to_async(count_users)(request)
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    def test_times_queries(self):
+        middleware = ServerTimingMiddleware(count_users)
+
+        response = middleware(RequestFactory().get("/"))
+
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn('desc="1"', response["Server-Timing"])
+
+    async def test_stays_async_and_times_queries(self):
+        middleware = ServerTimingMiddleware(acount_users)
+
+        response = await middleware(RequestFactory().get("/"))
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn('desc="1"', response["Server-Timing"])
+
+
+def count_users_twice(request) -> HttpResponse:
+    User.objects.count()
+    return count_users(request)
+
+
+async def acount_users_twice(request) -> HttpResponse:
+    return await sync_to_async(count_users_twice)(request)
+
+
+@override_settings(NPLUSONE_MODE="strict", NPLUSONE_THRESHOLD=1)
+class NPlusOneMiddlewareTests(TestCase):
+    def test_detects_repeated_queries(self):
+        with self.assertRaises(NPlusOneError):
+            NPlusOneMiddleware(count_users_twice)(RequestFactory().get("/"))
+
+    async def test_stays_async_and_detects_repeated_queries(self):
+        middleware = NPlusOneMiddleware(acount_users_twice)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertRaises(NPlusOneError):
+            await middleware(RequestFactory().get("/"))
+
+
+async def respond(request) -> HttpResponse:
+    return HttpResponse()
+
+
+@mock.patch("portal.routers.replica_configured", return_value=True)
+class ReplicaStickinessMiddlewareTests(TestCase):
+    async def test_stays_async_and_pins_after_submitting(self, _):
+        middleware = ReplicaStickinessMiddleware(respond)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().post("/"))
+        self.assertIn(ReplicaStickinessMiddleware.cookie_name, response.cookies)
+
+        request = RequestFactory().get("/")
+        request.COOKIES = {
+            ReplicaStickinessMiddleware.cookie_name: response.cookies[
+                ReplicaStickinessMiddleware.cookie_name
+            ].value
+        }
+        response = await middleware(request)
+        self.assertTrue(request.pinned_to_primary)
+        self.assertNotIn(ReplicaStickinessMiddleware.cookie_name, response.cookies)
+
+
+class AsgiMiddlewareTests(TestCase):
+    # Adapted handlers are only logged in debug mode
+    @override_settings(DEBUG=True)
+    def test_no_middleware_adapted_to_sync(self):
+        with self.assertLogs("django.request", "DEBUG") as logs:
+            handler = ASGIHandler()
+            logging.getLogger("django.request").debug("Loaded middleware")
+
+        self.assertEqual([m for m in logs.output if "adapted" in m], [])
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+    async def test_serves_requests(self):
+        response = await self.async_client.get(reverse("meetings_public_calendar_feed"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
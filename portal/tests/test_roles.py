@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from portal.models import Enrollment, Meeting, Project, Semester, User
+from portal.roles import forget_roles, get_roles
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class GetRolesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.semester = Semester.objects.create(
+            id=f"{today.year}01",
+            name="Test Semester",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+        )
+        cls.project = Project.objects.create(slug="portal", name="Portal")
+        cls.user = User.objects.create_user("mentor@example.com")
+        cls.enrollment = Enrollment.objects.create(
+            semester=cls.semester, user=cls.user, project=cls.project, is_mentor=True
+        )
+
+    def setUp(self):
+        # The users' primary keys are reused from test to test
+        cache.clear()
+
+    def fresh_user(self) -> User:
+        """The user as a new request would load them, without roles remembered on them."""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_anonymous_and_no_semester(self):
+        self.assertEqual(get_roles(AnonymousUser(), self.semester).user_id, None)
+
+        roles = get_roles(self.user, None)
+
+        self.assertFalse(roles.is_enrolled)
+        self.assertEqual(roles.user_id, self.user.pk)
+
+    def test_reads_enrollment_once(self):
+        with self.assertNumQueries(1):
+            roles = get_roles(self.user, self.semester)
+            # Remembered on the user
+            self.assertIs(get_roles(self.user, self.semester.pk), roles)
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            # Cached for other requests
+            roles = get_roles(user, self.semester)
+
+        self.assertTrue(roles.is_enrolled)
+        self.assertTrue(roles.is_mentor)
+        self.assertFalse(roles.leads(self.project))
+        self.assertEqual(roles.project_id, self.project.pk)
+
+    def test_caches_not_being_enrolled(self):
+        other = User.objects.create_user("other@example.com")
+        get_roles(other, self.semester)
+
+        with self.assertNumQueries(0):
+            roles = get_roles(User(pk=other.pk), self.semester)
+
+        self.assertFalse(roles.is_enrolled)
+
+    def test_enrollment_changes_clear_cache(self):
+        get_roles(self.user, self.semester)
+
+        self.enrollment.is_mentor = False
+        self.enrollment.is_project_lead = True
+        self.enrollment.save()
+        roles = get_roles(self.fresh_user(), self.semester)
+
+        self.assertFalse(roles.is_mentor)
+        self.assertTrue(roles.leads(self.project))
+
+        self.enrollment.delete()
+
+        self.assertFalse(get_roles(self.fresh_user(), self.semester).is_enrolled)
+
+    def test_forget_roles_after_update(self):
+        get_roles(self.user, self.semester)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(is_coordinator=True)
+
+        self.assertFalse(get_roles(self.fresh_user(), self.semester).is_coordinator)
+
+        forget_roles([self.user.pk], self.semester.pk)
+
+        self.assertTrue(get_roles(self.fresh_user(), self.semester).is_coordinator)
+
+    def test_can_manage_attendance(self):
+        meeting = Meeting(semester=self.semester, type=Meeting.SMALL_GROUP)
+        mentor_meeting = Meeting(semester=self.semester, type=Meeting.MENTOR)
+        hosted = Meeting(semester=self.semester, type=Meeting.MENTOR, host=self.user)
+        roles = get_roles(self.user, self.semester)
+
+        self.assertTrue(roles.can_manage_attendance(meeting))
+        self.assertFalse(roles.can_manage_attendance(mentor_meeting))
+        self.assertTrue(roles.can_manage_attendance(hosted))
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from portal.models import ShortLink, _shortlink_urls
+from portal.redis_client import get_redis_client
+from portal.tasks import flush_shortlink_clicks
+
+
+class ShortLinkTests(TestCase):
+    def setUp(self):
+        keys = (ShortLink.CLICKS_KEY, ShortLink.FLUSHING_CLICKS_KEY)
+        get_redis_client().delete(*keys)
+        self.addCleanup(get_redis_client().delete, *keys)
+        for code in ("docs", "missing"):
+            self.addCleanup(cache.delete, ShortLink.url_cache_key(code))
+        self.addCleanup(_shortlink_urls.clear)
+
+    def test_remembers_missing_codes(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(ShortLink.resolve("missing"))
+            self.assertIsNone(ShortLink.resolve("missing"))
+
+        ShortLink.objects.create(code="missing", url="https://example.com/")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ShortLink.resolve("missing"), "https://example.com/")
+
+    def test_flushes_clicks(self):
+        docs = ShortLink.objects.create(code="docs", url="https://example.com/")
+        for _ in range(3):
+            ShortLink.record_click("docs")
+
+        flush_shortlink_clicks()
+        ShortLink.record_click("docs")
+
+        docs.refresh_from_db()
+        self.assertEqual(docs.click_count, 3)
+        self.assertEqual(
+            get_redis_client().hgetall(ShortLink.CLICKS_KEY), {b"docs": b"1"}
+        )
+
+        flush_shortlink_clicks()
+        flush_shortlink_clicks()
+
+        docs.refresh_from_db()
+        self.assertEqual(docs.click_count, 4)
+
+    def test_flushes_counts_of_interrupted_flush_first(self):
+        docs = ShortLink.objects.create(code="docs", url="https://example.com/")
+        get_redis_client().hset(ShortLink.FLUSHING_CLICKS_KEY, "docs", 2)
+        ShortLink.record_click("docs")
+
+        flush_shortlink_clicks()
+
+        docs.refresh_from_db()
+        self.assertEqual(docs.click_count, 2)
+
+        flush_shortlink_clicks()
+
+        docs.refresh_from_db()
+        self.assertEqual(docs.click_count, 3)
@@ -0,0 +1,22 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+# A cache of its own, so counts don't depend on what other runs left in Redis
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ViewBudgetTests(TestCase):
+    """Checks every view's query and cache call counts against stresstests/budgets.json, which
+    are recorded against `generate_synthetic_data` at its default scale and seed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("generate_synthetic_data", stdout=StringIO())
+
+    def test_views_within_budget(self):
+        call_command(
+            "benchmark_views", "--counts-only", "--repeat=1", stdout=StringIO()
+        )
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from portal.views.admin import (
@@ -6,7 +7,12 @@ from portal.views.admin import (
     import_submitty_enrollments,
     import_submitty_teams,
 )
-from portal.views.discord import DiscordAdminIndex, delete_discord_channels
+from portal.views.discord import (
+    DiscordAdminIndex,
+    delete_discord_channels,
+    discord_channel_deletion_progress,
+    refresh_discord_channels,
+)
 from portal.views.mentors import MentorApplicationView, mentor_applications_index
 from portal.views.organizations import organizations_index
 from portal.views.shortlink import shortlink_redirect
@@ -16,6 +22,7 @@ from .views.auth import (
     discord_flow_callback,
     github_flow_callback,
     impersonate,
+    loadtest_login,
     profile,
     start_discord_flow,
     start_github_flow,
@@ -28,8 +35,11 @@ from .views.meetings import (
     SubmitAttendanceFormView,
     export_meeting_attendance,
     manually_add_or_verify_attendance,
+    meeting_attendance_stream,
     meetings_api,
+    meetings_calendar_feed,
     meetings_index,
+    meetings_sync_api,
     schedule_workshop,
     user_attendance,
 )
@@ -102,7 +112,23 @@ urlpatterns = [
         export_meeting_attendance,
         name="export_meeting_attendance",
     ),
+    path(
+        "meetings/<int:pk>/attendance/stream/",
+        meeting_attendance_stream,
+        name="meeting_attendance_stream",
+    ),
     path("api/meetings/", meetings_api, name="meetings_api"),
+    path("api/meetings/sync/", meetings_sync_api, name="meetings_sync_api"),
+    path(
+        "meetings/calendar.ics",
+        meetings_calendar_feed,
+        name="meetings_public_calendar_feed",
+    ),
+    path(
+        "meetings/calendar/<str:token>.ics",
+        meetings_calendar_feed,
+        name="meetings_calendar_feed",
+    ),
     # Mentor Routes
     path(
         "mentors/applications/", mentor_applications_index, name="mentor_applications"
@@ -132,6 +158,16 @@ urlpatterns = [
         delete_discord_channels,
         name="discord_admin_delete_channels",
     ),
+    path(
+        "admin/discord/delete-channels/<str:task_id>/",
+        discord_channel_deletion_progress,
+        name="discord_admin_channel_deletion_progress",
+    ),
+    path(
+        "admin/discord/refresh-channels/",
+        refresh_discord_channels,
+        name="discord_admin_refresh_channels",
+    ),
     # Admin Routes
     path(
         "admin/import/enrollments/",
@@ -156,3 +192,6 @@ urlpatterns = [
     # ShortLink redirect route (move to end, make more specific)
     path("r/<str:code>/", shortlink_redirect, name="shortlink_redirect"),
 ]
+
+if settings.LOADTEST_LOGIN_TOKEN:
+    urlpatterns += (path("loadtest/login/", loadtest_login, name="loadtest_login"),)
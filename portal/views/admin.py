@@ -11,7 +11,16 @@ from django.http import HttpResponse
 from django.shortcuts import render
 
 from portal.forms import SemesterCSVUploadForm, SemesterForm
-from portal.models import Enrollment, Project, ProjectPitch, Semester, SmallGroup, User
+from portal.models import (
+    Enrollment,
+    Organization,
+    Project,
+    ProjectPitch,
+    Semester,
+    SmallGroup,
+    User,
+)
+from portal.routers import use_replica
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +94,7 @@ def import_submitty_enrollments(request):
             semester = Semester.objects.get(pk=request.POST["semester"])
 
             rows = TextIOWrapper(file, encoding="utf-8", newline="")
+            organization_domains = Organization.get_email_domains()
             for row in DictReader(rows):
                 row: SubmittyCSVRow
 
@@ -100,7 +110,12 @@ def import_submitty_enrollments(request):
                             Q(rcs_id=rcs_id) | Q(email=row["Email"])
                         )
                     except User.DoesNotExist:
-                        user = User(email=row["Email"])
+                        user = User(
+                            email=row["Email"],
+                            organization=Organization.for_email(
+                                row["Email"], organization_domains
+                            ),
+                        )
 
                     if not user.first_name:
                         user.first_name = row["First Name"]
@@ -148,6 +163,7 @@ def import_submitty_teams(request):
             semester = Semester.objects.get(pk=request.POST["semester"])
 
             rows = TextIOWrapper(file, encoding="utf-8", newline="")
+            organization_domains = Organization.get_email_domains()
             for row in DictReader(rows):
                 row: SubmittyWithTeamsCSVRow
                 try:
@@ -156,7 +172,13 @@ def import_submitty_teams(request):
                     try:
                         user = User.objects.get(rcs_id=rcs_id)
                     except User.DoesNotExist:
-                        user = User(email=rcs_id + "@rpi.edu")
+                        email = rcs_id + "@rpi.edu"
+                        user = User(
+                            email=email,
+                            organization=Organization.for_email(
+                                email, organization_domains
+                            ),
+                        )
 
                     if not user.first_name:
                         user.first_name = row["Given Name"]
@@ -234,6 +256,7 @@ def import_google_form_projects(request):
             semester = Semester.objects.get(pk=request.POST["semester"])
 
             rows = TextIOWrapper(file, encoding="utf-8", newline="")
+            organization_domains = Organization.get_email_domains()
             for row in DictReader(rows):
                 row: GoogleFormProjectPitchRow
 
@@ -245,7 +268,12 @@ def import_google_form_projects(request):
                             Q(rcs_id=rcs_id) | Q(email=row["RPI Email (@rpi.edu)"])
                         )
                     except User.DoesNotExist:
-                        user = User(email=row["RPI Email (@rpi.edu)"])
+                        user = User(
+                            email=row["RPI Email (@rpi.edu)"],
+                            organization=Organization.for_email(
+                                row["RPI Email (@rpi.edu)"], organization_domains
+                            ),
+                        )
 
                     user.save()
 
@@ -315,16 +343,17 @@ def export_semester_projects(request):
             # Write the headers
             writer.writerow(["semester", "project name", "enrollments"])
 
-            for result in semester.projects.annotate(
-                enrollment_count=Count("enrollments")
-            ):
-                writer.writerow(
-                    [
-                        semester,
-                        result.name,
-                        result.enrollment_count,
-                    ]
-                )
+            with use_replica():
+                for result in semester.projects.annotate(
+                    enrollment_count=Count("enrollments")
+                ):
+                    writer.writerow(
+                        [
+                            semester,
+                            result.name,
+                            result.enrollment_count,
+                        ]
+                    )
 
             return response
     else:
@@ -1,21 +1,26 @@
 """Views relating to user actions."""
 
+from hmac import compare_digest
+
+import httpx
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import login
+from django.contrib.auth import alogin, login
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import BadRequest
 from django.db import IntegrityError
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.urls import reverse
-from requests import HTTPError
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from sentry_sdk import capture_exception
 
 from portal.forms import ExternalUserProfileForm, RPIUserProfileForm
 from portal.models import User
 from portal.services import discord, github
+from portal.services.http import closes_client
 
 
 @login_required
@@ -59,8 +64,26 @@ def impersonate(request: HttpRequest) -> HttpResponse:
     return redirect("/")
 
 
+@csrf_exempt
+@require_POST
+def loadtest_login(request: HttpRequest) -> HttpResponse:
+    """
+    Logs in as the user with the given email for load tests. Only routed when
+    `LOADTEST_LOGIN_TOKEN` is set and requires it in the `X-Loadtest-Token` header.
+    """
+    token = request.headers.get("X-Loadtest-Token", "")
+    if not settings.LOADTEST_LOGIN_TOKEN or not compare_digest(
+        token, settings.LOADTEST_LOGIN_TOKEN
+    ):
+        return HttpResponseForbidden()
+
+    user = get_object_or_404(User, email=request.POST.get("email"))
+    login(request, user, backend="django.contrib.auth.backends.ModelBackend")
+    return HttpResponse(status=204)
+
+
 def start_discord_flow(request: HttpRequest) -> HttpResponse:
-    return redirect(discord.DISCORD_OAUTH2_URL)
+    return redirect(discord.get_oauth2_url())
 
 
 @login_required
@@ -80,27 +103,29 @@ def unlink_discord(request: HttpRequest) -> HttpResponse:
     return redirect(reverse("profile"))
 
 
-def discord_flow_callback(request: HttpRequest) -> HttpResponse:
+@closes_client
+async def discord_flow_callback(request: HttpRequest) -> HttpResponse:
     code = request.GET.get("code")
     if not code:
         raise BadRequest("Denied Discord consent.")
 
     # Complete Discord OAuth2 flow to get tokens and then Discord user id
     try:
-        discord_user_tokens = discord.get_tokens(code)
+        discord_user_tokens = await discord.aget_tokens(code)
         discord_access_token = discord_user_tokens["access_token"]
-        discord_user_info = discord.get_user_info(discord_access_token)
-    except HTTPError as e:
+        discord_user_info = await discord.aget_user_info(discord_access_token)
+    except httpx.HTTPError as e:
         capture_exception(e)
         messages.error(request, "Yikes! Failed to link your Discord.")
         return redirect(reverse("profile"))
 
     discord_user_id = discord_user_info["id"]
 
-    if request.user.is_authenticated:
-        request.user.discord_user_id = discord_user_id
+    user = await request.auser()
+    if user.is_authenticated:
+        user.discord_user_id = discord_user_id
         try:
-            request.user.save()
+            await user.asave()
             messages.success(
                 request,
                 f"Successfully linked Discord account @{discord.discord_username(discord_user_info)} to your profile.",
@@ -115,28 +140,28 @@ def discord_flow_callback(request: HttpRequest) -> HttpResponse:
 
         # Attempt to add the Discord user to the server
         try:
-            joined_server = discord.upsert_server_member(
+            joined_server = await discord.aupsert_server_member(
                 discord_access_token,
                 discord_user_info["id"],
-                request.user.display_name,
-                [settings.DISCORD_VERIFIED_ROLE_ID]
-                if request.user.is_approved
-                else None,
+                user.display_name,
+                [settings.DISCORD_VERIFIED_ROLE_ID] if user.is_approved else None,
             )
 
             if joined_server:
                 # If the user was added to the server
                 messages.success(request, "Added you to the RCOS Discord server!")
 
-        except HTTPError as e:
+        except httpx.HTTPError as e:
             capture_exception(e)
             messages.warning(request, "Failed to add you to the RCOS Discord server...")
 
     else:
         # Login
         try:
-            user = User.objects.get(discord_user_id=discord_user_id)
-            login(request, user, backend="django.contrib.auth.backends.ModelBackend")
+            user = await User.objects.aget(discord_user_id=discord_user_id)
+            await alogin(
+                request, user, backend="django.contrib.auth.backends.ModelBackend"
+            )
         except User.DoesNotExist:
             messages.warning(
                 request,
@@ -150,21 +175,21 @@ def discord_flow_callback(request: HttpRequest) -> HttpResponse:
 
 
 def start_github_flow(request: HttpRequest) -> HttpResponse:
-    return redirect(github.GITHUB_AUTH_URL)
+    return redirect(github.get_auth_url())
 
 
-def github_flow_callback(request: HttpRequest) -> HttpResponse:
+@closes_client
+async def github_flow_callback(request: HttpRequest) -> HttpResponse:
     code = request.GET.get("code")
     if not code:
         raise BadRequest
 
     # Complete OAuth2 flow to receive access token and then GitHub username
     try:
-        github_user_tokens = github.get_tokens(code)
+        github_user_tokens = await github.aget_tokens(code)
         github_access_token = github_user_tokens["access_token"]
-        client = github.client_factory(github_access_token)
-        github_username = github.get_user_username(client)
-    except HTTPError as e:
+        github_username = await github.aget_user_username(github_access_token)
+    except (httpx.HTTPError, github.GitHubQueryError) as e:
         capture_exception(e)
         messages.error(request, "Yikes! Failed to link your GitHub.")
         return redirect(reverse("profile"))
@@ -173,10 +198,11 @@ def github_flow_callback(request: HttpRequest) -> HttpResponse:
         return redirect(reverse("profile"))
 
     # Determine whether to link user or log them in based on an existing link
-    if request.user.is_authenticated:
-        request.user.github_username = github_username
+    user = await request.auser()
+    if user.is_authenticated:
+        user.github_username = github_username
         try:
-            request.user.save()
+            await user.asave()
             messages.success(
                 request,
                 f"Successfully linked GitHub account @{github_username} "
@@ -190,8 +216,10 @@ def github_flow_callback(request: HttpRequest) -> HttpResponse:
     else:
         # Login user with that linked GitHub account
         try:
-            user = User.objects.get(github_username=github_username)
-            login(request, user, backend="django.contrib.auth.backends.ModelBackend")
+            user = await User.objects.aget(github_username=github_username)
+            await alogin(
+                request, user, backend="django.contrib.auth.backends.ModelBackend"
+            )
         except User.DoesNotExist:
             messages.warning(
                 request,
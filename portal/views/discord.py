@@ -2,7 +2,8 @@
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpRequest, HttpResponse
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.decorators import method_decorator
@@ -23,34 +24,36 @@ class DiscordAdminIndex(TemplateView):
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
 
-        # Fetch all channels from server
-        channels = discord.get_server_channels()
+        snapshot = discord.get_server_channels_snapshot()
 
         # Build hierarchy of channels in the following format:
         # (id, name): [child channels]
-        categories = {}
-        for channel in [
-            c for c in channels if c["type"] == discord.CATEGORY_CHANNEL_TYPE
-        ]:
-            key = (channel["id"], channel["name"] if "name" in channel else "")
-            categories[key] = [
-                c
-                for c in channels
-                if "parent_id" in c and c["parent_id"] == channel["id"]
-            ]
-        categories[(None, "No category")] = [
-            c
-            for c in channels
-            if "parent_id" not in c
-            or c["parent_id"] is None
-            and c["type"] != discord.CATEGORY_CHANNEL_TYPE
-        ]
+        categories = discord.group_channels_by_category(
+            list(snapshot["channels"].values())
+        )
 
         data["categories"] = categories.items()
+        data["channels_fetched_at"] = snapshot["fetched_at"]
+
+        latest_deletion_id = cache.get(tasks.LATEST_CHANNEL_DELETION_CACHE_KEY)
+        if latest_deletion_id:
+            data["channel_deletion_progress_url"] = reverse(
+                "discord_admin_channel_deletion_progress", args=(latest_deletion_id,)
+            )
 
         return data
 
 
+@login_required
+@user_passes_test(is_admin)
+def refresh_discord_channels(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST":
+        discord.get_server_channels_snapshot(force_refresh=True)
+        messages.success(request, "Refreshed the Discord channels.")
+
+    return redirect(reverse("discord_admin_index"))
+
+
 @login_required
 @user_passes_test(is_admin)
 def delete_discord_channels(request: HttpRequest) -> HttpResponse:
@@ -64,7 +67,27 @@ def delete_discord_channels(request: HttpRequest) -> HttpResponse:
         # TODO: run some checks about these channels
 
         # Kick off a task to delete these channels
-        tasks.delete_discord_channels.delay(channel_ids)
+        result = tasks.delete_discord_channels.delay(channel_ids)
+        cache.set(
+            tasks.LATEST_CHANNEL_DELETION_CACHE_KEY,
+            result.id,
+            tasks.CHANNEL_DELETION_CACHE_TIMEOUT,
+        )
         messages.success(request, "Deleting the Discord channels in the background...")
 
     return redirect(reverse("discord_admin_index"))
+
+
+@login_required
+@user_passes_test(is_admin)
+def discord_channel_deletion_progress(request: HttpRequest, task_id: str):
+    progress = cache.get(tasks.channel_deletion_cache_key(task_id))
+    if progress is None:
+        # The task may not have started yet
+        if cache.get(tasks.LATEST_CHANNEL_DELETION_CACHE_KEY) == task_id:
+            return JsonResponse(
+                {"total": None, "names": {}, "results": {}, "finished_at": None}
+            )
+        raise Http404("No such channel deletion.")
+
+    return JsonResponse(progress)
@@ -7,7 +7,7 @@ from django.views.generic.base import TemplateView
 
 from portal.checks import CheckUserCanCreateProject, CheckUserCanEnroll, CheckUserRPI
 from portal.forms import SubmitAttendanceForm
-from portal.models import Enrollment, Meeting, Project
+from portal.models import Enrollment, Meeting, Project, WeeklyContribution
 
 
 class IndexView(TemplateView):
@@ -41,6 +41,14 @@ class IndexView(TemplateView):
                 if active_semester is not None
                 else None
             )
+            data["week_contributions"] = (
+                WeeklyContribution.objects.filter(
+                    github_username=self.request.user.github_username,
+                    week=WeeklyContribution.week_of(timezone.localdate()),
+                ).totals()
+                if self.request.user.github_username
+                else None
+            )
             data["project_team_enrollments"] = (
                 data["enrollment"]
                 .project.enrollments.filter(semester=active_semester)
@@ -3,6 +3,7 @@ import logging
 import random
 import re
 import string
+from collections import defaultdict
 from typing import Any, cast
 
 from django.contrib import messages
@@ -11,8 +12,10 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
 from django.db import IntegrityError
 from django.http import (
+    Http404,
     HttpRequest,
     HttpResponse,
+    HttpResponseBadRequest,
     HttpResponseForbidden,
     HttpResponseRedirect,
     JsonResponse,
@@ -22,24 +25,35 @@ from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.datastructures import MultiValueDictKeyError
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
 from django.views.generic import DetailView
 from django.views.generic.edit import FormView
 from sentry_sdk import capture_exception, capture_message
 
+from portal import live_attendance
+from portal.calendar import (
+    get_calendar_token,
+    get_meetings_calendar,
+    get_user_from_calendar_token,
+    get_user_visibility,
+)
 from portal.checks import CheckUserCanScheduleWorkshop
 from portal.forms import SubmitAttendanceForm, WorkshopCreateForm
 from portal.views import UserRequiresSetupMixin
 from portal.views.admin import is_admin
 
 from ..models import (
-    Enrollment,
     Meeting,
     MeetingAttendance,
     MeetingAttendanceCode,
     Semester,
     SmallGroup,
     User,
+    failed_verification_cache_key,
 )
+from ..roles import get_roles
+from ..routers import replica_view
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +80,17 @@ def meeting_to_event(meeting: Meeting) -> dict[str, Any]:
     }
 
 
+def meeting_to_sync_item(meeting: Meeting) -> dict[str, Any]:
+    return {
+        **meeting_to_event(meeting),
+        "type": meeting.type,
+        "is_published": meeting.is_published,
+        "room": str(meeting.room) if meeting.room else None,
+        "updated_at": meeting.updated_at,
+    }
+
+
+@replica_view
 def meetings_index(request: HttpRequest) -> HttpResponse:
     now = timezone.now()
     active_semester = Semester.get_active()
@@ -110,10 +135,23 @@ def meetings_index(request: HttpRequest) -> HttpResponse:
             "can_schedule_workshops_check": CheckUserCanScheduleWorkshop().check(
                 request.user, active_semester
             ),
+            "calendar_feed_url": request.build_absolute_uri(
+                reverse(
+                    "meetings_calendar_feed",
+                    args=(get_calendar_token(request.user),),
+                )
+                if request.user.is_authenticated
+                else reverse("meetings_public_calendar_feed")
+            ),
         },
     )
 
 
+def can_manage_attendance(user: User, meeting: Meeting) -> bool:
+    return get_roles(user, meeting.semester_id).can_manage_attendance(meeting)
+
+
+@method_decorator(replica_view, name="dispatch")
 class MeetingDetailView(DetailView):
     object: Meeting
     small_group: SmallGroup | None
@@ -122,29 +160,7 @@ class MeetingDetailView(DetailView):
     context_object_name = "meeting"
 
     def can_manage_attendance(self):
-        if not self.request.user.is_authenticated:
-            return False
-
-        active_enrollment = self.request.user.enrollments.filter(
-            semester_id=self.object.semester_id
-        ).first()
-
-        if self.request.user.is_superuser:
-            return True
-
-        # Mentors can manage general meeting attendance except mentor and coordinator meetings
-        if (
-            active_enrollment
-            and active_enrollment.is_mentor
-            and self.object.type not in (Meeting.MENTOR, Meeting.COORDINATOR)
-        ):
-            return True
-
-        # Meeting hosts also can manage attendance
-        if self.object.host == self.request.user:
-            return True
-
-        return False
+        return can_manage_attendance(self.request.user, self.object)
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
@@ -164,16 +180,7 @@ class MeetingDetailView(DetailView):
 
         data["can_manage_attendance"] = False
 
-        if self.request.user.is_authenticated:
-            can_manage_attendance = cache.get_or_set(
-                f"can_manage_attendance:{self.object.pk}:{self.request.user.pk}",
-                default=self.can_manage_attendance(),
-                timeout=60 * 60 * 24,
-            )
-        else:
-            can_manage_attendance = False
-
-        if can_manage_attendance:
+        if self.can_manage_attendance():
             data["can_manage_attendance"] = True
 
             if self.request.user.is_superuser:
@@ -234,6 +241,8 @@ class MeetingDetailView(DetailView):
                     60 * 30,
                 )
 
+            # Read before the attendance so nothing written in between is missed by the live feed
+            data["attendance_stream_cursor"] = live_attendance.get_cursor(self.object)
             data = {
                 **data,
                 **self.object.get_attendance_data(small_group),
@@ -242,17 +251,108 @@ class MeetingDetailView(DetailView):
         return data
 
 
+def meeting_attendance_stream(request: HttpRequest, pk: int) -> HttpResponse:
+    """Returns attendance submitted for a meeting (or one small group's part of it) since the
+    last event the browser saw, as server-sent events, see portal/live_attendance.py."""
+    meeting = get_object_or_404(Meeting, pk=pk)
+    if not can_manage_attendance(request.user, meeting):
+        return HttpResponseForbidden()
+
+    user_ids = None
+    if small_group_pk := request.GET.get("small_group"):
+        user_ids = get_object_or_404(SmallGroup, pk=small_group_pk).get_user_ids()
+
+    # Browsers send the ID of the last event they saw when reconnecting
+    after = request.headers.get("Last-Event-ID") or request.GET.get(
+        "after", live_attendance.START
+    )
+    response = HttpResponse(
+        live_attendance.read(meeting.pk, after, user_ids),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@replica_view
 def meetings_api(request: HttpRequest) -> HttpResponse:
     start, end = request.GET.get("start"), request.GET.get("end")
 
-    meetings = Meeting.get_user_queryset(request.user).filter(
-        starts_at__range=[start, end]
-    )
+    meetings = Meeting.get_visibility_queryset(
+        get_user_visibility(request.user)
+    ).filter(starts_at__range=[start, end])
 
     events = list(map(meeting_to_event, meetings))
     return JsonResponse(events, safe=False)
 
 
+@replica_view
+def meetings_calendar_feed(request: HttpRequest, token: str | None = None):
+    """Serves the iCalendar feed of meetings visible to the user the token was issued to, or public meetings without a token."""
+    if token is None:
+        visibility = Meeting.PUBLIC_VISIBILITY
+    else:
+        user = get_user_from_calendar_token(token)
+        if user is None:
+            raise Http404("No such calendar.")
+        visibility = get_user_visibility(user)
+
+    response = HttpResponse(
+        get_meetings_calendar(visibility), content_type="text/calendar; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'inline; filename="rcos-meetings.ics"'
+    response["Cache-Control"] = "private, max-age=300"
+    return response
+
+
+def meetings_sync_api(request: HttpRequest) -> HttpResponse:
+    """
+    Returns the meetings visible to the user that changed after `?since=` along with the IDs
+    of meetings that were deleted or are no longer visible. Omitting `since` (or passing one
+    older than deletions are remembered) performs a full sync. Clients should pass the
+    returned `synced_at` as `since` on their next sync.
+    """
+    synced_at = timezone.now()
+    visible_meetings = Meeting.get_visibility_queryset(
+        get_user_visibility(request.user)
+    )
+
+    since = None
+    if "since" in request.GET:
+        since = parse_datetime(request.GET["since"])
+        if since is None:
+            return HttpResponseBadRequest("`since` must be an ISO 8601 datetime.")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+    removed_ids = Meeting.get_deleted_since(since) if since else None
+    is_full_sync = removed_ids is None
+
+    if is_full_sync:
+        meetings = visible_meetings
+        removed_ids = []
+    else:
+        meetings = visible_meetings.filter(updated_at__gt=since)
+        # Meetings that changed but are no longer visible, e.g. were unpublished
+        removed_ids += list(
+            Meeting.objects.filter(updated_at__gt=since)
+            .exclude(pk__in=meetings.values("pk"))
+            .values_list("pk", flat=True)
+        )
+
+    return JsonResponse(
+        {
+            "synced_at": synced_at,
+            "is_full_sync": is_full_sync,
+            "meetings": [
+                meeting_to_sync_item(meeting)
+                for meeting in meetings.select_related("room").order_by("updated_at")
+            ],
+            "removed": removed_ids,
+        }
+    )
+
+
 class SubmitAttendanceFormView(LoginRequiredMixin, UserRequiresSetupMixin, FormView):
     template_name = "portal/meetings/attendance/submit.html"
     form_class = SubmitAttendanceForm
@@ -304,7 +404,7 @@ class SubmitAttendanceFormView(LoginRequiredMixin, UserRequiresSetupMixin, FormV
             # If the user has previously failed verification, require verification
             # until they get explicitly verified.
             # This cache key is cleared when a Mentor verifies them.
-            if cache.has_key(f"failed-verification:{user.pk}"):
+            if cache.has_key(failed_verification_cache_key(user.pk)):
                 new_attendance.is_verified = False
 
             try:
@@ -316,6 +416,18 @@ class SubmitAttendanceFormView(LoginRequiredMixin, UserRequiresSetupMixin, FormV
                 )
                 return redirect(reverse("submit_attendance"))
 
+            live_attendance.publish(
+                new_attendance.meeting,
+                [
+                    live_attendance.attendance_event(
+                        user,
+                        "added",
+                        is_verified=new_attendance.is_verified,
+                        submitted_by=self.request.user,
+                    )
+                ],
+            )
+
             if new_attendance.is_verified:
                 messages.success(
                     self.request,
@@ -335,6 +447,16 @@ class SubmitAttendanceFormView(LoginRequiredMixin, UserRequiresSetupMixin, FormV
         return redirect(meeting_attendance_code.meeting.get_absolute_url())
 
 
+ATTENDANCE_RESULT_MESSAGES = {
+    "added": (messages.SUCCESS, "Added attendance for"),
+    "verified": (messages.SUCCESS, "Verified attendance for"),
+    "already verified": (messages.INFO, "Attendance was already verified for"),
+    "denied": (messages.SUCCESS, "Denied attendance verification for"),
+    "removed": (messages.SUCCESS, "Removed attendance for"),
+    "not found": (messages.INFO, "There was no attendance to remove for"),
+}
+
+
 @login_required
 def manually_add_or_verify_attendance(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
@@ -364,84 +486,56 @@ def manually_add_or_verify_attendance(request: HttpRequest) -> HttpResponse:
             messages.warning(request, "You did not enter a user ID or RCS ID!")
             return redirect(reverse("meetings_detail", args=(meeting.pk,)))
 
-        if user_ids:
-            users = User.objects.filter(pk__in=user_ids)
-        else:
-            users = User.objects.filter(rcs_id__in=rcs_ids)
-
-        submitter_enrollment = request.user.enrollments.get(semester=meeting.semester)
-        for user in users:
-            try:
-                # Only allow Mentors or above AND meeting hosts to add/verify attendances
-                if (
-                    not request.user.is_superuser
-                    and not submitter_enrollment.is_faculty_advisor
-                    and not submitter_enrollment.is_coordinator
-                    and not submitter_enrollment.is_mentor
-                    and not request.user.pk == meeting.host.pk
-                ):
-                    return redirect(reverse("meetings_index"))
+        # Only allow Mentors or above AND meeting hosts to add/verify attendances
+        submitter_roles = get_roles(request.user, meeting.semester_id)
+        if not (submitter_roles.is_mentor_or_above or submitter_roles.hosts(meeting)):
+            messages.error(
+                request,
+                "You must be an enrolled Faculty Advisor/Coordinator/Mentor or the meeting host to perform this action.",
+            )
+            return redirect(reverse("meetings_detail", args=(meeting.pk,)))
 
-                # Don't let Mentors add attendances for Mentor meetings
-                if (
-                    not request.user.is_superuser
-                    and not submitter_enrollment.is_coordinator
-                    and submitter_enrollment.is_mentor
-                    and meeting.type == Meeting.MENTOR
-                ):
-                    messages.warning(
-                        request,
-                        "You cannot manually submit attendance for a Mentor meeting!",
-                    )
-                    return redirect(reverse("meetings_detail", args=(meeting.pk,)))
-            except Enrollment.DoesNotExist:
-                if not request.user.is_superuser:
-                    messages.error(
-                        request,
-                        "You must be an enrolled Faculty Advisor/Coordinator/Mentor or the meeting host to perform this action.",
-                    )
-                    return redirect(reverse("meetings_detail", args=(meeting.pk,)))
+        # Don't let Mentors add attendances for Mentor meetings
+        if (
+            not submitter_roles.is_superuser
+            and not submitter_roles.is_coordinator
+            and submitter_roles.is_mentor
+            and meeting.type == Meeting.MENTOR
+        ):
+            messages.warning(
+                request,
+                "You cannot manually submit attendance for a Mentor meeting!",
+            )
+            return redirect(reverse("meetings_detail", args=(meeting.pk,)))
 
-            user.enrollments.get_or_create(semester_id=meeting.semester_id)
+        if user_ids:
+            users = list(User.objects.filter(pk__in=user_ids))
+            unknown = set(user_ids) - {str(user.pk) for user in users}
+        else:
+            users = list(User.objects.filter(rcs_id__in=rcs_ids))
+            unknown = set(rcs_ids) - {user.rcs_id for user in users}
 
-            if action == "accept":
-                try:
-                    attendance = MeetingAttendance.objects.get(
-                        user=user, meeting=meeting
-                    )
-                    if not attendance.is_verified:
-                        attendance.is_verified = True
-                        attendance.save()
-
-                        # Clear the cache of any record of this person previously failing verification
-                        cache.delete(f"failed-verification:{user.pk}")
-                except MeetingAttendance.DoesNotExist:
-                    attendance = MeetingAttendance(
-                        meeting=meeting,
-                        user=user,
-                        is_verified=True,
-                        submitted_by=request.user,
-                    )
-                    attendance.save()
-                    messages.success(request, f"Added attendance for {user}!")
+        if action == "accept":
+            results = MeetingAttendance.objects.verify_many(
+                meeting, users, request.user
+            )
+        else:
+            results = MeetingAttendance.objects.remove_many(
+                meeting, users, deny=action == "deny"
+            )
 
-                # Submit attendance for submitter themselves
-                try:
-                    MeetingAttendance(
-                        user=request.user, meeting=meeting, submitted_by=request.user
-                    ).save()
-
-                except IntegrityError:
-                    pass
-            elif action == "deny":
-                cache.set(
-                    f"failed-verification:{user.pk}", 1, 60 * 60 * 24 * 30 * 3
-                )  # 3 months
-                MeetingAttendance.objects.filter(user=user, meeting=meeting).delete()
-                messages.success(request, f"Denied attendance verification for {user}!")
-            elif action == "delete":
-                MeetingAttendance.objects.filter(user=user, meeting=meeting).delete()
-                messages.success(request, f"Removed attendance for {user}!")
+        users_by_id = {user.pk: user for user in users}
+
+        users_by_result = defaultdict(list)
+        for user_id, result in results.items():
+            users_by_result[result].append(str(users_by_id[user_id]))
+        for result, names in users_by_result.items():
+            level, summary = ATTENDANCE_RESULT_MESSAGES[result]
+            messages.add_message(request, level, f"{summary}: {', '.join(names)}")
+        if unknown:
+            messages.warning(
+                request, f"No users found for: {', '.join(sorted(unknown))}"
+            )
 
         return redirect(
             reverse("meetings_detail", args=(meeting.pk,))
@@ -453,6 +547,7 @@ def manually_add_or_verify_attendance(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@replica_view
 def user_attendance(request: HttpRequest, pk: Any) -> HttpResponse:
     target_user = cast(User, User.objects.get(pk=pk))
 
@@ -527,6 +622,7 @@ def user_attendance(request: HttpRequest, pk: Any) -> HttpResponse:
 
 @login_required
 @user_passes_test(is_admin)
+@replica_view
 def export_meeting_attendance(request: HttpRequest, pk: Any) -> HttpResponse:
     meeting = get_object_or_404(Meeting, pk=pk)
 
@@ -4,8 +4,10 @@ from django.http import HttpRequest, HttpResponse
 from django.template.response import TemplateResponse
 
 from ..models import Organization
+from ..routers import replica_view
 
 
+@replica_view
 def organizations_index(request: HttpRequest) -> HttpResponse:
     """Renders a list of the organizations that have users and projects in RCOS."""
     return TemplateResponse(
@@ -1,9 +1,11 @@
 """Views related to projects."""
 
+import asyncio
 import logging
 from collections import defaultdict
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -17,9 +19,10 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
 )
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views.generic.edit import CreateView
 
 from portal.checks import (
@@ -31,6 +34,7 @@ from portal.checks import (
 )
 from portal.forms import ProjectCreateForm, ProjectEditForm
 from portal.services import github
+from portal.services.http import closes_client
 
 from ..models import (
     Enrollment,
@@ -40,8 +44,12 @@ from ..models import (
     ProjectProposal,
     ProjectRepository,
     Semester,
+    SmallGroup,
     User,
+    WeeklyContribution,
 )
+from ..roles import forget_roles, get_roles
+from ..routers import replica_view
 from . import (
     OrganizationFilteredListView,
     SearchableListView,
@@ -71,6 +79,7 @@ def project_lead_index(request: HttpRequest) -> HttpResponse:
     return TemplateResponse(request, "portal/projects/lead_index.html", {})
 
 
+@method_decorator(replica_view, name="dispatch")
 class ProjectIndexView(
     SearchableListView, OrganizationFilteredListView, SemesterFilteredListView
 ):
@@ -167,15 +176,31 @@ class ProjectIndexView(
         return data
 
 
-def project_detail(request: HttpRequest, slug: str) -> HttpResponse:
-    """Fetches a project and its details either at the semester level or aggregated across all semesters."""
+@replica_view
+@closes_client
+async def project_detail(request: HttpRequest, slug: str) -> HttpResponse:
+    """Fetches a project and its details either at the semester level or aggregated across all
+    semesters, loading its GitHub repositories while the rest of the page is queried."""
 
-    project: Project = get_object_or_404(
+    project: Project = await aget_object_or_404(
         Project.objects.approved()
         .prefetch_related("tags", "pitches")
         .select_related("owner", "organization"),
         slug=slug,
     )
+
+    context, repositories = await asyncio.gather(
+        sync_to_async(get_project_detail_context)(request, project),
+        project.aget_repositories(),
+    )
+    context["repositories"] = repositories
+
+    return TemplateResponse(request, "portal/projects/detail.html", context)
+
+
+def get_project_detail_context(
+    request: HttpRequest, project: Project
+) -> dict[str, Any]:
     context: dict[str, Any] = {"project": project} | target_semester_context(request)
 
     active_enrollment = None
@@ -207,20 +232,18 @@ def project_detail(request: HttpRequest, slug: str) -> HttpResponse:
         context["target_semester_enrollments"] = project.get_semester_team(
             context["target_semester"]
         )
+        context["contributions_by_username"] = (
+            WeeklyContribution.objects.filter(repository__project=project)
+            .during(context["target_semester"])
+            .totals_by("github_username")
+        )
         context["can_enroll"] = CheckUserCanEnroll().passes(
             request.user, context["target_semester"], None
         ) and (active_enrollment is None or active_enrollment.project is None)
     else:
         context["enrollments_by_semester"] = project.get_all_teams()
 
-    # Fetch project repositories
-    try:
-        context["repositories"] = project.get_repositories(github.client_factory())
-    except Exception as e:
-        logger.error(e)
-        context["repositories"] = []
-
-    return TemplateResponse(request, "portal/projects/detail.html", context)
+    return context
 
 
 @login_required
@@ -296,14 +319,7 @@ def modify_project_team(request: HttpRequest, slug: str) -> HttpResponse:
     semester = get_object_or_404(Semester.objects.all(), pk=semester_id)
 
     # Logged in user must be project lead to modify team
-    try:
-        Enrollment.objects.get(
-            semester_id=semester.pk,
-            user_id=request.user.pk,
-            project_id=project.pk,
-            is_project_lead=True,
-        )
-    except Enrollment.DoesNotExist:
+    if not get_roles(request.user, semester).leads(project):
         return HttpResponseForbidden()
 
     if request.method == "POST":
@@ -333,6 +349,8 @@ def modify_project_team(request: HttpRequest, slug: str) -> HttpResponse:
             )
         elif action == "remove":
             user.enrollments.filter(semester=semester_id).update(project=None)
+            forget_roles([user.pk], semester_id)
+            cache.delete(SmallGroup.members_cache_key(semester_id))
             # Notify user
             user.send_message(
                 f"{request.user.discord_mention} removed you from the **{project}** team on RCOS IO."
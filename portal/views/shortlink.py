@@ -1,8 +1,13 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.http import Http404
+from django.shortcuts import redirect
 
 from portal.models import ShortLink
 
 
 def shortlink_redirect(request, code):
-    shortlink = get_object_or_404(ShortLink, code=code)
-    return redirect(shortlink.url)
+    url = ShortLink.resolve(code)
+    if url is None:
+        raise Http404("No such short link.")
+
+    ShortLink.record_click(code)
+    return redirect(url)
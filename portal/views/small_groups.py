@@ -1,21 +1,26 @@
 """Views related to small groups."""
 
 from django.contrib.auth.decorators import login_required
+from django.db.models import Prefetch, prefetch_related_objects
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
 from django.utils.decorators import method_decorator
 
-from ..models import SmallGroup
+from ..models import Enrollment, SmallGroup, WeeklyContribution
+from ..routers import replica_view
 from . import SearchableListView, SemesterFilteredListView
 
 
 @method_decorator(login_required, name="dispatch")
+@method_decorator(replica_view, name="dispatch")
 class SmallGroupIndexView(SearchableListView, SemesterFilteredListView):
     require_semester = True
     template_name = "portal/small_groups/index.html"
     context_object_name = "small_groups"
-    queryset = SmallGroup.objects.select_related()
+    queryset = SmallGroup.objects.select_related().prefetch_related(
+        "mentors", "projects"
+    )
     search_fields = (
         "name",
         "projects__name",
@@ -24,12 +29,50 @@ class SmallGroupIndexView(SearchableListView, SemesterFilteredListView):
         "mentors__last_name",
     )
 
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        if self.target_semester:
+            members_by_group = SmallGroup.get_members_by_group(self.target_semester.pk)
+            data["member_counts"] = {
+                pk: len(user_ids) for pk, user_ids in members_by_group.items()
+            }
+            data["own_small_group_ids"] = {
+                pk
+                for pk, user_ids in members_by_group.items()
+                if self.request.user.pk in user_ids
+            }
+        return data
+
 
 @login_required
+@replica_view
 def small_group_detail(request: HttpRequest, pk: int) -> HttpResponse:
     """Fetches and displays an overview for a particular small group."""
+    small_group = get_object_or_404(
+        SmallGroup.objects.select_related("semester", "room"), pk=pk
+    )
+    prefetch_related_objects(
+        [small_group],
+        "mentors",
+        Prefetch(
+            "projects__enrollments",
+            queryset=Enrollment.objects.filter(semester_id=small_group.semester_id)
+            .select_related("user", "semester")
+            .order_by("-is_project_lead"),
+            to_attr="semester_enrollments",
+        ),
+    )
+    contributions_by_project = (
+        WeeklyContribution.objects.filter(repository__project__small_groups=small_group)
+        .during(small_group.semester)
+        .totals_by("repository__project")
+    )
     return TemplateResponse(
         request,
         "portal/small_groups/detail.html",
-        {"small_group": get_object_or_404(SmallGroup, pk=pk)},
+        {
+            "small_group": small_group,
+            "member_count": len(small_group.get_user_ids()),
+            "contributions_by_project": contributions_by_project,
+        },
     )
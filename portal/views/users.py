@@ -8,8 +8,10 @@ from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 
 from ..models import Enrollment, Organization, Project, Semester, User
+from ..routers import replica_view
 from . import (
     OrganizationFilteredListView,
     SearchableListView,
@@ -18,6 +20,7 @@ from . import (
 )
 
 
+@method_decorator(replica_view, name="dispatch")
 class UserIndexView(
     SearchableListView, OrganizationFilteredListView, SemesterFilteredListView
 ):
@@ -89,6 +92,7 @@ class UserIndexView(
         return data
 
 
+@replica_view
 def user_detail(request: HttpRequest, pk: int) -> HttpResponse:
     """Fetches the profile of a an approved, active user."""
     user: User = get_object_or_404(User.objects.approved(), pk=pk)
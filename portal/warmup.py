@@ -0,0 +1,82 @@
+"""
+Does the work the first request to a new worker would otherwise pay for: building the URL
+resolver, compiling the most requested templates into the cached template loader, and opening
+Redis connections and the database connection pool (if `DB_POOL_MAX_SIZE` enables it).
+
+gunicorn.conf.py runs `warm_up(connect=False)` once before forking workers, which then inherit
+the resolver and compiled templates, and `warm_up()` in each worker for its own connections.
+"""
+
+import logging
+from time import perf_counter
+
+from django.core.cache import caches
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+HOT_TEMPLATES = (
+    "portal/index/index.html",
+    "portal/projects/index.html",
+    "portal/projects/detail.html",
+    "portal/meetings/index.html",
+    "portal/meetings/detail.html",
+    "portal/meetings/attendance/submit.html",
+    "portal/users/index.html",
+    "portal/users/detail.html",
+    "portal/small_groups/index.html",
+    "portal/small_groups/detail.html",
+)
+"""Templates rendered by the most requested pages, see stresstests/locustfile.py."""
+
+
+def warm_up_urls():
+    # Resolving compiles the URL patterns and reversing builds the lookup of names
+    get_resolver().resolve("/")
+    reverse("index")
+
+
+def warm_up_templates():
+    for name in HOT_TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            logger.warning(f"Hot template {name} no longer exists")
+
+
+def warm_up_connections():
+    for connection in connections.all():
+        # Connections belong to the thread that opened them, so only pooled ones can be handed
+        # to the threads serving requests
+        if connection.settings_dict["OPTIONS"].get("pool"):
+            connection.ensure_connection()
+            # Returns it to the pool
+            connection.close()
+    for cache in caches.all():
+        cache.has_key("warmup")
+
+
+def warm_up(connect=True) -> dict[str, float]:
+    """Warms up the process and returns how long each step took in seconds.
+
+    Args:
+        connect: whether to open database and cache connections, which can't be shared
+            across a fork.
+    """
+    steps = [("urls", warm_up_urls), ("templates", warm_up_templates)]
+    if connect:
+        steps.append(("connections", warm_up_connections))
+
+    timings = {}
+    for name, step in steps:
+        started_at = perf_counter()
+        try:
+            step()
+        except Exception:
+            # A slow first request is better than a worker that won't start
+            logger.exception(f"Failed to warm up {name}")
+        timings[name] = perf_counter() - started_at
+    return timings
@@ -0,0 +1,34 @@
+from django.conf import settings
+
+
+def init_sentry():
+    """Starts reporting errors and performance to Sentry.
+
+    Only the integrations the portal uses are enabled, since Sentry otherwise tries importing
+    every library it supports at startup.
+    """
+    if not settings.SENTRY_DSN:
+        return
+
+    import sentry_sdk
+    from sentry_sdk.integrations.celery import CeleryIntegration
+    from sentry_sdk.integrations.django import DjangoIntegration
+    from sentry_sdk.integrations.redis import RedisIntegration
+
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN,
+        integrations=[
+            DjangoIntegration(),
+            CeleryIntegration(),
+            RedisIntegration(),
+        ],
+        auto_enabling_integrations=False,
+        environment=settings.SENTRY_ENVIRONMENT,
+        # Set traces_sample_rate to 1.0 to capture 100%
+        # of transactions for performance monitoring.
+        # We recommend adjusting this value in production.
+        traces_sample_rate=0.75 if settings.DEBUG else 0.25,
+        # If you wish to associate users to errors (assuming you are using
+        # django.contrib.auth) you may enable sending PII data.
+        send_default_pii=True,
+    )
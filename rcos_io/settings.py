@@ -12,10 +12,9 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 
-import sentry_sdk
+from celery.schedules import crontab
 from django.contrib.messages import constants as messages
 from dotenv import load_dotenv
-from sentry_sdk.integrations.django import DjangoIntegration
 
 load_dotenv()
 
@@ -34,20 +33,14 @@ SECRET_KEY = os.environ["SECRET_KEY"]
 DEBUG = os.environ["ENV"] == "development"
 
 
-sentry_sdk.init(
-    dsn="https://9994829e0309480fb835f3b5eb9e600b@o4504487931346944.ingest.sentry.io/4504487932395520",
-    integrations=[
-        DjangoIntegration(),
-    ],
-    environment=os.environ["ENV"],
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for performance monitoring.
-    # We recommend adjusting this value in production.
-    traces_sample_rate=0.75 if DEBUG else 0.25,
-    # If you wish to associate users to errors (assuming you are using
-    # django.contrib.auth) you may enable sending PII data.
-    send_default_pii=True,
+SENTRY_DSN = os.environ.get(
+    "SENTRY_DSN",
+    "https://9994829e0309480fb835f3b5eb9e600b@o4504487931346944.ingest.sentry.io/4504487932395520",
 )
+"""Set to an empty string to disable error reporting, e.g. locally. Sentry is initialized when
+the portal app is ready, see rcos_io/sentry.py."""
+
+SENTRY_ENVIRONMENT = os.environ["ENV"]
 
 
 ALLOWED_HOSTS = [
@@ -100,9 +93,12 @@ CRISPY_CLASS_CONVERTERS = {"datetime": "input"}
 
 
 MIDDLEWARE = [
+    "portal.middleware.ServerTimingMiddleware",
+    "portal.middleware.NPlusOneMiddleware",
+    "portal.middleware.ReplicaStickinessMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.gzip.GZipMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "portal.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -112,7 +108,11 @@ MIDDLEWARE = [
 ]
 
 if DEBUG:
-    MIDDLEWARE.insert(2, "debug_toolbar.middleware.DebugToolbarMiddleware")
+    # The toolbar has to see responses before they're compressed
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.gzip.GZipMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
 
 ROOT_URLCONF = "rcos_io.urls"
 
@@ -139,6 +139,21 @@ WSGI_APPLICATION = "rcos_io.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+PROCESS_TYPE = os.environ.get("PROCESS_TYPE", "web")
+"""Either "web" (gunicorn) or "worker" (Celery), which manage their database connections differently."""
+
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 0))
+"""Connections pooled per process, e.g. gunicorn threads or Celery concurrency. 0 disables pooling, which requires psycopg 3 (the "pool" extra)."""
+
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", min(DB_POOL_MAX_SIZE, 2)))
+
+# Web processes handle one request per thread, so they can keep their connection open between
+# requests. Celery's eventlet pool gives every task its own connection that's never reused,
+# so workers close them after each task unless they're pooled.
+DB_CONN_MAX_AGE = int(
+    os.environ.get("DB_CONN_MAX_AGE", 60 if PROCESS_TYPE == "web" else 0)
+)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -147,9 +162,40 @@ DATABASES = {
         "PASSWORD": os.environ["PGPASSWORD"],
         "HOST": os.environ["PGHOST"],
         "PORT": os.environ["PGPORT"],
+        # Pooled connections are returned to the pool after each request instead
+        "CONN_MAX_AGE": 0 if DB_POOL_MAX_SIZE else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "connect_timeout": 5,
+        },
     }
 }
 
+if DB_POOL_MAX_SIZE:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "timeout": 10,
+        # Recycle connections so they're rebalanced if the database restarts or fails over
+        "max_lifetime": 30 * 60,
+    }
+
+# Read-heavy views opt in to reading from a replica, see portal/routers.py
+if os.environ.get("PGREPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["PGREPLICA_HOST"],
+        "PORT": os.environ.get("PGREPLICA_PORT", os.environ["PGPORT"]),
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+        # Tests read and write the same data
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["portal.routers.ReplicaRouter"]
+
+REPLICA_STICKINESS_SECONDS = int(os.environ.get("REPLICA_STICKINESS_SECONDS", 10))
+"""How long users read from the primary after submitting something, so they see their changes despite replica lag."""
+
 AUTH_USER_MODEL = "portal.User"
 
 AUTHENTICATION_BACKENDS = (
@@ -206,11 +252,18 @@ SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CSRF_COOKIE_SECURE = True
+LOADTEST_LOGIN_TOKEN = os.environ.get("LOADTEST_LOGIN_TOKEN")
+"""
+Enables the /loadtest/login/ route which logs in as any user given this token, for
+stresstests/locustfile.py. NEVER set this in production.
+"""
+
+# Load tests run over plain HTTP against a local server, where secure cookies would be dropped
+CSRF_COOKIE_SECURE = not LOADTEST_LOGIN_TOKEN
 
-SESSION_COOKIE_SECURE = True
+SESSION_COOKIE_SECURE = not LOADTEST_LOGIN_TOKEN
 
-SECURE_HSTS_SECONDS = 2, 592, 000
+SECURE_HSTS_SECONDS = 2_592_000
 
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 
@@ -267,6 +320,9 @@ DISCORD_PROJECT_PAIRING_CATEGORY_ID = os.environ["DISCORD_PROJECT_PAIRING_CATEGO
 
 DISCORD_PROJECT_LEAD_ROLE_ID = os.environ["DISCORD_PROJECT_LEAD_ROLE_ID"]
 
+DISCORD_ALERTS_CHANNEL_ID = os.environ.get("DISCORD_ALERTS_CHANNEL_ID", "")
+"""Channel to post the daily readiness digest to (see portal/alerts.py), not posted if blank."""
+
 LOGIN_URL = "magiclink:login"
 
 MAGICLINK_LOGIN_TEMPLATE_NAME = "portal/magiclink/login.html"
@@ -295,11 +351,26 @@ DEFAULT_FROM_EMAIL = "no-reply@rcos.io"
 
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
-EMAIL_BACKEND = (
+EMAIL_BACKEND = os.environ.get(
+    "EMAIL_BACKEND",
     "django.core.mail.backends.console.EmailBackend"
     if DEBUG
-    else "anymail.backends.mailjet.EmailBackend"
+    else "portal.mail.QueuedEmailBackend",
 )
+"""Queues emails for the Celery worker to send in production, see portal/mail.py."""
+
+EMAIL_DELIVERY_BACKEND = os.environ.get(
+    "EMAIL_DELIVERY_BACKEND",
+    "django.core.mail.backends.console.EmailBackend"
+    if DEBUG
+    else "anymail.backends.mailjet.EmailBackend",
+)
+"""What the Celery worker sends queued emails with."""
+
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 1025))
+"""Where the SMTP backend sends to, mailpit from dev-docker-compose.yml by default."""
 
 ANYMAIL = {
     "MAILJET_API_KEY": os.environ["MAILJET_API_KEY"],
@@ -322,10 +393,12 @@ MESSAGE_TAGS = {
 #         }
 #     }
 # else:
+REDIS_URL = os.environ["REDIS_URL"]
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": os.environ["REDIS_URL"],
+        "BACKEND": "portal.instrumentation.InstrumentedRedisCache",
+        "LOCATION": REDIS_URL,
     }
 }
 
@@ -350,9 +423,67 @@ LOGGING = {
     },
 }
 
-CELERY_BROKER_URL = os.environ["REDIS_URL"]
-CELERY_RESULT_BACKEND = os.environ["REDIS_URL"]
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", 1000))
+"""Requests taking longer than this are logged as warnings along with their slowest queries."""
+
+SLOW_REQUEST_LOGGED_QUERIES = 5
+
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
+
+CELERY_BEAT_SCHEDULE = {
+    "flush-shortlink-clicks": {
+        "task": "portal.tasks.flush_shortlink_clicks",
+        "schedule": 60 * 5,
+    },
+    "reconcile-discord-members": {
+        "task": "portal.tasks.reconcile_discord_members",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "ingest-github-contributions": {
+        "task": "portal.tasks.ingest_github_contributions",
+        "schedule": crontab(minute=15),
+    },
+    "sync-discord-events": {
+        "task": "portal.tasks.sync_discord_events",
+        "schedule": crontab(minute=45),
+    },
+    "meetings-alert": {
+        "task": "portal.tasks.meetings_alert",
+        "schedule": crontab(hour=9, minute=0),
+    },
+    "flush-email-queue": {
+        # In case a flush scheduled by QueuedEmailBackend was lost
+        "task": "portal.tasks.flush_email_queue",
+        "schedule": 60,
+    },
+}
 
 DEBUG_TOOLBAR_CONFIG = {"RESULTS_CACHE_SIZE": 100}
 
+DEBUG_TOOLBAR_PANELS = [
+    "debug_toolbar.panels.history.HistoryPanel",
+    "debug_toolbar.panels.versions.VersionsPanel",
+    "debug_toolbar.panels.timer.TimerPanel",
+    "debug_toolbar.panels.settings.SettingsPanel",
+    "debug_toolbar.panels.headers.HeadersPanel",
+    "debug_toolbar.panels.request.RequestPanel",
+    "debug_toolbar.panels.sql.SQLPanel",
+    "portal.debug_panels.NPlusOnePanel",
+    "debug_toolbar.panels.staticfiles.StaticFilesPanel",
+    "debug_toolbar.panels.templates.TemplatesPanel",
+    "debug_toolbar.panels.alerts.AlertsPanel",
+    "debug_toolbar.panels.cache.CachePanel",
+    "debug_toolbar.panels.signals.SignalsPanel",
+    "debug_toolbar.panels.community.CommunityPanel",
+    "debug_toolbar.panels.redirects.RedirectsPanel",
+    "debug_toolbar.panels.profiling.ProfilingPanel",
+]
+
+NPLUSONE_MODE = os.environ.get("NPLUSONE_MODE", "off")
+"""Whether to check requests for N+1 queries: "off", "warn" (log them), or "strict" (raise, for tests and CI)."""
+
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", 5))
+"""How many times the same shape of query can run in one request before it's reported."""
+
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 20_000
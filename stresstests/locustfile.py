@@ -1,171 +1,288 @@
-from locust import FastHttpUser, run_single_user, task
-
-
-class rcos_up_railway_app(FastHttpUser):
-    host = "https://rcos.up.railway.app"
-    default_headers = {
-        "accept-encoding": "gzip, deflate, br",
-        "accept-language": "en-US,en;q=0.9",
-        "sec-ch-ua": '"Not_A Brand";v="99", "Google Chrome";v="109", "Chromium";v="109"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"macOS"',
-        "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
-    }
-
-    @task
-    def t(self):
-        with self.client.request(
-            "GET",
-            "/projects/?semester=",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/projects/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/users/?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/projects/?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/users/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/projects/aihwkit?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/projects/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/projects/bidos?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/projects/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/meetings/?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/projects/bidos?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/meetings/15",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/meetings/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-
-        with self.client.request(
-            "GET",
-            "/projects/?semester=202301",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/meetings/15",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
-        with self.client.request(
-            "GET",
-            "/projects/?semester=",
-            headers={
-                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "referer": "https://rcos.up.railway.app/projects/?semester=202301",
-                "sec-fetch-dest": "document",
-                "sec-fetch-mode": "navigate",
-                "sec-fetch-site": "same-origin",
-                "sec-fetch-user": "?1",
-                "upgrade-insecure-requests": "1",
-            },
-            catch_response=True,
-        ):
-            pass
+"""
+Load model of the portal's real traffic, run against a local server seeded by
+`./manage.py generate_synthetic_data --targets stresstests/targets.json`.
+
+The server must have `LOADTEST_LOGIN_TOKEN` set (and Locust the same value) so simulated
+users can log in without magic links. Latency percentiles per endpoint are written to
+`LOCUST_REPORT` (default stresstests/report.json) when the run ends.
+"""
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+from locust import FastHttpUser, between, events, task
+
+TARGETS_PATH = Path(
+    os.environ.get("LOCUST_TARGETS", Path(__file__).parent / "targets.json")
+)
+REPORT_PATH = Path(
+    os.environ.get("LOCUST_REPORT", Path(__file__).parent / "report.json")
+)
+LOADTEST_LOGIN_TOKEN = os.environ.get("LOADTEST_LOGIN_TOKEN", "")
+
+ATTENDANCE_BURST_PERIOD = int(os.environ.get("ATTENDANCE_BURST_PERIOD", 300))
+ATTENDANCE_BURST_LENGTH = int(os.environ.get("ATTENDANCE_BURST_LENGTH", 30))
+"""Every burst period, students spend the first burst length seconds submitting attendance codes, like at the start of a meeting."""
+
+REPORT_PERCENTILES = (0.5, 0.75, 0.9, 0.95, 0.99)
+
+targets = json.loads(TARGETS_PATH.read_text())
+
+
+def in_attendance_burst() -> bool:
+    return time.time() % ATTENDANCE_BURST_PERIOD < ATTENDANCE_BURST_LENGTH
+
+
+class PortalUser(FastHttpUser):
+    abstract = True
+    host = "http://localhost:8000"
+    role: str | None = None
+    """Which kind of account from the targets file to log in as, or `None` to stay anonymous."""
+
+    account: dict | None = None
+
+    def on_start(self):
+        if self.role:
+            self.account = random.choice(targets["users"][self.role])
+            self.client.post(
+                "/loadtest/login/",
+                data={"email": self.account["email"]},
+                headers={"X-Loadtest-Token": LOADTEST_LOGIN_TOKEN},
+                name="/loadtest/login/",
+            )
+
+    @property
+    def semester_query(self):
+        return f"?semester={targets['semester']}"
+
+    def csrf_headers(self):
+        token = next(
+            (c.value for c in self.client.cookiejar if c.name == "csrftoken"), ""
+        )
+        return {"X-CSRFToken": token}
+
+    def view_project(self, slug: str | None = None):
+        slug = slug or random.choice(targets["project_slugs"])
+        self.client.get(
+            f"/projects/{slug}/{self.semester_query}", name="/projects/[slug]/"
+        )
+
+    def view_meeting(self):
+        meeting_id = random.choice(targets["meeting_ids"])
+        self.client.get(f"/meetings/{meeting_id}/", name="/meetings/[pk]/")
+
+
+class AnonymousBrowser(PortalUser):
+    """Prospective students and the public looking around."""
+
+    weight = 10
+    wait_time = between(2, 10)
+
+    @task(3)
+    def index(self):
+        self.client.get("/")
+
+    @task(5)
+    def projects(self):
+        self.client.get("/projects/" + self.semester_query, name="/projects/")
+        self.view_project()
+
+    @task(2)
+    def meetings(self):
+        self.client.get("/meetings/")
+        self.client.get(
+            "/api/meetings/?start=2020-01-01&end=2030-01-01", name="/api/meetings/"
+        )
+
+    @task(1)
+    def meeting(self):
+        self.view_meeting()
+
+    @task(1)
+    def calendar_feed(self):
+        self.client.get("/meetings/calendar.ics")
 
 
-if __name__ == "__main__":
-    run_single_user(rcos_up_railway_app)
+class Student(PortalUser):
+    """Enrolled students checking their project and submitting attendance at the start of meetings."""
+
+    role = "student"
+    weight = 20
+
+    def wait_time(self):
+        return (
+            random.uniform(0.5, 3) if in_attendance_burst() else random.uniform(5, 30)
+        )
+
+    @task(10)
+    def submit_attendance(self):
+        if not in_attendance_burst():
+            return
+
+        self.client.get("/attend/")
+        self.client.post(
+            "/attend/",
+            data={"code": random.choice(targets["attendance_codes"])},
+            headers=self.csrf_headers(),
+            name="/attend/ [POST]",
+        )
+
+    @task(3)
+    def dashboard(self):
+        self.client.get("/")
+
+    @task(2)
+    def own_project(self):
+        self.view_project(self.account["project_slug"])
+
+    @task(2)
+    def meetings(self):
+        self.client.get("/meetings/")
+        self.view_meeting()
+
+    @task(1)
+    def own_attendance(self):
+        self.client.get(
+            f"/users/{self.account['pk']}/attendance/{self.semester_query}",
+            name="/users/[pk]/attendance/",
+        )
+
+
+class ProjectLead(PortalUser):
+    """Project leads managing their team."""
+
+    role = "lead"
+    weight = 2
+    wait_time = between(5, 20)
+
+    @task(3)
+    def own_project(self):
+        self.view_project(self.account["project_slug"])
+
+    @task(1)
+    def edit_team(self):
+        slug = self.account["project_slug"]
+        student = random.choice(targets["users"]["student"])
+        self.view_project(slug)
+
+        # Add a student to the team then put them back
+        for action in ("add", "remove"):
+            self.client.post(
+                f"/projects/{slug}/team/{self.semester_query}&action={action}",
+                data={"rcs_id": student["rcs_id"]},
+                headers=self.csrf_headers(),
+                name=f"/projects/[slug]/team/ [{action}]",
+            )
+        if student["project_slug"]:
+            self.client.post(
+                f"/projects/{student['project_slug']}/team/{self.semester_query}&action=add",
+                data={"rcs_id": student["rcs_id"]},
+                headers=self.csrf_headers(),
+                name="/projects/[slug]/team/ [add]",
+            )
+
+
+class Mentor(PortalUser):
+    """Mentors taking and checking attendance for their small groups."""
+
+    role = "mentor"
+    weight = 2
+    wait_time = between(3, 15)
+
+    @task(3)
+    def manage_meeting_attendance(self):
+        meeting_id = random.choice(targets["meeting_ids"])
+        small_group_id = random.choice(targets["small_group_ids"])
+        self.client.get(
+            f"/meetings/{meeting_id}/?small_group={small_group_id}",
+            name="/meetings/[pk]/?small_group=",
+        )
+
+    @task(2)
+    def small_group(self):
+        small_group_id = random.choice(targets["small_group_ids"])
+        self.client.get(f"/small_groups/{small_group_id}/", name="/small_groups/[pk]/")
+
+    @task(1)
+    def users(self):
+        self.client.get("/users/" + self.semester_query, name="/users/")
+
+
+class Coordinator(PortalUser):
+    """Coordinators overseeing the semester."""
+
+    role = "coordinator"
+    weight = 1
+    wait_time = between(10, 30)
+
+    @task(2)
+    def users(self):
+        self.client.get("/users/" + self.semester_query, name="/users/")
+
+    @task(2)
+    def small_groups(self):
+        self.client.get("/small_groups/" + self.semester_query, name="/small_groups/")
+
+    @task(1)
+    def meeting(self):
+        self.view_meeting()
+
+
+class Admin(PortalUser):
+    """Administrators checking students' attendance and exporting data."""
+
+    role = "admin"
+    weight = 1
+    wait_time = between(10, 30)
+
+    @task(2)
+    def student_attendance(self):
+        user_id = random.choice(targets["users"]["student"])["pk"]
+        self.client.get(
+            f"/users/{user_id}/attendance/{self.semester_query}",
+            name="/users/[pk]/attendance/",
+        )
+
+    @task(1)
+    def export_meeting_attendance(self):
+        meeting_id = random.choice(targets["meeting_ids"])
+        self.client.get(
+            f"/meetings/{meeting_id}/export/", name="/meetings/[pk]/export/"
+        )
+
+    @task(1)
+    def export_projects(self):
+        self.client.get("/admin/export/projects/")
+        self.client.post(
+            "/admin/export/projects/",
+            data={"semester": targets["semester"]},
+            headers=self.csrf_headers(),
+            name="/admin/export/projects/ [POST]",
+        )
+
+
+@events.quitting.add_listener
+def write_report(environment, **kwargs):
+    """Writes request counts, failures, and latency percentiles per endpoint as JSON."""
+    stats = environment.stats
+    entries = [*stats.entries.values(), stats.total]
+    report = [
+        {
+            "method": entry.method,
+            "name": entry.name,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": entry.total_rps,
+            "avg_ms": entry.avg_response_time,
+            "max_ms": entry.max_response_time,
+            **{
+                f"p{int(p * 100)}_ms": entry.get_response_time_percentile(p)
+                for p in REPORT_PERCENTILES
+            },
+        }
+        for entry in entries
+    ]
+    REPORT_PATH.write_text(json.dumps(report, indent=4))